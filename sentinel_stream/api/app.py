@@ -1,24 +1,273 @@
 from __future__ import annotations
 
-from fastapi import FastAPI
+import base64
+import binascii
+import json
+import zlib
+from collections.abc import AsyncIterator, Iterator, Sequence
+from contextlib import asynccontextmanager
+from typing import Annotated, Any, Literal
+
+from fastapi import FastAPI, Header, HTTPException, Query, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
 
 from ..config import Settings
-from ..storage.sqlite import SQLiteStorage
+from ..pipeline.bus import DetectionBus
+from ..storage.sqlite import Cursor, DetectionRow, SQLiteReader, SQLiteStorage
+
+Severity = Literal["low", "medium", "high", "critical"]
+Period = Literal["minute", "hour"]
+DetectionDim = Literal["rule_id", "severity", "host"]
+EventDim = Literal["host", "source", "type"]
+
+
+def _row_json(row: DetectionRow) -> str:
+    # event_json is spliced in as stored: no json.loads/dumps round trip per row
+    id_, ts, host, rule_id, rule_name, severity, event_json = row
+    head = json.dumps(
+        {
+            "id": id_,
+            "ts": ts,
+            "host": host,
+            "rule_id": rule_id,
+            "rule_name": rule_name,
+            "severity": severity,
+        },
+        ensure_ascii=False,
+    )
+    return f'{head[:-1]}, "event": {event_json}}}'
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    return base64.urlsafe_b64encode(json.dumps(cursor).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Cursor:
+    try:
+        ts, id_ = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        return str(ts), int(id_)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="invalid cursor") from None
+
 
+def _stats_json(rows: list[tuple[Any, ...]], by: Sequence[str]) -> list[dict[str, Any]]:
+    keys = ("bucket", *by, "count")
+    return [dict(zip(keys, row, strict=True)) for row in rows]
 
-def create_app(settings: Settings) -> FastAPI:
-    app = FastAPI(title="sentinel-stream", version="0.2.0")
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = {t.strip() for t in if_none_match.split(",")}
+    return "*" in tags or etag in tags
+
+
+# idle streams send a keepalive this often (seconds)
+_KEEPALIVE = 15.0
+
+
+def create_app(settings: Settings, bus: DetectionBus | None = None) -> FastAPI:
+    """The HTTP API; with ``bus`` (the pipeline's) it also streams live detections."""
 
     storage = SQLiteStorage(settings.sqlite_path)
     storage.setup()
+    storage.close()
+    reader = SQLiteReader(settings.sqlite_path, size=settings.api_read_pool)
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        yield
+        reader.close()
+
+    app = FastAPI(title="sentinel-stream", version="0.2.0", lifespan=lifespan)
 
     @app.get("/health")
     def health() -> dict[str, str]:
         return {"status": "ok"}
 
     @app.get("/detections")
-    def detections(limit: int = 100) -> list[dict]:
+    def detections(
+        limit: int = 100,
+        rule_id: str | None = None,
+        host: str | None = None,
+        severity: Severity | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        cursor: str | None = None,
+        if_none_match: str | None = Header(default=None),
+    ) -> Response:
+        """Newest detections first; follow ``X-Next-Cursor`` for older pages.
+
+        The ETag covers the query and the table's id range, so polling an
+        unchanged table is answered with 304 without running the query.
+        """
+
         limit = max(1, min(limit, 1000))
-        return storage.get_detections(limit=limit)
+        query: dict[str, Any] = {
+            "limit": limit,
+            "rule_id": rule_id,
+            "host": host,
+            "severity": severity,
+            "since": since,
+            "until": until,
+            "cursor": cursor,
+        }
+        hi, lo = reader.version()
+        q = zlib.crc32(json.dumps(query, sort_keys=True).encode())
+        etag = f'W/"{hi}-{lo}-{q:08x}"'
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+
+        rows, nxt = reader.detections(
+            limit=limit,
+            rule_id=rule_id,
+            host=host,
+            severity=severity,
+            since=since,
+            until=until,
+            after=decode_cursor(cursor) if cursor else None,
+        )
+        headers = {"ETag": etag}
+        if nxt is not None:
+            headers["X-Next-Cursor"] = encode_cursor(nxt)
+        body = "[" + ",".join(_row_json(r) for r in rows) + "]"
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    @app.get("/detections/export")
+    def export(
+        rule_id: str | None = None,
+        host: str | None = None,
+        severity: Severity | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        page_size: int = Query(default=1000, ge=1, le=10_000),
+    ) -> StreamingResponse:
+        """All matching detections as NDJSON, streamed one page at a time."""
+
+        def lines() -> Iterator[str]:
+            for row in reader.iter_detections(
+                page_size=page_size,
+                rule_id=rule_id,
+                host=host,
+                severity=severity,
+                since=since,
+                until=until,
+            ):
+                yield _row_json(row) + "\n"
+
+        return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+    @app.get("/stats/detections")
+    def detection_stats(
+        period: Period = "hour",
+        by: Annotated[list[DetectionDim] | None, Query()] = None,
+        rule_id: str | None = None,
+        host: str | None = None,
+        severity: Severity | None = None,
+        since: str | None = None,
+        until: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """Detection counts per minute/hour bucket, split by any of rule, severity, host."""
+
+        by = list(dict.fromkeys(by or ()))
+        rows = reader.stats(
+            "detections",
+            period=period,
+            by=by,
+            since=since,
+            until=until,
+            rule_id=rule_id,
+            host=host,
+            severity=severity,
+        )
+        return _stats_json(rows, by)
+
+    @app.get("/stats/events")
+    def event_stats(
+        period: Period = "hour",
+        by: Annotated[list[EventDim] | None, Query()] = None,
+        host: str | None = None,
+        source: str | None = None,
+        type: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """Event counts per minute/hour bucket, split by any of host, source, type."""
 
+        by = list(dict.fromkeys(by or ()))
+        rows = reader.stats(
+            "events",
+            period=period,
+            by=by,
+            since=since,
+            until=until,
+            host=host,
+            source=source,
+            type=type,
+        )
+        return _stats_json(rows, by)
+
+    if bus is not None:
+        _add_live_routes(app, bus)
     return app
+
+
+def _add_live_routes(app: FastAPI, bus: DetectionBus) -> None:
+    @app.get("/detections/stream")
+    async def stream(
+        severity: Annotated[list[Severity] | None, Query()] = None,
+        rule_id: Annotated[list[str] | None, Query()] = None,
+        buffer: int = Query(default=1000, ge=1, le=100_000),
+    ) -> StreamingResponse:
+        """Server-Sent Events: ``detection`` per match, ``lag`` when some were dropped."""
+
+        sub = bus.subscribe(severities=severity or (), rule_ids=rule_id or (), maxsize=buffer)
+
+        async def events() -> AsyncIterator[str]:
+            try:
+                while True:
+                    det = await sub.get(timeout=_KEEPALIVE)
+                    if n := sub.lag():
+                        yield f'event: lag\ndata: {{"dropped": {n}}}\n\n'
+                    if det is not None:
+                        yield f"event: detection\ndata: {det.model_dump_json()}\n\n"
+                    elif sub.closed:
+                        return
+                    else:
+                        yield ": keepalive\n\n"
+            finally:
+                sub.close()
+
+        return StreamingResponse(
+            events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"}
+        )
+
+    @app.websocket("/detections/ws")
+    async def websocket(
+        ws: WebSocket,
+        severity: Annotated[list[Severity] | None, Query()] = None,
+        rule_id: Annotated[list[str] | None, Query()] = None,
+        buffer: int = Query(default=1000, ge=1, le=100_000),
+    ) -> None:
+        """Same feed as ``/detections/stream``, as JSON messages tagged by ``type``."""
+
+        await ws.accept()
+        sub = bus.subscribe(severities=severity or (), rule_ids=rule_id or (), maxsize=buffer)
+        try:
+            while True:
+                det = await sub.get(timeout=_KEEPALIVE)
+                if n := sub.lag():
+                    await ws.send_text(f'{{"type": "lag", "dropped": {n}}}')
+                if det is not None:
+                    await ws.send_text(
+                        f'{{"type": "detection", "detection": {det.model_dump_json()}}}'
+                    )
+                elif sub.closed:
+                    await ws.close()
+                    return
+                else:
+                    await ws.send_text('{"type": "keepalive"}')
+        except WebSocketDisconnect:
+            pass
+        finally:
+            sub.close()
@@ -1,30 +1,48 @@
 from __future__ import annotations
 
 import hashlib
+import hmac
 import json
-from collections.abc import Iterable
+import mmap
+import os
+import time
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from itertools import repeat
 from pathlib import Path
+from typing import Any
 
-from .model import AuditRecord, Detection
+from .model import Detection
 
 
 def _sha256_hex(s: str) -> str:
     return hashlib.sha256(s.encode("utf-8")).hexdigest()
 
 
-def append_detection(out_file: Path, detection: Detection, prev_hash: str | None) -> str:
+def encode_detection(detection: Detection, prev_hash: str | None) -> tuple[str, str]:
+    """Serialize an audit record once; return ``(line, hash)``.
+
+    The hash covers the canonical (``sort_keys``) payload. The written line is
+    that same canonical text with the ``hash`` member appended, so the detection
+    is dumped a single time.
+    """
+
     payload = {
         "kind": "detection",
         "detection": detection.model_dump(),
         "prev_hash": prev_hash,
     }
-    line = json.dumps(payload, ensure_ascii=False, sort_keys=True)
-    h = _sha256_hex(line)
-    rec = AuditRecord(kind="detection", detection=detection, prev_hash=prev_hash, hash=h)
+    canonical = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+    h = _sha256_hex(canonical)
+    return f'{canonical[:-1]}, "hash": "{h}"}}\n', h
+
 
+def append_detection(out_file: Path, detection: Detection, prev_hash: str | None) -> str:
+    line, h = encode_detection(detection, prev_hash)
     out_file.parent.mkdir(parents=True, exist_ok=True)
-    with out_file.open("a", encoding="utf-8") as f:
-        f.write(json.dumps(rec.model_dump(), ensure_ascii=False) + "\n")
+    with out_file.open("ab") as f:
+        f.write(line.encode("utf-8"))
     return h
 
 
@@ -42,24 +60,393 @@ def iter_records(file: Path) -> Iterable[dict]:
                 continue
 
 
-def verify_chain(file: Path) -> bool:
-    prev = None
-    for rec in iter_records(file):
+def _record_hash(rec: dict) -> str:
+    payload = {
+        "kind": "detection",
+        "detection": rec.get("detection"),
+        "prev_hash": rec.get("prev_hash"),
+    }
+    line = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+    return _sha256_hex(line)
+
+
+@dataclass(frozen=True)
+class ChainState:
+    """Outcome of verifying (part of) an audit log."""
+
+    ok: bool
+    records: int
+    last_hash: str | None
+    # End of the verified region (EOF when ok).
+    offset: int
+    # Byte offset of the first record that broke the chain.
+    bad_offset: int | None = None
+
+
+# Placeholder for "whatever hash precedes this chunk" in parallel verification.
+_UNLINKED: Any = object()
+
+
+@dataclass(slots=True)
+class _Span:
+    """Verification result for a contiguous byte range of the log."""
+
+    records: int = 0
+    first_prev: Any = _UNLINKED
+    first_offset: int | None = None
+    last_hash: Any = None
+    end: int = 0
+    bad_offset: int | None = None
+
+    def state(self) -> ChainState:
+        if self.bad_offset is not None:
+            return ChainState(False, self.records, self.last_hash, self.bad_offset, self.bad_offset)
+        return ChainState(True, self.records, self.last_hash, self.end)
+
+
+def _scan(lines: Iterable[bytes], offset: int, prev: Any) -> _Span:
+    """Shared core of the verifiers, over raw lines starting at byte ``offset``.
+
+    Applies exactly the rules of :func:`verify_chain` (blank and undecodable lines
+    and non-detection records are skipped). When ``prev`` is ``_UNLINKED`` the
+    first record's ``prev_hash`` is accepted and reported for the caller to link.
+    """
+
+    span = _Span(last_hash=prev)
+    for raw in lines:
+        line_start = offset
+        offset += len(raw)
+        line = raw.decode("utf-8", errors="replace").strip()
+        if not line:
+            continue
+        try:
+            rec = json.loads(line)
+        except json.JSONDecodeError:
+            continue
         if rec.get("kind") != "detection":
             continue
-        expected_prev = rec.get("prev_hash")
-        if expected_prev != prev:
-            return False
-
-        # recompute hash
-        payload = {
-            "kind": "detection",
-            "detection": rec.get("detection"),
-            "prev_hash": rec.get("prev_hash"),
-        }
-        line = json.dumps(payload, ensure_ascii=False, sort_keys=True)
-        h = _sha256_hex(line)
-        if h != rec.get("hash"):
-            return False
+        if span.first_offset is None:
+            span.first_offset = line_start
+            span.first_prev = rec.get("prev_hash")
+            if prev is _UNLINKED:
+                prev = span.first_prev
+        if rec.get("prev_hash") != prev or _record_hash(rec) != rec.get("hash"):
+            span.last_hash = prev
+            span.bad_offset = line_start
+            return span
         prev = rec.get("hash")
-    return True
+        span.records += 1
+    span.last_hash = prev
+    span.end = offset
+    return span
+
+
+def verify_range(file: Path, *, start: int = 0, prev_hash: str | None = None) -> ChainState:
+    """Verify the chain from byte offset ``start``, given the hash preceding it."""
+
+    if not file.exists():
+        return ChainState(ok=True, records=0, last_hash=prev_hash, offset=0)
+    with file.open("rb") as f:
+        f.seek(start)
+        return _scan(f, start, prev_hash).state()
+
+
+def verify_chain(file: Path) -> bool:
+    return verify_range(file).ok
+
+
+def _mmap_lines(mm: mmap.mmap, start: int, end: int) -> Iterator[bytes]:
+    mm.seek(start)
+    while mm.tell() < end:
+        yield mm.readline()
+
+
+def _verify_chunk(path: str, start: int, end: int) -> _Span:
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return _scan(_mmap_lines(mm, start, end), start, _UNLINKED)
+
+
+def _chunk_bounds(mm: mmap.mmap, start: int, end: int, n: int) -> list[int]:
+    """Split ``[start, end)`` into at most ``n`` ranges cut right after a newline."""
+
+    bounds = [start]
+    for i in range(1, n):
+        nl = mm.find(b"\n", start + (end - start) * i // n, end)
+        if nl < 0:
+            break
+        if nl + 1 > bounds[-1]:
+            bounds.append(nl + 1)
+    if bounds[-1] < end:
+        bounds.append(end)
+    return bounds
+
+
+def verify_parallel(
+    file: Path,
+    *,
+    jobs: int,
+    start: int = 0,
+    prev_hash: str | None = None,
+    min_bytes_per_job: int = 1 << 22,
+) -> ChainState:
+    """Verify the chain with a process pool; same result as :func:`verify_range`.
+
+    The memory-mapped file is cut at newline boundaries into a few chunks per
+    worker. Workers recompute record hashes and the links inside their chunk;
+    the parent then checks ``prev_hash`` linkage across chunk edges in order, so
+    the first broken record is reported exactly as a sequential pass would.
+    """
+
+    size = file.stat().st_size if file.exists() else 0
+    n = min(jobs * 4, (size - start) // max(1, min_bytes_per_job))
+    if jobs <= 1 or n < 2:
+        return verify_range(file, start=start, prev_hash=prev_hash)
+
+    with file.open("rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        bounds = _chunk_bounds(mm, start, size, n)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        spans = pool.map(_verify_chunk, repeat(str(file)), bounds[:-1], bounds[1:])
+
+        prev = prev_hash
+        records = 0
+        for span in spans:
+            if span.first_offset is None:
+                continue
+            if span.first_prev != prev:
+                return ChainState(False, records, prev, span.first_offset, span.first_offset)
+            records += span.records
+            if span.bad_offset is not None:
+                return ChainState(False, records, span.last_hash, span.bad_offset, span.bad_offset)
+            prev = span.last_hash
+    return ChainState(ok=True, records=records, last_hash=prev, offset=size)
+
+
+def iter_lines_reverse(
+    file: Path, *, end: int | None = None, block_size: int = 1 << 16
+) -> Iterator[tuple[int, bytes]]:
+    """Yield ``(offset, line)`` pairs from the end of ``file`` backwards.
+
+    Reads fixed-size blocks from ``end`` (default EOF) towards the start, so the
+    cost depends on how far back the caller reads, not on the file size. Lines
+    exclude the trailing newline; blank lines are skipped.
+    """
+
+    with file.open("rb") as f:
+        pos = f.seek(0, os.SEEK_END) if end is None else end
+        tail = b""
+        while pos > 0:
+            size = min(block_size, pos)
+            pos -= size
+            f.seek(pos)
+            buf = f.read(size) + tail
+            lines = buf.split(b"\n")
+            # The first piece may continue in the previous block.
+            tail = lines[0]
+            line_end = pos + len(buf)
+            for line in reversed(lines[1:]):
+                line_end -= len(line) + 1
+                if line.strip():
+                    yield line_end + 1, line
+        if tail.strip():
+            yield 0, tail
+
+
+def decode_line(line: bytes) -> dict | None:
+    try:
+        rec = json.loads(line.decode("utf-8", errors="replace"))
+    except json.JSONDecodeError:
+        return None
+    return rec if isinstance(rec, dict) else None
+
+
+def tail_records(file: Path, n: int) -> list[dict]:
+    """Return the last ``n`` records (oldest first), reading backwards from EOF."""
+
+    out: list[dict] = []
+    if n <= 0 or not file.exists():
+        return out
+    for _offset, line in iter_lines_reverse(file):
+        rec = decode_line(line)
+        if rec is None:
+            continue
+        out.append(rec)
+        if len(out) >= n:
+            break
+    out.reverse()
+    return out
+
+
+def follow_records(
+    file: Path,
+    *,
+    from_start: bool = False,
+    poll_interval: float = 0.5,
+    idle_timeout: float | None = None,
+) -> Iterator[dict]:
+    """Yield records as they are appended, like ``tail -F``.
+
+    Only new bytes are read: the file stays open and partial lines are held
+    until their newline arrives. Rotation (the path now names a different file)
+    and truncation are detected while idle; the old file is drained and the new
+    one is read from its start. Stops after ``idle_timeout`` seconds without new
+    records, or never when it is ``None``.
+    """
+
+    fh = None
+    buf = b""
+    idle = 0.0
+    try:
+        while True:
+            if fh is None:
+                try:
+                    fh = file.open("rb")
+                except FileNotFoundError:
+                    fh = None
+                    # Anything created after we started is read in full.
+                    from_start = True
+                else:
+                    if not from_start:
+                        fh.seek(0, os.SEEK_END)
+                    from_start = True
+                    buf = b""
+
+            chunk = fh.read(1 << 16) if fh is not None else b""
+            if chunk:
+                idle = 0.0
+                buf += chunk
+                *lines, buf = buf.split(b"\n")
+                for line in lines:
+                    if line.strip() and (rec := decode_line(line)) is not None:
+                        yield rec
+                continue
+
+            if fh is not None:
+                try:
+                    st = os.stat(file)
+                except FileNotFoundError:
+                    st = None
+                if st is None or st.st_ino != os.fstat(fh.fileno()).st_ino:
+                    # Rotated: the old file was drained above; switch over.
+                    fh.close()
+                    fh = None
+                    continue
+                if st.st_size < fh.tell():
+                    fh.seek(0)
+                    buf = b""
+                    continue
+
+            if idle_timeout is not None and idle >= idle_timeout:
+                return
+            time.sleep(poll_interval)
+            idle += poll_interval
+    finally:
+        if fh is not None:
+            fh.close()
+
+
+def last_record(file: Path, *, end: int | None = None) -> tuple[int, dict] | None:
+    """Return ``(offset, record)`` for the last decodable detection before ``end``."""
+
+    if not file.exists():
+        return None
+    for offset, line in iter_lines_reverse(file, end=end):
+        rec = decode_line(line)
+        if rec is not None and rec.get("kind") == "detection":
+            return offset, rec
+    return None
+
+
+@dataclass(frozen=True)
+class Checkpoint:
+    """A trusted point in the audit log: everything before ``offset`` verified.
+
+    When a key is configured the checkpoint carries an HMAC-SHA256 over its
+    fields and is rejected if the MAC does not match. Without a key it only
+    guards against accidental damage, not deliberate tampering.
+    """
+
+    offset: int
+    records: int
+    hash: str | None
+    mac: str | None = None
+
+    def _body(self) -> bytes:
+        body = {"offset": self.offset, "records": self.records, "hash": self.hash}
+        return json.dumps(body, sort_keys=True).encode("utf-8")
+
+    def signed(self, key: str | None) -> Checkpoint:
+        if key is None:
+            return Checkpoint(self.offset, self.records, self.hash)
+        mac = hmac.new(key.encode("utf-8"), self._body(), hashlib.sha256).hexdigest()
+        return Checkpoint(self.offset, self.records, self.hash, mac)
+
+    def valid_mac(self, key: str | None) -> bool:
+        if key is None:
+            return True
+        return self.mac is not None and hmac.compare_digest(self.signed(key).mac or "", self.mac)
+
+
+def checkpoint_path(file: Path) -> Path:
+    return file.with_name(file.name + ".ckpt")
+
+
+def write_checkpoint(file: Path, ckpt: Checkpoint, *, key: str | None = None) -> None:
+    """Atomically replace the checkpoint sidecar of ``file``."""
+
+    path = checkpoint_path(file)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(asdict(ckpt.signed(key)), sort_keys=True), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def load_checkpoint(file: Path, *, key: str | None = None) -> Checkpoint | None:
+    """Load the sidecar checkpoint if it is authentic and consistent with ``file``.
+
+    Consistency means ``offset`` falls on a line boundary inside the file and
+    the last record before it carries the checkpointed hash.
+    """
+
+    path = checkpoint_path(file)
+    if not path.exists() or not file.exists():
+        return None
+    try:
+        doc = json.loads(path.read_text(encoding="utf-8"))
+        ckpt = Checkpoint(
+            offset=int(doc["offset"]),
+            records=int(doc["records"]),
+            hash=doc.get("hash"),
+            mac=doc.get("mac"),
+        )
+    except (ValueError, KeyError, TypeError):
+        return None
+
+    if not ckpt.valid_mac(key) or ckpt.offset < 0 or ckpt.offset > file.stat().st_size:
+        return None
+    if ckpt.offset > 0:
+        with file.open("rb") as f:
+            f.seek(ckpt.offset - 1)
+            if f.read(1) != b"\n":
+                return None
+    found = last_record(file, end=ckpt.offset)
+    if (found[1].get("hash") if found else None) != ckpt.hash:
+        return None
+    return ckpt
+
+
+def verify_since_checkpoint(file: Path, *, key: str | None = None, jobs: int = 1) -> ChainState:
+    """Verify only what was appended after the last trusted checkpoint.
+
+    Falls back to a full verification when there is no usable checkpoint.
+    """
+
+    ckpt = load_checkpoint(file, key=key)
+    if ckpt is None:
+        return verify_parallel(file, jobs=jobs)
+    st = verify_parallel(file, jobs=jobs, start=ckpt.offset, prev_hash=ckpt.hash)
+    return ChainState(
+        ok=st.ok,
+        records=ckpt.records + st.records,
+        last_hash=st.last_hash,
+        offset=st.offset,
+        bad_offset=st.bad_offset,
+    )
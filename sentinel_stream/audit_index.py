@@ -0,0 +1,247 @@
+from __future__ import annotations
+
+import re
+import sqlite3
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any
+
+from .audit import decode_line, last_record
+
+BUCKET_SECONDS = 3600
+
+_RELATIVE = re.compile(r"^(\d+)([smhd])$")
+_UNITS = {"s": "seconds", "m": "minutes", "h": "hours", "d": "days"}
+
+
+def parse_time(value: str) -> datetime:
+    """Parse an ISO-8601 timestamp or a relative age such as ``15m`` / ``2d``."""
+
+    m = _RELATIVE.match(value.strip())
+    if m:
+        return datetime.now(timezone.utc) - timedelta(**{_UNITS[m.group(2)]: int(m.group(1))})
+    dt = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+
+
+def _ts(value: Any) -> datetime | None:
+    if not isinstance(value, str):
+        return None
+    try:
+        return parse_time(value)
+    except ValueError:
+        return None
+
+
+def _bucket(dt: datetime | None) -> int | None:
+    return None if dt is None else int(dt.timestamp()) // BUCKET_SECONDS
+
+
+def index_path(file: Path) -> Path:
+    return file.with_name(file.name + ".idx")
+
+
+Posting = tuple[int, Any, Any, Any, int | None]
+
+
+def make_posting(offset: int, rule_id: Any, severity: Any, host: Any, ts: Any) -> Posting:
+    return (offset, rule_id, severity, host, _bucket(_ts(ts)))
+
+
+def posting(offset: int, rec: dict) -> Posting | None:
+    """Index row for the audit record starting at ``offset``."""
+
+    det = rec.get("detection")
+    if rec.get("kind") != "detection" or not isinstance(det, dict):
+        return None
+    return make_posting(
+        offset, det.get("rule_id"), det.get("severity"), det.get("host"), det.get("ts")
+    )
+
+
+@dataclass(slots=True)
+class AuditIndex:
+    """Sidecar index mapping rule, severity, host and hour bucket to byte offsets.
+
+    Stored as a small SQLite file next to the log (``<audit>.idx``). It only
+    locates records: :meth:`query` re-reads every hit from the JSONL itself and
+    re-checks it against the filters, so a stale or damaged index can omit
+    results but never invent them. :meth:`catch_up` indexes whatever was
+    appended since the last indexed offset, and rebuilds from scratch if the log
+    was replaced underneath it.
+    """
+
+    log: Path
+    batch_size: int = 1000
+    _conn: sqlite3.Connection | None = field(default=None, init=False, repr=False)
+    _pending: list[Posting] = field(default_factory=list, init=False, repr=False)
+    _upto: int = field(default=0, init=False, repr=False)
+    _head: str | None = field(default=None, init=False, repr=False)
+
+    def open(self) -> None:
+        if self._conn is not None:
+            return
+        conn = sqlite3.connect(index_path(self.log), check_same_thread=False)
+        with conn:
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS postings (
+                    offset INTEGER PRIMARY KEY,
+                    rule_id TEXT,
+                    severity TEXT,
+                    host TEXT,
+                    bucket INTEGER
+                );
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_rule ON postings(rule_id, bucket)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_severity ON postings(severity, bucket)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_host ON postings(host, bucket)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_bucket ON postings(bucket)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+        self._conn = conn
+        self._upto = int(meta.get("upto", 0))
+        self._head = meta.get("head")
+
+    def _connect(self) -> sqlite3.Connection:
+        self.open()
+        assert self._conn is not None
+        return self._conn
+
+    def add(self, postings: Iterable[Posting], *, upto: int, head: str | None) -> None:
+        """Buffer postings; the log is then indexed up to byte ``upto``."""
+
+        self._pending.extend(postings)
+        self._upto = upto
+        self._head = head
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        conn = self._connect()
+        with conn:
+            if self._pending:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO postings VALUES (?, ?, ?, ?, ?)", self._pending
+                )
+            conn.executemany(
+                "INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                [("upto", str(self._upto)), ("head", self._head)],
+            )
+        self._pending.clear()
+
+    def close(self) -> None:
+        try:
+            if self._conn is not None:
+                self.flush()
+        finally:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def catch_up(self) -> None:
+        """Index records appended since the last indexed offset."""
+
+        conn = self._connect()
+        self.flush()
+        size = self.log.stat().st_size if self.log.exists() else 0
+        if self._upto:
+            found = last_record(self.log, end=self._upto) if self._upto <= size else None
+            if found is None or found[1].get("hash") != self._head:
+                # The log was truncated or replaced: start over.
+                with conn:
+                    conn.execute("DELETE FROM postings")
+                self._upto, self._head = 0, None
+        if self._upto >= size:
+            return
+
+        offset = self._upto
+        with self.log.open("rb") as f:
+            f.seek(offset)
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break  # partial line still being written
+                start = offset
+                offset += len(raw)
+                rec = decode_line(raw) if raw.strip() else None
+                p = posting(start, rec) if rec is not None else None
+                if rec is None or p is None:
+                    self.add((), upto=offset, head=self._head)
+                else:
+                    self.add([p], upto=offset, head=rec.get("hash"))
+        self.flush()
+
+    def offsets(
+        self,
+        *,
+        rule_id: str | None = None,
+        severity: str | None = None,
+        host: str | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+    ) -> list[int]:
+        where: list[str] = []
+        params: list[Any] = []
+        for col, val in (("rule_id", rule_id), ("severity", severity), ("host", host)):
+            if val is not None:
+                where.append(f"{col} = ?")
+                params.append(val)
+        if since is not None:
+            where.append("bucket >= ?")
+            params.append(_bucket(since))
+        if until is not None:
+            where.append("bucket <= ?")
+            params.append(_bucket(until))
+        sql = "SELECT offset FROM postings"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY offset"
+        return [o for (o,) in self._connect().execute(sql, params)]
+
+    def query(
+        self,
+        *,
+        rule_id: str | None = None,
+        severity: str | None = None,
+        host: str | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        limit: int | None = None,
+    ) -> Iterator[dict]:
+        """Yield matching records in log order, read from the JSONL by offset.
+
+        A missing log has no records (and gets no index file).
+        """
+
+        if not self.log.exists():
+            return
+        self.catch_up()
+        offsets = self.offsets(
+            rule_id=rule_id, severity=severity, host=host, since=since, until=until
+        )
+        n = 0
+        with self.log.open("rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                rec = decode_line(f.readline())
+                if rec is None or posting(offset, rec) is None:
+                    continue
+                det = rec["detection"]
+                if rule_id is not None and det.get("rule_id") != rule_id:
+                    continue
+                if severity is not None and det.get("severity") != severity:
+                    continue
+                if host is not None and det.get("host") != host:
+                    continue
+                if since is not None or until is not None:
+                    ts = _ts(det.get("ts"))
+                    if ts is None or (since and ts < since) or (until and ts > until):
+                        continue
+                yield rec
+                n += 1
+                if limit is not None and n >= limit:
+                    return
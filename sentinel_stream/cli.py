@@ -1,17 +1,41 @@
 from __future__ import annotations
 
 import argparse
+import signal
 import socket
+import threading
+from collections.abc import Callable, Iterable, Iterator
 from pathlib import Path
 
 from rich.console import Console
 
-from .audit import iter_records, verify_chain
-from .collectors import process_snapshot, scan_user_home
-from .detectors.ewma import EwmaConfig, ewma_detect
-from .pipeline import run_pipeline
-from .rules import load_rules, validate_rules
+from .audit import (
+    follow_records,
+    tail_records,
+    verify_parallel,
+    verify_since_checkpoint,
+)
+from .audit_index import AuditIndex, parse_time
+from .collector import (
+    ParallelScanner,
+    ProcessCollector,
+    ScheduledCollector,
+    Scheduler,
+    inotify_available,
+    process_snapshot,
+    scan_incremental,
+    scan_roots,
+    watch_roots,
+)
+from .config import Settings, load_settings
+from .detectors.ewma import EwmaConfig, EwmaDriftDetector, StreamingEwma
+from .detectors.ingest import iter_values
+from .logging import configure_logging, get_logger
+from .model import EventLike
+from .pipeline import DetectionBus, SuppressionCache, run_pipeline
+from .rules import CompiledRuleSet, load_rules, validate_rules
 from .simulate import SimConfig, synthetic_stream
+from .storage import AuditJsonlStorage, CompositeStorage, SQLiteStorage
 
 
 def cmd_rules_validate(args) -> int:
@@ -24,65 +48,289 @@ def cmd_rules_validate(args) -> int:
     return 0
 
 
+def _suppression(args, settings: Settings) -> SuppressionCache | None:
+    if args.no_suppress or not settings.suppress_enabled:
+        return None
+    return SuppressionCache(
+        ttl=settings.suppress_ttl,
+        max_entries=settings.suppress_max_entries,
+        fields=tuple(settings.suppress_fields),
+        path=settings.suppress_path,
+    )
+
+
+def _serve(settings: Settings, db: Path, bus: DetectionBus) -> Callable[[], None]:
+    """Serve the API on ``db``, live stream included, on a daemon thread; returns its stop."""
+
+    import uvicorn
+
+    from .api.app import create_app
+
+    app = create_app(settings.model_copy(update={"sqlite_path": db}), bus=bus)
+    server = uvicorn.Server(
+        uvicorn.Config(
+            app,
+            host=settings.api_host,
+            port=settings.api_port,
+            log_level="warning",
+        )
+    )
+    t = threading.Thread(target=server.run, name="api", daemon=True)
+    t.start()
+
+    def stop() -> None:
+        bus.close()
+        server.should_exit = True
+        t.join(timeout=5)
+
+    return stop
+
+
+def _run_and_report(
+    args, host: str, events: Iterable[EventLike], suppress: SuppressionCache | None = None
+) -> int:
+    settings = load_settings()
+    configure_logging(level=settings.log_level, fmt=settings.log_format)
+    rules = CompiledRuleSet(load_rules(args.rules))
+    out = Path(args.out)
+    db = Path(args.db) if args.db else settings.sqlite_path
+
+    storage = CompositeStorage(
+        (
+            SQLiteStorage(
+                db,
+                batch_size=settings.sqlite_batch_size,
+                flush_interval=settings.sqlite_flush_interval,
+                synchronous=settings.sqlite_synchronous,
+                retention_days=settings.sqlite_retention_days,
+                rollup_retention_days=settings.sqlite_rollup_retention_days,
+            ),
+            AuditJsonlStorage(
+                out,
+                fsync_policy=settings.audit_fsync_policy,
+                fsync_every=settings.audit_fsync_every,
+                fsync_interval_ms=settings.audit_fsync_interval_ms,
+                checkpoint_every=settings.audit_checkpoint_every,
+                checkpoint_key=settings.audit_checkpoint_key,
+                index=settings.audit_index,
+            ),
+        )
+    )
+    detectors = []
+    if settings.drift_enabled:
+        detectors.append(
+            EwmaDriftDetector(
+                cfg=EwmaConfig(
+                    lam=settings.drift_lam, L=settings.drift_L, warmup=settings.drift_warmup
+                ),
+                metrics=tuple(settings.drift_metrics),
+                max_keys=settings.drift_max_keys,
+            )
+        )
+
+    storage.setup()
+    if suppress is not None:
+        suppress.load()
+    bus = DetectionBus() if args.serve else None
+    stop_api = _serve(settings, db, bus) if bus is not None else None
+    try:
+        res = run_pipeline(
+            host=host,
+            events=events,
+            rules=rules,
+            storage=storage,
+            log=get_logger("sentinel_stream.run"),
+            detectors=detectors,
+            workers=args.workers,
+            suppress=suppress,
+            bus=bus,
+            flush_interval=min(
+                settings.sqlite_flush_interval, settings.audit_fsync_interval_ms / 1000.0
+            ),
+        )
+    finally:
+        if stop_api is not None:
+            stop_api()
+        storage.close()
+        if suppress is not None:
+            suppress.save()
+
+    # only the records appended since the last checkpoint are re-hashed
+    audit_ok = verify_since_checkpoint(out, key=settings.audit_checkpoint_key).ok
+    print(f"events={res.events} detections={res.detections} audit_ok={audit_ok}")
+    if suppress is not None:
+        print(f"suppressed={res.suppressed} suppress_keys={len(suppress)}")
+    return 0 if audit_ok else 3
+
+
 def cmd_run(args) -> int:
     host = args.host or socket.gethostname()
-    rules = load_rules(args.rules)
-    out = Path(args.out)
+
+    settings = load_settings()
+    roots = [Path(r) for r in args.root] or settings.scan_roots or [Path.home()]
+    exclude = [*settings.scan_exclude, *args.exclude]
+    manifest = Path(args.manifest) if args.manifest else settings.fs_manifest_path
+    if not args.once:
+        return _run_continuous(args, host, settings, roots, exclude, manifest)
+
+    scanner = ParallelScanner(
+        roots,
+        exclude=exclude,
+        workers=args.scan_workers or settings.scan_workers,
+        max_files=args.max_files,
+    )
 
     def event_stream():
         # collectors (v1): FS + process snapshot
-        yield from scan_user_home(host=host, max_files=args.max_files)
+        if args.incremental:
+            for root in roots:
+                yield from scan_incremental(
+                    root, host=host, manifest=manifest, max_changes=args.max_files, exclude=exclude
+                )
+        else:
+            yield from scan_roots(scanner, host)
         yield from process_snapshot(host=host)
 
-    res = run_pipeline(host=host, events=event_stream(), rules=rules, out_file=out)
-    print(f"events={res.events} detections={res.detections} audit_ok={res.audit_ok}")
-    return 0 if res.audit_ok else 3
+    code = _run_and_report(args, host, event_stream(), _suppression(args, settings))
+    if not args.incremental:
+        for st in scanner.stats.values():
+            print(
+                f"root={st.root} files={st.files} dirs={st.dirs} "
+                f"seconds={st.seconds:.3f} files_per_s={st.files_per_s:.0f}"
+            )
+    return code
+
+
+def _run_continuous(
+    args, host: str, settings: Settings, roots: list[Path], exclude: list[str], manifest: Path
+) -> int:
+    # One pipeline session (rules parsed once, storage kept open) fed by
+    # collectors on their own cadence until Ctrl+C / SIGTERM / --duration.
+    stop = threading.Event()
+    procs = ProcessCollector()
+
+    def fs_tick(cancelled: Callable[[], bool]) -> Iterator[EventLike]:
+        for root in roots:
+            yield from scan_incremental(
+                root,
+                host=host,
+                manifest=manifest,
+                max_changes=args.max_files,
+                exclude=exclude,
+                cancelled=cancelled,
+            )
+
+    jitter = settings.collect_jitter
+    collectors = [
+        ScheduledCollector(
+            "proc",
+            lambda cancelled: procs.collect(host),
+            args.proc_interval or settings.collect_proc_interval,
+            jitter=jitter,
+            budget=settings.collect_proc_budget,
+        ),
+        ScheduledCollector(
+            "fs",
+            fs_tick,
+            args.fs_interval or settings.collect_fs_interval,
+            jitter=jitter,
+            budget=settings.collect_fs_budget,
+            cpu_budget=settings.collect_fs_cpu_budget,
+        ),
+    ]
+    if inotify_available():
+        collectors.append(
+            ScheduledCollector(
+                "fs_watch",
+                lambda cancelled: watch_roots(
+                    roots, host=host, exclude=exclude, settle=settings.fs_watch_settle, stop=stop
+                ),
+                None,
+            )
+        )
+    scheduler = Scheduler(collectors, log=get_logger("sentinel_stream.scheduler"))
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+    code = _run_and_report(
+        args,
+        host,
+        scheduler.events(stop=stop, duration=args.duration),
+        _suppression(args, settings),
+    )
+    for name, st in scheduler.stats.items():
+        print(
+            f"collector={name} runs={st.runs} skipped={st.skipped} "
+            f"over_budget={st.over_budget} failed={st.failed} events={st.events}"
+        )
+    return code
 
 
 def cmd_audit_tail(args) -> int:
     c = Console()
-    file = Path(args.file)
-    rows = list(iter_records(file))[-args.n :]
-    for r in rows:
+    for r in tail_records(Path(args.file), args.n):
         c.print(r)
     return 0
 
 
+def cmd_audit_follow(args) -> int:
+    c = Console()
+    try:
+        for r in follow_records(
+            Path(args.file), from_start=args.from_start, poll_interval=args.interval
+        ):
+            c.print(r)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def cmd_audit_query(args) -> int:
+    c = Console()
+    idx = AuditIndex(Path(args.file))
+    try:
+        for r in idx.query(
+            rule_id=args.rule,
+            severity=args.severity,
+            host=args.host,
+            since=parse_time(args.since) if args.since else None,
+            until=parse_time(args.until) if args.until else None,
+            limit=args.limit,
+        ):
+            c.print(r)
+    finally:
+        idx.close()
+    return 0
+
+
 def cmd_audit_verify(args) -> int:
-    ok = verify_chain(Path(args.file))
-    print("OK" if ok else "FAIL")
-    return 0 if ok else 4
+    file = Path(args.file)
+    if args.since_checkpoint:
+        key = load_settings().audit_checkpoint_key
+        st = verify_since_checkpoint(file, key=key, jobs=args.jobs)
+    else:
+        st = verify_parallel(file, jobs=args.jobs)
+    print("OK" if st.ok else f"FAIL bad_offset={st.bad_offset}")
+    return 0 if st.ok else 4
 
 
 def cmd_simulate_run(args) -> int:
     host = args.host or socket.gethostname()
-    rules = load_rules(args.rules)
-    out = Path(args.out)
-
     cfg = SimConfig(n=args.n, drift_at=args.drift_at, seed=args.seed)
-    events = synthetic_stream(cfg, host=host)
-    res = run_pipeline(host=host, events=events, rules=rules, out_file=out)
-    print(f"events={res.events} detections={res.detections} audit_ok={res.audit_ok}")
-    return 0 if res.audit_ok else 3
+    return _run_and_report(args, host, synthetic_stream(cfg, host=host))
 
 
 def cmd_drift_ewma(args) -> int:
-    # Read a newline-separated list of numbers (one per line)
-    vals = []
-    p = Path(args.input)
-    for line in p.read_text(encoding='utf-8', errors='ignore').splitlines():
-        line = line.strip()
-        if not line:
-            continue
-        try:
-            vals.append(float(line))
-        except ValueError:
-            continue
-
+    # Stream numbers in chunks (text: one per line; or .npy / raw float64)
     cfg = EwmaConfig(lam=args.lam, L=args.L, warmup=args.warmup)
-    out = ewma_detect(vals, cfg)
-    first = out['alerts'][0] if out['alerts'] else None
-    print(f"alerts={len(out['alerts'])} first_alert={first} mu0={out['mu0']:.4f} sigma0={out['sigma0']:.4f}")
+    det = StreamingEwma(cfg)
+    for chunk in iter_values(args.input, fmt=args.format, chunk_values=args.chunk_size):
+        det.feed(chunk)
+    det.finish()
+    print(
+        f"alerts={det.alerts} first_alert={det.first_alert} "
+        f"mu0={det.mu0:.4f} sigma0={det.sigma0:.4f}"
+    )
     return 0
 
 
@@ -100,8 +348,54 @@ def build_parser() -> argparse.ArgumentParser:
     run.add_argument("--rules", required=True)
     run.add_argument("--out", required=True)
     run.add_argument("--host", default=None)
-    run.add_argument("--once", action="store_true")
-    run.add_argument("--max-files", type=int, default=2000)
+    run.add_argument("--db", default=None, help="SQLite path (default: settings.sqlite_path)")
+    run.add_argument(
+        "--once",
+        action="store_true",
+        help="Collect one snapshot and exit (default: run collectors on a schedule)",
+    )
+    run.add_argument(
+        "--duration", type=float, default=None, help="Stop continuous mode after N seconds"
+    )
+    run.add_argument(
+        "--proc-interval", type=float, default=None, help="Seconds between process collections"
+    )
+    run.add_argument(
+        "--fs-interval", type=float, default=None, help="Seconds between incremental FS scans"
+    )
+    run.add_argument(
+        "--max-files",
+        type=int,
+        default=2000,
+        help="Files per snapshot; incremental scans: changes reported per scan, the rest later",
+    )
+    run.add_argument(
+        "--incremental",
+        action="store_true",
+        help="With --once: emit only files created/modified/deleted since the last run",
+    )
+    run.add_argument("--manifest", default=None, help="Stat manifest path for --incremental")
+    run.add_argument(
+        "--root",
+        action="append",
+        default=[],
+        help="Directory to scan (repeatable; default: settings.scan_roots or home)",
+    )
+    run.add_argument("--exclude", action="append", default=[], help="Exclusion glob (repeatable)")
+    run.add_argument(
+        "--no-suppress",
+        action="store_true",
+        help="Write every detection, even ones already reported within the suppression TTL",
+    )
+    run.add_argument(
+        "--serve",
+        action="store_true",
+        help="Also serve the API, with live detections at /detections/stream and /detections/ws",
+    )
+    run.add_argument("--scan-workers", type=int, default=None, help="Walker threads")
+    run.add_argument(
+        "--workers", type=int, default=1, help="Rule-evaluation processes (events sharded by key)"
+    )
     run.set_defaults(fn=cmd_run)
 
     audit = sub.add_parser("audit")
@@ -111,23 +405,60 @@ def build_parser() -> argparse.ArgumentParser:
     at.add_argument("--n", type=int, default=20)
     at.set_defaults(fn=cmd_audit_tail)
 
+    af = audit_sub.add_parser("follow")
+    af.add_argument("--file", required=True)
+    af.add_argument("--from-start", action="store_true", help="Print existing records first")
+    af.add_argument("--interval", type=float, default=0.5, help="Poll interval in seconds")
+    af.set_defaults(fn=cmd_audit_follow)
+
+    aq = audit_sub.add_parser("query")
+    aq.add_argument("--file", required=True)
+    aq.add_argument("--rule", default=None)
+    aq.add_argument("--severity", default=None, choices=["low", "medium", "high", "critical"])
+    aq.add_argument("--host", default=None)
+    aq.add_argument("--since", default=None, help="ISO timestamp or age like 30m, 12h, 7d")
+    aq.add_argument("--until", default=None, help="ISO timestamp or age like 30m, 12h, 7d")
+    aq.add_argument("--limit", type=int, default=None)
+    aq.set_defaults(fn=cmd_audit_query)
+
     av = audit_sub.add_parser("verify")
     av.add_argument("--file", required=True)
+    av.add_argument(
+        "--since-checkpoint",
+        action="store_true",
+        help="Only verify records appended after the last trusted checkpoint",
+    )
+    av.add_argument("--jobs", type=int, default=1, help="Worker processes for hashing")
     av.set_defaults(fn=cmd_audit_verify)
 
     sim = sub.add_parser("simulate")
     sim.add_argument("--rules", required=True)
     sim.add_argument("--out", required=True)
     sim.add_argument("--host", default=None)
+    sim.add_argument("--db", default=None, help="SQLite path (default: settings.sqlite_path)")
     sim.add_argument("--n", type=int, default=2000)
     sim.add_argument("--drift-at", type=int, default=1200)
     sim.add_argument("--seed", type=int, default=1337)
+    sim.add_argument(
+        "--serve",
+        action="store_true",
+        help="Also serve the API, with live detections at /detections/stream and /detections/ws",
+    )
+    sim.add_argument(
+        "--workers", type=int, default=1, help="Rule-evaluation processes (events sharded by key)"
+    )
     sim.set_defaults(fn=cmd_simulate_run)
 
     drift = sub.add_parser("drift")
     drift_sub = drift.add_subparsers(dest="drift_cmd", required=True)
     ew = drift_sub.add_parser("ewma")
-    ew.add_argument("--input", required=True, help="Text file with one numeric value per line")
+    ew.add_argument(
+        "--input",
+        required=True,
+        help="Text file with one numeric value per line, .npy, raw float64, or - for stdin",
+    )
+    ew.add_argument("--format", choices=["auto", "text", "npy", "f64"], default="auto")
+    ew.add_argument("--chunk-size", type=int, default=1 << 20, help="Max values per chunk")
     ew.add_argument("--lam", type=float, default=0.05)
     ew.add_argument("--L", type=float, default=3.0)
     ew.add_argument("--warmup", type=int, default=500)
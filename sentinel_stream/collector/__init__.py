@@ -1,4 +1,26 @@
-from .fs_scan import scan_user_home
-from .proc_snapshot import process_snapshot
+from .fs_parallel import ParallelScanner, RootStats, compile_excludes, scan_roots
+from .fs_scan import FsManifest, scan_incremental, scan_user_home, walk_files
+from .fs_watch import InotifyWatcher, inotify_available, watch_roots
+from .proc_snapshot import ProcessCollector, ProcessTree, ProcInfo, process_snapshot
+from .scheduler import CollectorStats, ScheduledCollector, Scheduler
 
-__all__ = ["process_snapshot", "scan_user_home"]
+__all__ = [
+    "CollectorStats",
+    "FsManifest",
+    "InotifyWatcher",
+    "ParallelScanner",
+    "ProcInfo",
+    "ProcessCollector",
+    "ProcessTree",
+    "RootStats",
+    "ScheduledCollector",
+    "Scheduler",
+    "compile_excludes",
+    "inotify_available",
+    "process_snapshot",
+    "scan_incremental",
+    "scan_roots",
+    "scan_user_home",
+    "walk_files",
+    "watch_roots",
+]
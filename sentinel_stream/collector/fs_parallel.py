@@ -0,0 +1,163 @@
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+
+from ..model import RawEvent
+from .fs_scan import PRUNE_DIRS, compile_excludes
+
+_DONE = object()
+# (root, entry) pairs are handed to the consumer in chunks of this size
+_CHUNK = 256
+
+
+@dataclass(slots=True)
+class RootStats:
+    root: str
+    files: int = 0
+    dirs: int = 0
+    started: float = 0.0
+    finished: float = 0.0
+
+    @property
+    def seconds(self) -> float:
+        return max(0.0, self.finished - self.started)
+
+    @property
+    def files_per_s(self) -> float:
+        return self.files / self.seconds if self.seconds > 0 else 0.0
+
+
+class ParallelScanner:
+    """Walk several roots concurrently with a pool of threads.
+
+    Directories go onto one shared work queue, so a large subtree is spread
+    over all threads (useful when ``scandir`` latency dominates, e.g. on
+    network storage). Files come back through a bounded queue; ``max_files``
+    is enforced globally and stops the walk early. Per-root counts and timing
+    are kept in :attr:`stats`. Output order is not deterministic.
+    """
+
+    def __init__(
+        self,
+        roots: Iterable[str | Path],
+        *,
+        exclude: Iterable[str] = (),
+        prune: Iterable[str] = PRUNE_DIRS,
+        workers: int = 8,
+        max_files: int | None = None,
+        queue_size: int = 64,
+    ) -> None:
+        self.roots = [os.path.abspath(r) for r in roots]
+        self.workers = max(1, workers)
+        self.max_files = max_files
+        self.queue_size = queue_size
+        self._excluded = compile_excludes(exclude)
+        self._prune = frozenset(prune)
+        self._lock = threading.Lock()
+        self.stats: dict[str, RootStats] = {}
+
+    def _put(self, out: queue.Queue, item: object, stop: threading.Event) -> None:
+        while not stop.is_set():
+            try:
+                out.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _scan_dir(
+        self, root: str, top: str, work: queue.Queue, out: queue.Queue, stop: threading.Event
+    ) -> None:
+        excluded = self._excluded
+        files: list[tuple[str, os.DirEntry]] = []
+        dirs = 0
+        try:
+            with os.scandir(top) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name in self._prune or (excluded and excluded(entry.path)):
+                                continue
+                            dirs += 1
+                            work.put((root, entry.path))
+                        elif entry.is_file(follow_symlinks=False):
+                            if excluded and excluded(entry.path):
+                                continue
+                            files.append((root, entry))
+                            if len(files) >= _CHUNK:
+                                self._put(out, files, stop)
+                                files = []
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        if files:
+            self._put(out, files, stop)
+        with self._lock:
+            st = self.stats[root]
+            st.dirs += dirs
+            st.finished = time.monotonic()
+
+    def __iter__(self) -> Iterator[tuple[str, os.DirEntry]]:
+        """Yield ``(root, entry)`` for every file under the roots."""
+
+        work: queue.Queue = queue.Queue()
+        out: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        stop = threading.Event()
+        now = time.monotonic()
+        self.stats = {}
+        for r in self.roots:
+            if r not in self.stats:
+                self.stats[r] = RootStats(r, started=now, finished=now)
+                work.put((r, r))
+
+        def worker() -> None:
+            while (item := work.get()) is not None:
+                try:
+                    if not stop.is_set():
+                        self._scan_dir(item[0], item[1], work, out, stop)
+                finally:
+                    work.task_done()
+            work.task_done()
+
+        def closer() -> None:
+            work.join()
+            for _ in threads:
+                work.put(None)
+            self._put(out, _DONE, stop)
+
+        threads = [
+            threading.Thread(target=worker, name=f"fs-scan-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for t in threads:
+            t.start()
+        done = threading.Thread(target=closer, name="fs-scan-closer", daemon=True)
+        done.start()
+
+        n = 0
+        try:
+            while (chunk := out.get()) is not _DONE:
+                for root, entry in chunk:
+                    if self.max_files is not None and n >= self.max_files:
+                        return
+                    n += 1
+                    self.stats[root].files += 1
+                    yield root, entry
+        finally:
+            stop.set()
+            done.join()
+            for t in threads:
+                t.join()
+
+
+def scan_roots(scanner: ParallelScanner, host: str) -> Iterator[RawEvent]:
+    """``fs.scan`` events for every file the scanner finds."""
+
+    for _root, entry in scanner:
+        yield RawEvent(host=host, source="fs_scan", type="fs.scan", data={"path": entry.path})
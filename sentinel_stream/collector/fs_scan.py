@@ -1,24 +1,209 @@
 from __future__ import annotations
 
+import fnmatch
 import os
-from collections.abc import Iterable
+import re
+import sqlite3
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
 from pathlib import Path
 
-from ..model import Event
+from ..model import RawEvent
 
+# skip huge/noisy dirs (not descended into)
+PRUNE_DIRS = frozenset({".git", "node_modules", ".venv", "AppData", "Library"})
 
-def scan_user_home(host: str, max_files: int = 2000) -> Iterable[Event]:
-    home = Path.home()
-    seen = 0
-    for root, _dirs, files in os.walk(home):
-        # skip huge/noisy dirs
-        parts = set(Path(root).parts)
-        if any(p in parts for p in {".git", "node_modules", ".venv", "AppData", "Library"}):
+FileStat = tuple[int, int, int]  # (inode, size, mtime_ns)
+
+
+def compile_excludes(globs: Iterable[str]) -> Callable[[str], bool] | None:
+    """One matcher for many exclusion globs.
+
+    A glob containing a path separator is matched against the full path
+    (``/proc/*``, ``*/cache/*``), any other glob against the entry name only
+    (``*.log``, ``node_modules``).
+    """
+
+    full: list[str] = []
+    name: list[str] = []
+    for g in globs:
+        (full if "/" in g or os.sep in g else name).append(fnmatch.translate(g))
+    if not full and not name:
+        return None
+    full_rx = re.compile("|".join(full)).match if full else None
+    name_rx = re.compile("|".join(name)).match if name else None
+
+    def excluded(path: str) -> bool:
+        if full_rx is not None and full_rx(path):
+            return True
+        return name_rx is not None and name_rx(os.path.basename(path)) is not None
+
+    return excluded
+
+
+def walk_files(
+    root: str | Path,
+    prune: Iterable[str] = PRUNE_DIRS,
+    exclude: Iterable[str] = (),
+    cancelled: Callable[[], bool] | None = None,
+) -> Iterator[os.DirEntry]:
+    """Yield the regular files under ``root`` with ``os.scandir``.
+
+    Directories named in ``prune`` are not descended into, and symlinks are not
+    followed. Unreadable directories are skipped. Entries matching an
+    ``exclude`` glob (see :func:`compile_excludes`) are skipped as well. The
+    walk ends early once ``cancelled()`` (checked per directory) is true.
+    """
+
+    prune = frozenset(prune)
+    excluded = compile_excludes(exclude)
+    stack = [os.fspath(root)]
+    while stack:
+        if cancelled is not None and cancelled():
+            return
+        top = stack.pop()
+        try:
+            with os.scandir(top) as it:
+                subdirs = []
+                for entry in it:
+                    try:
+                        if excluded and excluded(entry.path):
+                            continue
+                        if entry.is_dir(follow_symlinks=False):
+                            if entry.name not in prune:
+                                subdirs.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            yield entry
+                    except OSError:
+                        continue
+        except OSError:
             continue
+        stack.extend(reversed(subdirs))
+
+
+def scan_user_home(host: str, max_files: int = 2000) -> Iterable[RawEvent]:
+    seen = 0
+    for entry in walk_files(Path.home()):
+        seen += 1
+        yield RawEvent(host=host, source="fs_scan", type="fs.scan", data={"path": entry.path})
+        if seen >= max_files:
+            return
+
+
+@dataclass(slots=True)
+class FsManifest:
+    """Persisted ``path -> (inode, size, mtime_ns)`` map from the last scan.
+
+    Stored as a single SQLite table. :meth:`commit` writes only the entries
+    that changed, so a steady-state scan leaves the file untouched.
+    """
+
+    path: Path
+    _entries: dict[str, FileStat] = field(default_factory=dict, init=False, repr=False)
+
+    def load(self) -> dict[str, FileStat]:
+        self._entries = {}
+        if self.path.exists():
+            conn = self._connect()
+            try:
+                rows = conn.execute("SELECT path, inode, size, mtime_ns FROM files")
+                self._entries = {p: (i, s, m) for p, i, s, m in rows}
+            finally:
+                conn.close()
+        return self._entries
+
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                inode INTEGER,
+                size INTEGER,
+                mtime_ns INTEGER
+            ) WITHOUT ROWID;
+            """
+        )
+        return conn
+
+    def commit(self, upserts: dict[str, FileStat], deletes: Iterable[str]) -> None:
+        deletes = list(deletes)
+        if not upserts and not deletes and self.path.exists():
+            return
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                    [(p, *st) for p, st in upserts.items()],
+                )
+                conn.executemany("DELETE FROM files WHERE path = ?", [(p,) for p in deletes])
+        finally:
+            conn.close()
+        self._entries.update(upserts)
+        for p in deletes:
+            self._entries.pop(p, None)
+
+
+def _event(host: str, kind: str, path: str, st: FileStat | None) -> RawEvent:
+    data: dict = {"path": path}
+    if st is not None:
+        data.update(inode=st[0], size=st[1], mtime_ns=st[2])
+    return RawEvent(host=host, source="fs_scan", type=f"fs.{kind}", data=data)
+
+
+def scan_incremental(
+    root: str | Path,
+    *,
+    host: str,
+    manifest: Path,
+    max_changes: int | None = None,
+    prune: Iterable[str] = PRUNE_DIRS,
+    exclude: Iterable[str] = (),
+    cancelled: Callable[[], bool] | None = None,
+) -> Iterator[RawEvent]:
+    """Emit ``fs.created`` / ``fs.modified`` / ``fs.deleted`` relative to the last scan.
+
+    A file counts as modified when its inode, size or mtime changed. Stat data
+    comes from the ``DirEntry`` cache, so an unchanged tree costs one stat
+    sweep and no events. The whole tree is swept unless ``cancelled()``
+    becomes true; ``max_changes`` caps the events emitted, and changes past
+    the cap are left out of the manifest so a later scan reports them.
+    Deletions need a complete sweep. The manifest records every change
+    emitted, even when the scan is cancelled or the generator closed early,
+    so the next scan carries on instead of repeating them.
+    """
+
+    root = os.path.abspath(root)
+    m = FsManifest(Path(manifest))
+    known = m.load()
+    upserts: dict[str, FileStat] = {}
+    deleted: list[str] = []
+    seen: set[str] = set()
+    budget = max_changes if max_changes is not None else -1
+    try:
+        for entry in walk_files(root, prune, exclude, cancelled):
+            path = entry.path
+            # listed but unreadable for now: keep its manifest entry, not a deletion
+            seen.add(path)
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            cur = (st.st_ino, st.st_size, st.st_mtime_ns)
+            prev = known.get(path)
+            if prev == cur or budget == 0:
+                continue
+            budget -= 1
+            upserts[path] = cur
+            yield _event(host, "created" if prev is None else "modified", path, cur)
 
-        for fn in files:
-            p = Path(root) / fn
-            seen += 1
-            yield Event(host=host, source="fs_scan", type="fs.scan", data={"path": str(p)})
-            if seen >= max_files:
-                return
+        if cancelled is None or not cancelled():
+            base = os.path.join(root, "")
+            gone = [p for p in known if p.startswith(base) and p not in seen]
+            for path in gone if budget < 0 else gone[:budget]:
+                deleted.append(path)
+                yield _event(host, "deleted", path, None)
+    finally:
+        m.commit(upserts, deleted)
@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from ..model import RawEvent
+from .fs_scan import PRUNE_DIRS, compile_excludes
+
+# <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_ONLYDIR
+    | IN_DONT_FOLLOW
+    | IN_EXCL_UNLINK
+)
+
+_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+def _libc() -> ctypes.CDLL | None:
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+def inotify_available() -> bool:
+    return _libc() is not None
+
+
+@dataclass(slots=True)
+class _Pending:
+    kind: str  # created | modified | deleted
+    last: float
+    moved_from: str | None = None
+
+
+@dataclass(slots=True)
+class Coalescer:
+    """Folds bursts of raw file notifications into one event per path.
+
+    A path is reported once it has been quiet for ``settle`` seconds:
+
+    - create + writes → ``created``; repeated writes → one ``modified``
+    - create + delete → nothing; delete + create (atomic save) → ``modified``
+    - rename pairs (same cookie) → ``created`` at the new path, with
+      ``moved_from``; an unpaired move-out is a ``deleted``, an unpaired
+      move-in a ``created``
+    """
+
+    settle: float = 0.2
+    _pending: dict[str, _Pending] = field(default_factory=dict)
+    _moves: dict[int, tuple[str, float]] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self._pending) + len(self._moves)
+
+    def feed(self, kind: str, path: str, now: float, cookie: int = 0) -> None:
+        if kind == "moved_from":
+            self._moves[cookie] = (path, now)
+            return
+        moved_from = None
+        if kind == "moved_to":
+            src = self._moves.pop(cookie, None)
+            if src is not None:
+                moved_from = src[0]
+                self._drop_source(src[0], now)
+            kind = "created"
+
+        p = self._pending.get(path)
+        if p is None:
+            self._pending[path] = _Pending(kind, now, moved_from)
+            return
+        p.last = now
+        if kind == "deleted":
+            if p.kind == "created":
+                del self._pending[path]
+            else:
+                p.kind = "deleted"
+        elif kind == "created":
+            p.kind = "modified" if p.kind in ("deleted", "modified") else "created"
+            p.moved_from = moved_from or p.moved_from
+        # "modified" keeps created/modified as they are
+
+    def _drop_source(self, path: str, now: float) -> None:
+        p = self._pending.get(path)
+        if p is not None and p.kind == "created":
+            # created then renamed inside the window: only the new name exists
+            del self._pending[path]
+        elif p is not None:
+            p.kind, p.last = "deleted", now
+
+    def due(self, now: float, *, force: bool = False) -> list[tuple[str, str, str | None]]:
+        """``(kind, path, moved_from)`` for every path quiet for ``settle`` seconds."""
+
+        out = []
+        for cookie, (path, t) in list(self._moves.items()):
+            if force or now - t >= self.settle:
+                del self._moves[cookie]
+                self.feed("deleted", path, t)
+        for path, p in list(self._pending.items()):
+            if force or now - p.last >= self.settle:
+                del self._pending[path]
+                out.append((p.kind, path, p.moved_from))
+        return out
+
+
+class InotifyWatcher:
+    """Live file events for everything under ``roots`` (Linux only).
+
+    Every directory is watched (``prune`` names and ``exclude`` globs are
+    skipped, as in the scanners); new directories are picked up as they
+    appear, and files already inside them are reported as created. Raw
+    notifications go through a :class:`Coalescer`, so an event is emitted
+    about ``settle`` seconds after a path goes quiet. Idle cost is one
+    blocked ``select`` call.
+    """
+
+    def __init__(
+        self,
+        roots: Iterable[str | Path],
+        *,
+        exclude: Iterable[str] = (),
+        prune: Iterable[str] = PRUNE_DIRS,
+        settle: float = 0.2,
+    ) -> None:
+        libc = _libc()
+        if libc is None:
+            raise OSError("inotify is not available on this platform")
+        self._libc = libc
+        self.roots = [os.path.abspath(r) for r in roots]
+        self._excluded = compile_excludes(exclude)
+        self._prune = frozenset(prune)
+        self._coalescer = Coalescer(settle)
+        self._wds: dict[int, str] = {}
+        self.overflows = 0
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._fd = fd
+        for r in self.roots:
+            self._watch_tree(r, time.monotonic(), report=False)
+
+    def __len__(self) -> int:
+        """Number of directories currently watched."""
+
+        return len(self._wds)
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def _skip(self, path: str, name: str) -> bool:
+        return name in self._prune or bool(self._excluded and self._excluded(path))
+
+    def _add(self, path: str) -> bool:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            return False  # vanished, not a directory, or out of watches
+        self._wds[wd] = path
+        return True
+
+    def _watch_tree(self, top: str, now: float, *, report: bool) -> None:
+        stack = [top]
+        while stack:
+            d = stack.pop()
+            if not self._add(d):
+                continue
+            try:
+                with os.scandir(d) as it:
+                    for entry in it:
+                        if self._skip(entry.path, entry.name):
+                            continue
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            elif report and entry.is_file(follow_symlinks=False):
+                                self._coalescer.feed("created", entry.path, now)
+                        except OSError:
+                            continue
+            except OSError:
+                continue
+
+    def _handle(self, buf: bytes, now: float) -> None:
+        off = 0
+        while off + _HEADER.size <= len(buf):
+            wd, mask, cookie, length = _HEADER.unpack_from(buf, off)
+            name = buf[off + _HEADER.size : off + _HEADER.size + length].rstrip(b"\0")
+            off += _HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                self.overflows += 1
+                continue
+            if mask & IN_IGNORED:
+                self._wds.pop(wd, None)
+                continue
+            base = self._wds.get(wd)
+            if base is None or not name:
+                continue
+            path = os.path.join(base, os.fsdecode(name))
+            if self._skip(path, os.path.basename(path)):
+                continue
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    self._watch_tree(path, now, report=True)
+                continue
+            if mask & IN_CREATE:
+                self._coalescer.feed("created", path, now)
+            elif mask & (IN_MODIFY | IN_CLOSE_WRITE):
+                self._coalescer.feed("modified", path, now)
+            elif mask & IN_DELETE:
+                self._coalescer.feed("deleted", path, now)
+            elif mask & IN_MOVED_FROM:
+                self._coalescer.feed("moved_from", path, now, cookie)
+            elif mask & IN_MOVED_TO:
+                self._coalescer.feed("moved_to", path, now, cookie)
+
+    def changes(
+        self, *, stop: threading.Event | None = None, duration: float | None = None
+    ) -> Iterator[tuple[str, str, str | None]]:
+        """Yield ``(kind, path, moved_from)`` until ``stop`` is set or ``duration`` ends."""
+
+        settle = self._coalescer.settle
+        deadline = None if duration is None else time.monotonic() + duration
+        try:
+            while not (stop is not None and stop.is_set()):
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    break
+                timeout = settle if len(self._coalescer) else 0.5
+                if deadline is not None:
+                    timeout = min(timeout, max(0.0, deadline - now))
+                ready, _, _ = select.select([self._fd], [], [], timeout)
+                now = time.monotonic()
+                if ready:
+                    try:
+                        buf = os.read(self._fd, 1 << 16)
+                    except BlockingIOError:
+                        buf = b""
+                    self._handle(buf, now)
+                yield from self._coalescer.due(now)
+            yield from self._coalescer.due(time.monotonic(), force=True)
+        finally:
+            self.close()
+
+
+def watch_roots(
+    roots: Iterable[str | Path],
+    *,
+    host: str,
+    exclude: Iterable[str] = (),
+    settle: float = 0.2,
+    stop: threading.Event | None = None,
+    duration: float | None = None,
+) -> Iterator[RawEvent]:
+    """``fs.created`` / ``fs.modified`` / ``fs.deleted`` events from inotify, live."""
+
+    watcher = InotifyWatcher(roots, exclude=exclude, settle=settle)
+    for kind, path, moved_from in watcher.changes(stop=stop, duration=duration):
+        data: dict = {"path": path}
+        if moved_from is not None:
+            data["moved_from"] = moved_from
+        yield RawEvent(host=host, source="fs_watch", type=f"fs.{kind}", data=data)
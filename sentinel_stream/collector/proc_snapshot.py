@@ -1,10 +1,15 @@
 from __future__ import annotations
 
+import os
 import platform
 import subprocess
-from collections.abc import Iterable
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
 
-from ..model import Event
+from ..model import RawEvent
+
+# cmdline is truncated to keep events small
+_MAX_CMDLINE = 4096
 
 
 def _win_process_chain() -> list[str]:
@@ -26,24 +31,192 @@ def _win_process_chain() -> list[str]:
         return ["win32_process_snapshot_unavailable"]
 
 
-def process_snapshot(host: str) -> Iterable[Event]:
+@dataclass(slots=True)
+class ProcInfo:
+    pid: int
+    ppid: int
+    name: str
+    cmdline: str = ""
+    start: int = 0  # clock ticks after boot (field 22 of /proc/<pid>/stat)
+
+
+def read_proc(pid: int, proc_root: str = "/proc") -> ProcInfo | None:
+    """Parse ``/proc/<pid>/stat`` and ``cmdline``; ``None`` if the process is gone."""
+
+    base = f"{proc_root}/{pid}"
+    try:
+        with open(f"{base}/stat", "rb") as f:
+            raw = f.read()
+    except OSError:
+        return None
+    # comm may contain spaces and parentheses: it runs to the *last* ")"
+    lp, rp = raw.find(b"("), raw.rfind(b")")
+    rest = raw[rp + 2 :].split()
+    try:
+        ppid, start = int(rest[1]), int(rest[19])
+    except (IndexError, ValueError):
+        return None
+    try:
+        with open(f"{base}/cmdline", "rb") as f:
+            argv = f.read(_MAX_CMDLINE)
+    except OSError:
+        argv = b""
+    return ProcInfo(
+        pid=pid,
+        ppid=ppid,
+        name=raw[lp + 1 : rp].decode("utf-8", "replace"),
+        cmdline=argv.replace(b"\0", b" ").strip().decode("utf-8", "replace"),
+        start=start,
+    )
+
+
+def list_pids(proc_root: str = "/proc") -> set[int]:
+    try:
+        with os.scandir(proc_root) as it:
+            return {int(e.name) for e in it if e.name.isdigit()}
+    except OSError:
+        return set()
+
+
+def _ps_table() -> dict[int, ProcInfo]:
+    # POSIX without /proc (e.g. macOS)
+    out = subprocess.check_output(
+        ["ps", "-axo", "pid=,ppid=,comm="], text=True, encoding="utf-8", errors="replace"
+    )
+    procs = {}
+    for line in out.splitlines():
+        parts = line.split(None, 2)
+        if len(parts) == 3 and parts[0].isdigit() and parts[1].isdigit():
+            pid = int(parts[0])
+            procs[pid] = ProcInfo(pid, int(parts[1]), os.path.basename(parts[2]))
+    return procs
+
+
+@dataclass(slots=True)
+class ProcessTree:
+    """``pid -> ProcInfo`` index with memoized ancestry chains."""
+
+    procs: dict[int, ProcInfo] = field(default_factory=dict)
+    _chains: dict[int, tuple[str, ...]] = field(default_factory=dict, repr=False)
+
+    def __len__(self) -> int:
+        return len(self.procs)
+
+    def add(self, info: ProcInfo) -> None:
+        self.procs[info.pid] = info
+        self._chains.pop(info.pid, None)
+
+    def remove(self, pid: int) -> ProcInfo | None:
+        self._chains.pop(pid, None)
+        return self.procs.pop(pid, None)
+
+    def chain(self, pid: int) -> tuple[str, ...]:
+        """Process names from the oldest known ancestor down to ``pid``."""
+
+        cached = self._chains.get(pid)
+        if cached is not None:
+            return cached
+        # walk up to the first ancestor with a cached chain (or the root)
+        path: list[ProcInfo] = []
+        seen: set[int] = set()
+        cur = self.procs.get(pid)
+        prefix: tuple[str, ...] = ()
+        while cur is not None and cur.pid not in seen:
+            hit = self._chains.get(cur.pid)
+            if hit is not None:
+                prefix = hit
+                break
+            seen.add(cur.pid)
+            path.append(cur)
+            cur = self.procs.get(cur.ppid) if cur.ppid != cur.pid else None
+        for info in reversed(path):
+            prefix = (*prefix, info.name)
+            self._chains[info.pid] = prefix
+        return prefix
+
+
+class ProcessCollector:
+    """Per-process events from ``/proc``, then only start/exit deltas.
+
+    The first :meth:`collect` emits one ``proc.snapshot`` per running process;
+    later calls diff the pid list against the previous one and emit
+    ``proc.start`` / ``proc.exit``. Only new pids are read, so a tick costs a
+    directory listing plus work proportional to churn. Each event carries
+    ``data.chain``, the ancestry as ``"init -> bash -> python"``. A pid that is
+    reused between two ticks is not noticed. Processes a closed-early
+    :meth:`collect` did not get to report are reported by the next call.
+
+    Falls back to one ``ps`` call per tick where ``/proc`` is missing.
+    """
+
+    def __init__(self, proc_root: str = "/proc") -> None:
+        self.proc_root = proc_root
+        self.tree = ProcessTree()
+        self._primed = False
+
+    def _event(self, host: str, kind: str, info: ProcInfo, chain: tuple[str, ...]) -> RawEvent:
+        data = {
+            "pid": info.pid,
+            "ppid": info.ppid,
+            "name": info.name,
+            "cmdline": info.cmdline,
+            "chain": " -> ".join(chain),
+        }
+        return RawEvent(host=host, source="proc_snapshot", type=f"proc.{kind}", data=data)
+
+    def collect(self, host: str) -> Iterator[RawEvent]:
+        read: Callable[[int], ProcInfo | None]
+        if os.path.isdir(self.proc_root):
+            pids = list_pids(self.proc_root)
+            root = self.proc_root
+
+            def read(pid: int) -> ProcInfo | None:
+                return read_proc(pid, root)
+        else:
+            table = _ps_table()
+            pids = set(table)
+            read = table.get
+
+        tree = self.tree
+        kind = "start" if self._primed else "snapshot"
+        self._primed = True
+        started = []
+        for pid in sorted(pids - tree.procs.keys()):
+            info = read(pid)
+            if info is not None:
+                tree.add(info)
+                started.append(info)
+        # chains once every new process is in the tree, so parents resolve
+        done = 0
+        try:
+            for info in started:
+                done += 1
+                yield self._event(host, kind, info, tree.chain(info.pid))
+        finally:
+            # closed early (budget, shutdown): forget the processes not yet
+            # reported so the next tick reports them as started
+            for info in started[done:]:
+                tree.remove(info.pid)
+        for pid in sorted(tree.procs.keys() - pids):
+            chain = tree.chain(pid)
+            info = tree.remove(pid)
+            if info is not None:
+                yield self._event(host, "exit", info, chain)
+
+
+def process_snapshot(host: str) -> Iterable[RawEvent]:
     if platform.system().lower().startswith("win"):
         chain = " -> ".join(_win_process_chain())
-        yield Event(host=host, source="proc_snapshot", type="proc.snapshot", data={"chain": chain})
+        yield RawEvent(
+            host=host, source="proc_snapshot", type="proc.snapshot", data={"chain": chain}
+        )
         return
 
-    # POSIX: ps
+    # POSIX: one event per process
     try:
-        out = subprocess.check_output(
-            ["ps", "-eo", "ppid=,pid=,comm="],
-            text=True,
-            encoding="utf-8",
-            errors="replace",
-        )
-        sample = "\n".join(out.splitlines()[:200])
-        yield Event(host=host, source="proc_snapshot", type="proc.snapshot", data={"chain": sample})
+        yield from ProcessCollector().collect(host)
     except Exception:
-        yield Event(
+        yield RawEvent(
             host=host,
             source="proc_snapshot",
             type="proc.snapshot",
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import queue
+import random
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from dataclasses import dataclass, field
+
+from structlog import BoundLogger
+
+from ..model import EventLike
+
+
+@dataclass(slots=True)
+class ScheduledCollector:
+    """A collector run every ``interval`` seconds (``None``: once, for as long as it yields).
+
+    ``jitter`` spreads the runs by up to that fraction of the interval. A run
+    stops early once it has used ``budget`` seconds of wall time or
+    ``cpu_budget`` seconds of its thread's CPU time (wall time includes
+    waiting for the pipeline to catch up), or when the scheduler stops.
+    ``collect`` is called with a ``cancelled()`` check for that: it is
+    applied between events, and collectors that can work for long without
+    yielding (a quiet filesystem sweep) should poll it themselves.
+    """
+
+    name: str
+    collect: Callable[[Callable[[], bool]], Iterable[EventLike]]
+    interval: float | None
+    jitter: float = 0.1
+    budget: float | None = None
+    cpu_budget: float | None = None
+
+
+@dataclass(slots=True)
+class CollectorStats:
+    runs: int = 0
+    skipped: int = 0
+    over_budget: int = 0
+    failed: int = 0
+    events: int = 0
+    last_seconds: float = 0.0
+
+
+@dataclass(slots=True)
+class _TickDone:
+    name: str
+
+
+@dataclass(slots=True)
+class Scheduler:
+    """Merges periodic collector runs into one endless event stream.
+
+    Each run happens on its own thread, so a slow filesystem sweep does not
+    delay the process collector. If a collector is still running when it is
+    due again, that tick is skipped rather than queued. Events from all runs
+    go through one bounded queue, so a slow pipeline pauses the collectors.
+    Feed :meth:`events` to ``run_pipeline`` to keep rules and storage set up
+    once for the whole session.
+    """
+
+    collectors: Sequence[ScheduledCollector]
+    log: BoundLogger | None = None
+    queue_size: int = 1024
+    seed: int | None = None
+    stats: dict[str, CollectorStats] = field(default_factory=dict)
+
+    def _run(self, c: ScheduledCollector, out: queue.Queue, stop: threading.Event) -> None:
+        st = self.stats[c.name]
+        t0, cpu0 = time.monotonic(), time.thread_time()
+        over = False
+
+        def cancelled() -> bool:
+            # called from the collector's own thread, so thread_time() is its CPU
+            nonlocal over
+            if not over and (
+                (c.budget is not None and time.monotonic() - t0 > c.budget)
+                or (c.cpu_budget is not None and time.thread_time() - cpu0 > c.cpu_budget)
+            ):
+                over = True
+            return over or stop.is_set()
+
+        it: Iterator[EventLike] = iter(())
+        try:
+            it = iter(c.collect(cancelled))
+            for ev in it:
+                while not stop.is_set():
+                    try:
+                        out.put(ev, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                else:
+                    break
+                st.events += 1
+                if cancelled():
+                    break
+        except Exception:
+            st.failed += 1
+            if self.log is not None:
+                self.log.exception("collector_failed", collector=c.name)
+        finally:
+            close = getattr(it, "close", None)
+            if close is not None:
+                close()
+            st.last_seconds = time.monotonic() - t0
+            if over:
+                st.over_budget += 1
+                if self.log is not None:
+                    self.log.warning(
+                        "collector_over_budget", collector=c.name, seconds=st.last_seconds
+                    )
+            out.put(_TickDone(c.name))
+
+    def events(
+        self, *, stop: threading.Event | None = None, duration: float | None = None
+    ) -> Iterator[EventLike]:
+        """Yield events until ``stop`` is set (set by us after ``duration`` seconds).
+
+        ``stop`` should be shared with long-running collectors so they end too.
+        """
+
+        stop = stop if stop is not None else threading.Event()
+        rng = random.Random(self.seed)
+        out: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        start = time.monotonic()
+        deadline = None if duration is None else start + duration
+        due = {c.name: start for c in self.collectors}
+        running: dict[str, threading.Thread] = {}
+        self.stats = {c.name: CollectorStats() for c in self.collectors}
+
+        try:
+            while not stop.is_set():
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    break
+                for c in self.collectors:
+                    if due[c.name] > now:
+                        continue
+                    if c.interval is None:
+                        due[c.name] = float("inf")
+                    else:
+                        spread = c.interval * c.jitter
+                        due[c.name] = now + c.interval + rng.uniform(-spread, spread)
+                    if c.name in running:
+                        self.stats[c.name].skipped += 1
+                        if self.log is not None:
+                            self.log.warning("collector_tick_skipped", collector=c.name)
+                        continue
+                    self.stats[c.name].runs += 1
+                    t = threading.Thread(
+                        target=self._run, args=(c, out, stop), name=f"collect-{c.name}", daemon=True
+                    )
+                    running[c.name] = t
+                    t.start()
+
+                wait = min(due.values(), default=now + 1.0) - time.monotonic()
+                if deadline is not None:
+                    wait = min(wait, deadline - time.monotonic())
+                try:
+                    item = out.get(timeout=min(max(wait, 0.0), 0.5))
+                except queue.Empty:
+                    continue
+                while True:
+                    if isinstance(item, _TickDone):
+                        running.pop(item.name).join()
+                    else:
+                        yield item
+                    try:
+                        item = out.get_nowait()
+                    except queue.Empty:
+                        break
+            stop.set()
+            # in-flight runs notice ``stop``; pass on what they already produced
+            while running or not out.empty():
+                item = out.get()
+                if isinstance(item, _TickDone):
+                    running.pop(item.name).join()
+                else:
+                    yield item
+        finally:
+            stop.set()
+            # closed by the consumer: drop whatever is still queued
+            while running:
+                item = out.get()
+                if isinstance(item, _TickDone):
+                    running.pop(item.name).join()
@@ -30,16 +30,73 @@ class Settings(BaseSettings):
     sqlite_path: Path = Field(default_factory=lambda: Path("data") / "sentinel_stream.db")
     audit_log_path: Path = Field(default_factory=lambda: Path("data") / "audit.jsonl")
 
+    # SQLite writer: rows are committed in batches of ``sqlite_batch_size`` or
+    # every ``sqlite_flush_interval`` seconds, whichever comes first.
+    sqlite_batch_size: int = 1000
+    sqlite_flush_interval: float = 1.0
+    sqlite_synchronous: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL"
+    # Events are stored in one table per day; partitions (and detections)
+    # older than this many days are dropped. None keeps everything.
+    sqlite_retention_days: int | None = None
+    # Minute/hour rollup counters are kept separately (None: forever), so
+    # /stats can span more history than the raw rows.
+    sqlite_rollup_retention_days: int | None = None
+
+    # Audit log commit policy: always | every_n | interval | os (no fsync)
+    audit_fsync_policy: Literal["always", "every_n", "interval", "os"] = "os"
+    audit_fsync_every: int = 100
+    audit_fsync_interval_ms: float = 1000.0
+    # Checkpoint sidecar cadence (records) and optional HMAC key
+    audit_checkpoint_every: int = 1000
+    audit_checkpoint_key: str | None = None
+    # Maintain the <audit>.idx sidecar used by `audit query`
+    audit_index: bool = True
+
     # Rules
     rules_path: Path = Field(default_factory=lambda: Path("rules") / "default.yml")
 
+    # Live EWMA drift detection on telemetry.metric events, per (host, metric)
+    drift_enabled: bool = True
+    drift_metrics: list[str] = Field(default_factory=lambda: ["connections", "bytes", "entropy"])
+    drift_lam: float = 0.05
+    drift_L: float = 3.0
+    drift_warmup: int = 500
+    drift_max_keys: int = 10_000
+
     # Collector
     host: str | None = None
     max_files: int = 2000
+    # Filesystem roots to scan (home directory when empty), exclusion globs
+    # (with a "/": full path, otherwise entry name) and walker threads
+    scan_roots: list[Path] = Field(default_factory=list)
+    scan_exclude: list[str] = Field(default_factory=list)
+    scan_workers: int = 8
+    # Stat manifest used by `run --incremental`
+    fs_manifest_path: Path = Field(default_factory=lambda: Path("data") / "fs_manifest.db")
+    # Live inotify collector: seconds a path must be quiet before it is reported
+    fs_watch_settle: float = 0.2
+    # Continuous `run` (without --once): seconds between collector runs, the
+    # fraction of that to jitter by, and per-run budgets (wall / CPU seconds)
+    collect_proc_interval: float = 5.0
+    collect_fs_interval: float = 600.0
+    collect_jitter: float = 0.1
+    collect_proc_budget: float | None = 2.0
+    collect_fs_budget: float | None = 300.0
+    collect_fs_cpu_budget: float | None = 60.0
+
+    # Detection suppression for `run`: identical findings (rule, host and these
+    # event fields) are written once per TTL; the cache survives restarts
+    suppress_enabled: bool = True
+    suppress_ttl: float = 86400.0
+    suppress_max_entries: int = 100_000
+    suppress_fields: list[str] = Field(default_factory=lambda: ["data.path", "data.chain"])
+    suppress_path: Path | None = Field(default_factory=lambda: Path("data") / "suppress.db")
 
     # API
     api_host: str = "127.0.0.1"
     api_port: int = 8080
+    # read-only SQLite connections shared by API requests
+    api_read_pool: int = 4
 
 
 def load_settings() -> Settings:
@@ -1 +1,4 @@
-__all__ = ["ewma"]
+from .base import Detector
+from .ewma import EwmaConfig, EwmaDriftDetector, OnlineEwma, StreamingEwma
+
+__all__ = ["Detector", "EwmaConfig", "EwmaDriftDetector", "OnlineEwma", "StreamingEwma", "ewma"]
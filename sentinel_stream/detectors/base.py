@@ -0,0 +1,11 @@
+from __future__ import annotations
+
+from collections.abc import Iterable
+from typing import Protocol
+
+from ..model import Detection, EventLike
+
+
+class Detector(Protocol):
+    def process(self, event: EventLike) -> Iterable[Detection]:
+        """Observe one event; return any detections it triggers."""
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import sys
+from collections.abc import Iterator
+from pathlib import Path
+from typing import BinaryIO, Literal
+
+import numpy as np
+
+Format = Literal["auto", "text", "npy", "f64"]
+
+_RAW_SUFFIXES = {".f64", ".bin", ".raw"}
+
+
+def _parse_lines(lines: list[bytes]) -> np.ndarray:
+    """Parse numeric lines, skipping blank and non-numeric ones like ``float()`` would."""
+
+    lines = [ln for ln in lines if ln.strip()]
+    if not lines:
+        return np.empty(0, dtype=np.float64)
+    try:
+        return np.array(lines, dtype="S").astype(np.float64)
+    except ValueError:
+        pass
+    # Slow path: at least one line is not a number.
+    vals: list[float] = []
+    for ln in lines:
+        try:
+            vals.append(float(ln.decode("utf-8", errors="ignore").strip()))
+        except ValueError:
+            continue
+    return np.asarray(vals, dtype=np.float64)
+
+
+def iter_text_chunks(
+    stream: BinaryIO, chunk_values: int = 1 << 20, chunk_bytes: int = 1 << 23
+) -> Iterator[np.ndarray]:
+    """Yield float64 arrays of at most ``chunk_values`` from a newline-separated text stream.
+
+    The stream is read ``chunk_bytes`` at a time.
+    """
+
+    rest = b""
+    while True:
+        block = stream.read(chunk_bytes)
+        if not block:
+            break
+        lines = (rest + block).split(b"\n")
+        rest = lines.pop()
+        yield from _split(_parse_lines(lines), chunk_values)
+    yield from _split(_parse_lines([rest]), chunk_values)
+
+
+def _split(arr: np.ndarray, chunk_values: int) -> Iterator[np.ndarray]:
+    for start in range(0, arr.shape[0], chunk_values):
+        yield arr[start : start + chunk_values]
+
+
+def iter_raw_chunks(stream: BinaryIO, chunk_values: int = 1 << 20) -> Iterator[np.ndarray]:
+    """Yield float64 arrays from a raw little-endian float64 byte stream.
+
+    A trailing partial value (fewer than 8 bytes) is ignored.
+    """
+
+    rest = b""
+    while True:
+        block = stream.read(chunk_values * 8)
+        if not block:
+            break
+        buf = rest + block
+        cut = len(buf) - len(buf) % 8
+        rest = buf[cut:]
+        if cut:
+            yield np.frombuffer(buf[:cut], dtype="<f8")
+
+
+def _slices(arr: np.ndarray, chunk_values: int) -> Iterator[np.ndarray]:
+    flat = arr.reshape(-1)
+    for start in range(0, flat.shape[0], chunk_values):
+        # copy so pages of the mapping can be dropped once the chunk is done
+        yield np.array(flat[start : start + chunk_values], dtype=np.float64)
+
+
+def iter_values(
+    source: str, *, fmt: Format = "auto", chunk_values: int = 1 << 20
+) -> Iterator[np.ndarray]:
+    """Stream numeric samples from ``source`` as float64 chunks.
+
+    ``source`` is a path or ``-`` for stdin. Formats:
+
+    - ``text``: one number per line (blank and non-numeric lines are skipped)
+    - ``npy``: NumPy ``.npy`` file, memory-mapped
+    - ``f64``: raw little-endian float64, memory-mapped (streamed from stdin);
+      trailing bytes short of a whole value are ignored
+
+    ``auto`` picks ``npy`` for ``.npy``, ``f64`` for ``.f64``/``.bin``/``.raw``
+    and ``text`` otherwise (including stdin).
+    """
+
+    if fmt == "auto":
+        suffix = Path(source).suffix.lower() if source != "-" else ""
+        fmt = "npy" if suffix == ".npy" else "f64" if suffix in _RAW_SUFFIXES else "text"
+
+    if source == "-":
+        if fmt == "npy":
+            raise ValueError("npy input cannot be read from stdin")
+        stdin = sys.stdin.buffer
+        if fmt == "f64":
+            yield from iter_raw_chunks(stdin, chunk_values)
+        else:
+            yield from iter_text_chunks(stdin, chunk_values)
+        return
+
+    if fmt == "npy":
+        yield from _slices(np.load(source, mmap_mode="r"), chunk_values)
+    elif fmt == "f64":
+        n = Path(source).stat().st_size // 8
+        if not n:
+            return
+        yield from _slices(np.memmap(source, dtype="<f8", mode="r", shape=(n,)), chunk_values)
+    else:
+        with open(source, "rb") as f:
+            yield from iter_text_chunks(f, chunk_values)
@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import re
+from collections.abc import Iterable
+
+try:  # optional C automaton (pip install "sentinel-stream[fast]")
+    import ahocorasick
+except ImportError:  # pragma: no cover - depends on the environment
+    ahocorasick = None
+
+
+class LiteralSetMatcher:
+    """Find which of many literals occur in a string, in a single pass.
+
+    Uses an Aho-Corasick automaton when ``pyahocorasick`` is installed. Otherwise
+    the literals are merged into one lookahead alternation, longest first, that
+    ``re`` scans once: at each position it reports the longest literal starting
+    there, and every literal that is a prefix of a reported one is implied.
+    Either way the result equals ``{lit for lit in literals if lit in value}``.
+    """
+
+    __slots__ = ("_always", "_automaton", "_literals", "_pattern", "_prefixes")
+
+    def __init__(self, literals: Iterable[str]) -> None:
+        uniq = sorted(set(literals), key=lambda s: (-len(s), s))
+        # "" is contained in every string, including "".
+        self._always: frozenset[str] = frozenset(lit for lit in uniq if not lit)
+        self._literals: tuple[str, ...] = tuple(lit for lit in uniq if lit)
+        self._automaton = None
+        self._pattern: re.Pattern[str] | None = None
+        self._prefixes: dict[str, tuple[str, ...]] = {}
+
+        if not self._literals:
+            return
+        if ahocorasick is not None:
+            a = ahocorasick.Automaton()
+            for lit in self._literals:
+                a.add_word(lit, lit)
+            a.make_automaton()
+            self._automaton = a
+            return
+
+        alt = "|".join(re.escape(lit) for lit in self._literals)
+        self._pattern = re.compile(f"(?=({alt}))")
+        self._prefixes = {
+            lit: tuple(o for o in self._literals if o != lit and lit.startswith(o))
+            for lit in self._literals
+        }
+
+    def __len__(self) -> int:
+        return len(self._literals) + len(self._always)
+
+    def search(self, value: str) -> set[str]:
+        found = set(self._always)
+        if self._automaton is not None:
+            found.update(lit for _end, lit in self._automaton.iter(value))
+        elif self._pattern is not None:
+            for m in self._pattern.finditer(value):
+                lit = m.group(1)
+                if lit not in found:
+                    found.add(lit)
+                    found.update(self._prefixes[lit])
+        return found
+
+
+_LEADING_FLAGS = re.compile(r"\(\?([aiLmsux]+)\)")
+# Group references only make sense inside the original pattern: keep those standalone.
+_NOT_MERGEABLE = re.compile(r"\(\?P[<=]|\(\?\(|\\[1-9]")
+
+
+def _scoped(pattern: str) -> str | None:
+    """Rewrite leading global flags (``(?i)...``) as a scoped group ``(?i:...)``."""
+
+    if _NOT_MERGEABLE.search(pattern):
+        return None
+    flags = ""
+    while m := _LEADING_FLAGS.match(pattern):
+        flags += m.group(1)
+        pattern = pattern[m.end() :]
+    if not flags:
+        return f"(?:{pattern})"
+    # A trailing comment in a verbose pattern would swallow the closing paren.
+    tail = "\n" if "x" in flags else ""
+    return f"(?{flags}:{pattern}{tail})"
+
+
+class RegexSetMatcher:
+    """Find which of many regexes match a string.
+
+    Mergeable patterns are combined into one named-group alternation inside a
+    lookahead, so a single ``finditer`` pass reports a match for every pattern
+    that wins at some position. When nothing matches (the common case) that pass
+    is the whole cost. When something does, patterns that were not reported may
+    still match at a position where an earlier alternative won, so only those
+    are re-checked individually. The result equals
+    ``{p for p in patterns if re.search(p, value)}``.
+    """
+
+    __slots__ = ("_merged", "_names", "_standalone", "_unmerged")
+
+    def __init__(self, patterns: Iterable[str]) -> None:
+        uniq = list(dict.fromkeys(patterns))
+        self._standalone: dict[str, re.Pattern[str]] = {p: re.compile(p) for p in uniq}
+        self._merged: re.Pattern[str] | None = None
+        self._names: dict[str, str] = {}
+        self._unmerged = self._standalone
+
+        parts: list[str] = []
+        for p in uniq:
+            scoped = _scoped(p)
+            if scoped is None:
+                continue
+            name = f"_r{len(parts)}"
+            self._names[name] = p
+            parts.append(f"(?P<{name}>{scoped})")
+        if len(parts) < 2:
+            self._names = {}
+            return
+        try:
+            self._merged = re.compile("(?=" + "|".join(parts) + ")")
+        except re.error:
+            self._names = {}
+            return
+        merged = set(self._names.values())
+        self._unmerged = {p: rx for p, rx in self._standalone.items() if p not in merged}
+
+    def __len__(self) -> int:
+        return len(self._standalone)
+
+    def search(self, value: str) -> set[str]:
+        found: set[str] = set()
+        pending = self._standalone
+        if self._merged is not None:
+            for m in self._merged.finditer(value):
+                name = m.lastgroup
+                if name is not None:
+                    found.add(self._names[name])
+                    if len(found) == len(self._names):
+                        break
+            if found:
+                pending = {p: rx for p, rx in pending.items() if p not in found}
+            else:
+                pending = self._unmerged
+        found.update(p for p, rx in pending.items() if rx.search(value) is not None)
+        return found
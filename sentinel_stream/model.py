@@ -1,6 +1,10 @@
 from __future__ import annotations
 
+import time
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
+from itertools import islice
 from typing import Any, Literal
 
 from pydantic import BaseModel, Field
@@ -14,6 +18,137 @@ class Event(BaseModel):
     data: dict[str, Any] = Field(default_factory=dict)
 
 
+class RawEvent:
+    """Slotted event for the hot path (collectors, rules, detectors, storage).
+
+    Same fields as :class:`Event` but no validation, and ``ts`` is only
+    formatted as ISO-8601 the first time it is read. Built-in collectors
+    produce these; :meth:`to_model` converts to :class:`Event` where a pydantic
+    model is needed (e.g. inside a :class:`Detection`).
+    """
+
+    __slots__ = ("_ts", "data", "host", "source", "type")
+
+    def __init__(
+        self,
+        host: str,
+        source: str,
+        type: str,
+        data: dict[str, Any] | None = None,
+        ts: str | None = None,
+    ) -> None:
+        self.host = host
+        self.source = source
+        self.type = type
+        self.data = {} if data is None else data
+        self._ts: str | float = time.time() if ts is None else ts
+
+    @property
+    def ts(self) -> str:
+        ts = self._ts
+        if not isinstance(ts, str):
+            ts = self._ts = datetime.fromtimestamp(ts, timezone.utc).isoformat()
+        return ts
+
+    def __repr__(self) -> str:
+        return (
+            f"RawEvent(ts={self.ts!r}, host={self.host!r}, source={self.source!r}, "
+            f"type={self.type!r}, data={self.data!r})"
+        )
+
+    def to_model(self) -> Event:
+        # trusted producer: skip validation
+        return Event.model_construct(
+            ts=self.ts, host=self.host, source=self.source, type=self.type, data=self.data
+        )
+
+
+EventLike = Event | RawEvent
+
+
+def _flatten(data: dict[str, Any], prefix: str, out: dict[str, Any]) -> None:
+    for k, v in data.items():
+        if isinstance(v, dict) and v:
+            _flatten(v, f"{prefix}{k}.", out)
+        else:
+            out[prefix + k] = v
+
+
+@dataclass(slots=True)
+class EventBatch:
+    """Columnar batch of events: one list per field.
+
+    ``data`` holds one column per flattened data key (``"a.b"`` for nested
+    dicts), with ``None`` where a row lacks the key; a key whose value is
+    ``None`` is therefore not distinguishable from a missing one. Iterating
+    yields :class:`RawEvent` rows, with ``data`` re-nested.
+    """
+
+    ts: list[str]
+    host: list[str]
+    source: list[str]
+    type: list[str]
+    data: dict[str, list[Any]] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.type)
+
+    @classmethod
+    def from_events(cls, events: Iterable[EventLike]) -> EventBatch:
+        rows = list(events)
+        n = len(rows)
+        data: dict[str, list[Any]] = {}
+        for i, ev in enumerate(rows):
+            flat: dict[str, Any] = {}
+            _flatten(ev.data, "", flat)
+            for k, v in flat.items():
+                col = data.get(k)
+                if col is None:
+                    col = data[k] = [None] * n
+                col[i] = v
+        return cls(
+            ts=[ev.ts for ev in rows],
+            host=[ev.host for ev in rows],
+            source=[ev.source for ev in rows],
+            type=[ev.type for ev in rows],
+            data=data,
+        )
+
+    def row(self, i: int) -> RawEvent:
+        data: dict[str, Any] = {}
+        for key, col in self.data.items():
+            v = col[i]
+            if v is None:
+                continue
+            *path, leaf = key.split(".")
+            cur = data
+            for p in path:
+                cur = cur.setdefault(p, {})
+            cur[leaf] = v
+        return RawEvent(self.host[i], self.source[i], self.type[i], data, self.ts[i])
+
+    def __iter__(self) -> Iterator[RawEvent]:
+        return (self.row(i) for i in range(len(self)))
+
+    def rows_by_type(self) -> dict[str, list[int]]:
+        out: dict[str, list[int]] = {}
+        for i, t in enumerate(self.type):
+            out.setdefault(t, []).append(i)
+        return out
+
+
+def iter_batches(events: Iterable[EventLike], size: int = 1024) -> Iterator[EventBatch]:
+    """Group an event stream into :class:`EventBatch` chunks of ``size`` rows."""
+
+    it = iter(events)
+    while chunk := list(islice(it, size)):
+        yield EventBatch.from_events(chunk)
+
+
+def as_model(ev: EventLike) -> Event:
+    return ev if isinstance(ev, Event) else ev.to_model()
+
+
 class Detection(BaseModel):
     ts: str
     host: str
@@ -1,3 +1,5 @@
+from .bus import DetectionBus, Subscription
 from .runner import RunResult, run_pipeline
+from .suppress import SuppressionCache
 
-__all__ = ["RunResult", "run_pipeline"]
+__all__ = ["DetectionBus", "RunResult", "Subscription", "SuppressionCache", "run_pipeline"]
@@ -0,0 +1,135 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections import deque
+from collections.abc import AsyncIterator, Iterable
+
+from ..model import Detection
+
+
+class Subscription:
+    """One consumer's view of a :class:`DetectionBus`.
+
+    Detections are filtered on the publishing side and buffered here, at
+    most ``maxsize`` of them; when the consumer falls behind the oldest are
+    dropped and counted in :attr:`dropped`. Iterate it from the event loop it
+    was created on.
+    """
+
+    def __init__(
+        self,
+        bus: DetectionBus,
+        *,
+        severities: Iterable[str] = (),
+        rule_ids: Iterable[str] = (),
+        maxsize: int = 1000,
+    ) -> None:
+        self._bus = bus
+        self.severities = frozenset(severities)
+        self.rule_ids = frozenset(rule_ids)
+        self._buf: deque[Detection] = deque()
+        self._maxsize = max(1, maxsize)
+        self._lock = threading.Lock()
+        self._loop = asyncio.get_running_loop()
+        self._ready = asyncio.Event()
+        self._reported = 0
+        self.dropped = 0
+        self.delivered = 0
+        self.closed = False
+
+    def matches(self, det: Detection) -> bool:
+        return (not self.severities or det.severity in self.severities) and (
+            not self.rule_ids or det.rule_id in self.rule_ids
+        )
+
+    def _offer(self, det: Detection) -> None:
+        # any thread
+        with self._lock:
+            if len(self._buf) >= self._maxsize:
+                self._buf.popleft()
+                self.dropped += 1
+            self._buf.append(det)
+            wake = len(self._buf) == 1
+        if wake:
+            try:
+                self._loop.call_soon_threadsafe(self._ready.set)
+            except RuntimeError:  # loop closed: the consumer is gone
+                self.close()
+
+    def lag(self) -> int:
+        """Detections dropped since the last call."""
+
+        n, self._reported = self.dropped - self._reported, self.dropped
+        return n
+
+    async def get(self, timeout: float | None = None) -> Detection | None:
+        """Next detection, or ``None`` on timeout or once closed."""
+
+        while True:
+            with self._lock:
+                if self._buf:
+                    self.delivered += 1
+                    return self._buf.popleft()
+                self._ready.clear()
+            if self.closed:
+                return None
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+
+    async def __aiter__(self) -> AsyncIterator[Detection]:
+        while (det := await self.get()) is not None:
+            yield det
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self._bus._unsubscribe(self)
+            try:
+                self._loop.call_soon_threadsafe(self._ready.set)
+            except RuntimeError:
+                pass
+
+
+class DetectionBus:
+    """In-process fan-out of detections to live subscribers.
+
+    The pipeline calls :meth:`publish` after a detection has been handed to
+    storage; it never blocks, whatever the subscribers do.
+    """
+
+    def __init__(self) -> None:
+        self._subs: tuple[Subscription, ...] = ()
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def __len__(self) -> int:
+        return len(self._subs)
+
+    def subscribe(
+        self, *, severities: Iterable[str] = (), rule_ids: Iterable[str] = (), maxsize: int = 1000
+    ) -> Subscription:
+        """New subscription bound to the running event loop."""
+
+        sub = Subscription(self, severities=severities, rule_ids=rule_ids, maxsize=maxsize)
+        with self._lock:
+            self._subs = (*self._subs, sub)
+        return sub
+
+    def _unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            self._subs = tuple(s for s in self._subs if s is not sub)
+
+    def close(self) -> None:
+        """End every subscription (their streams finish once drained)."""
+
+        for sub in self._subs:
+            sub.close()
+
+    def publish(self, det: Detection) -> None:
+        self.published += 1
+        for sub in self._subs:
+            if sub.matches(det):
+                sub._offer(det)
@@ -1,34 +1,61 @@
 from __future__ import annotations
-import asyncio
-from typing import Protocol, List
-from ..model import Event
+
+from collections.abc import Awaitable, Callable
+from typing import Any, Protocol
+
+from ..model import EventLike
+
+Handler = Callable[[EventLike], Awaitable[Any]]
+
 
 class PipelineMiddleware(Protocol):
-    async def process(self, event: Event, next_call):
+    async def process(self, event: EventLike, next_call):
         ...
 
 class LoggingMiddleware:
-    async def process(self, event: Event, next_call):
+    async def process(self, event: EventLike, next_call):
         # Pre-processing
         result = await next_call(event)
         # Post-processing
         return result
 
 class EnrichmentMiddleware:
-    async def process(self, event: Event, next_call):
+    async def process(self, event: EventLike, next_call):
         # Enrich event data here
         return await next_call(event)
 
 class AsyncPipeline:
-    def __init__(self, handlers: List[PipelineMiddleware]):
+    """Middleware chain in front of a final handler.
+
+    The chain is composed once (at construction when ``final_handler`` is
+    given, otherwise on first use) rather than rebuilt for every event.
+    """
+
+    def __init__(self, handlers: list[PipelineMiddleware], final_handler: Handler | None = None):
         self.handlers = handlers
+        self._final: Handler | None = None
+        self._chain: Handler | None = None
+        if final_handler is not None:
+            self._compose(final_handler)
+
+    def _compose(self, final_handler: Handler) -> Handler:
+        chain = final_handler
+        for handler in reversed(self.handlers):
+            chain = _bind(handler, chain)
+        self._final, self._chain = final_handler, chain
+        return chain
+
+    async def execute(self, event: EventLike, final_handler: Handler | None = None):
+        chain = self._chain
+        if final_handler is not None and final_handler is not self._final:
+            chain = self._compose(final_handler)
+        if chain is None:
+            raise ValueError("AsyncPipeline has no final handler")
+        return await chain(event)
+
+
+def _bind(handler: PipelineMiddleware, next_call: Handler) -> Handler:
+    async def call(event: EventLike):
+        return await handler.process(event, next_call)
 
-    async def execute(self, event: Event, final_handler):
-        async def dispatch(index, current_event):
-            if index < len(self.handlers):
-                handler = self.handlers[index]
-                return await handler.process(current_event, lambda e: dispatch(index + 1, e))
-            else:
-                return await final_handler(current_event)
-        
-        return await dispatch(0, event)
+    return call
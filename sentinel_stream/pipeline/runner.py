@@ -1,69 +1,419 @@
 from __future__ import annotations
 
 import asyncio
-from collections.abc import Iterable, Sequence
-from dataclasses import dataclass
-from typing import List
+import queue
+import threading
+import time
+from collections.abc import Iterable, Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from dataclasses import dataclass, field
 
 from structlog import BoundLogger
 
-from ..model import Detection, Event
-from ..rules import Rule, rule_matches
+from ..detectors.base import Detector
+from ..model import Detection, EventBatch, EventLike
+from ..rules import CompiledRuleSet, Rule
 from ..storage.base import Storage
+from .bus import DetectionBus
 from .middleware import AsyncPipeline, PipelineMiddleware
+from .sharded import ShardPool, evaluate_batch, evaluate_event
+from .suppress import SuppressionCache
 
 
 @dataclass
 class RunResult:
     events: int
     detections: int
+    suppressed: int = 0
+
+
+@dataclass
+class _Writer:
+    """Writes events and detections to storage, counting detections.
+
+    Writes are flushed no later than ``flush_interval`` seconds after they
+    were handed to storage (see :meth:`wait`).
+    """
+
+    storage: Storage
+    log: BoundLogger
+    suppress: SuppressionCache | None = None
+    bus: DetectionBus | None = None
+    flush_interval: float | None = None
+    detections: int = 0
+    suppressed: int = 0
+    _due: float | None = field(default=None, repr=False)
+
+    def wait(self) -> float | None:
+        """Seconds left before :meth:`flush` is due (``None``: nothing unflushed)."""
+
+        return None if self._due is None else max(0.0, self._due - time.monotonic())
+
+    def flush(self) -> None:
+        self._due = None
+        self.storage.flush()
+
+    def write(self, ev: EventLike, dets: Iterable[Detection]) -> None:
+        if self._due is None and self.flush_interval is not None:
+            self._due = time.monotonic() + self.flush_interval
+        self.storage.write_event(ev)
+        for det in dets:
+            if self.suppress is not None and not self.suppress.allow(det):
+                self.suppressed += 1
+                continue
+            self.storage.write_detection(det)
+            if self.bus is not None:
+                self.bus.publish(det)
+            self.detections += 1
+            self.log.info(
+                "detection",
+                rule_id=det.rule_id,
+                rule_name=det.rule_name,
+                severity=det.severity,
+                source=det.event.source,
+                event_type=det.event.type,
+            )
+
+
+# Rule results of the event being evaluated by the current task; set per task
+# so the composed middleware chain can be shared by all evaluation tasks.
+_results: ContextVar[list[tuple[EventLike, list[Detection]]]] = ContextVar("_results")
+
+
+def _rows(events: Iterable[EventLike | EventBatch]) -> Iterator[EventLike]:
+    for ev in events:
+        if isinstance(ev, EventBatch):
+            yield from ev
+        else:
+            yield ev
+
+
+_END = object()
+
+
+class _Source:
+    """Pulls ``events`` on a background thread into a bounded queue.
+
+    :meth:`take` blocks for one item and then returns whatever else is ready,
+    so a live source that produces a trickle of events is never held back
+    waiting for a full chunk, while a fast one is still consumed in chunks.
+    """
+
+    def __init__(self, events: Iterable, size: int) -> None:
+        self._q: queue.Queue = queue.Queue(maxsize=max(1, size))
+        self._stop = threading.Event()
+        self._done = False
+        self._thread = threading.Thread(
+            target=self._feed, args=(iter(events),), name="pipeline-source", daemon=True
+        )
+        self._thread.start()
+
+    def _put(self, item: object) -> bool:
+        while not self._stop.is_set():
+            try:
+                self._q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _feed(self, it: Iterator) -> None:
+        try:
+            for ev in it:
+                if not self._put(ev):
+                    break
+        except BaseException as e:
+            self._put(e)
+        else:
+            self._put(_END)
+        finally:
+            close = getattr(it, "close", None)
+            if close is not None:
+                close()
+
+    def idle(self) -> bool:
+        return self._q.empty()
+
+    def take(self, n: int, timeout: float | None = None) -> list | None:
+        """Up to ``n`` items; ``[]`` once the source is exhausted, ``None`` on timeout."""
+
+        if self._done:
+            return []
+        out = []
+        try:
+            item = self._q.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        while True:
+            if item is _END:
+                self._done = True
+                break
+            if isinstance(item, BaseException):
+                self._done = True
+                raise item
+            out.append(item)
+            if len(out) >= n:
+                break
+            try:
+                item = self._q.get_nowait()
+            except queue.Empty:
+                break
+        return out
+
+    def close(self) -> None:
+        self._stop.set()
+        if not self._done:
+            try:
+                # wake a take() blocked on an empty queue
+                self._q.put_nowait(_END)
+            except queue.Full:
+                pass
 
 
 async def run_pipeline_async(
     *,
     host: str,
-    events: Iterable[Event],
-    rules: Sequence[Rule],
+    events: Iterable[EventLike | EventBatch],
+    rules: Sequence[Rule] | CompiledRuleSet,
     storage: Storage,
     log: BoundLogger,
-    middlewares: List[PipelineMiddleware] = None
+    middlewares: list[PipelineMiddleware] | None = None,
+    detectors: Sequence[Detector] = (),
+    workers: int = 1,
+    batch_size: int = 256,
+    concurrency: int = 4,
+    queue_size: int = 1024,
+    suppress: SuppressionCache | None = None,
+    bus: DetectionBus | None = None,
+    flush_interval: float | None = 1.0,
 ) -> RunResult:
-    """Run the end-to-end rule evaluation pipeline asynchronously with middleware support."""
+    """Run the end-to-end rule evaluation pipeline asynchronously with middleware support.
+
+    The pipeline is staged: the event source is drained (in a thread, since
+    collectors block) into a bounded queue, ``concurrency`` tasks run the
+    middleware chain and rules, and a single writer task hands batches of up
+    to ``batch_size`` results to a storage thread. At most ``queue_size``
+    items are in flight between source and storage, so a slow disk pauses
+    the collectors instead of growing memory. Results are written in stream
+    order.
+
+    ``events`` may mix single events and :class:`EventBatch` chunks. Without
+    middlewares a batch is evaluated as a whole with
+    :meth:`CompiledRuleSet.match_batch`; otherwise it is split into rows so
+    each middleware still sees one event at a time.
+
+    ``detectors`` are stateful stages (e.g. live EWMA drift) that see every
+    event after the rules and may emit detections of their own. They run on
+    the storage thread, in stream order.
+
+    With ``workers > 1`` rules and detectors run in a
+    :class:`~sentinel_stream.pipeline.sharded.ShardPool` instead, fed
+    ``batch_size`` events at a time after the middleware chain. This process
+    stays the only writer and emits events and detections in stream order, so
+    storage and the audit chain come out exactly as in a serial run.
+
+    ``suppress`` sits in front of storage: detections it has already seen
+    (see :class:`~sentinel_stream.pipeline.suppress.SuppressionCache`) are
+    counted in :attr:`RunResult.suppressed` instead of being written.
+    Every detection that is written is also published to ``bus``, for live
+    subscribers (see :class:`~sentinel_stream.pipeline.bus.DetectionBus`).
+
+    ``storage.flush()`` is called at most ``flush_interval`` seconds after a
+    write, even when no further events arrive, so group-commit policies do
+    not hold a lone detection back in a long-running session.
+    """
+
+    ruleset = rules if isinstance(rules, CompiledRuleSet) else CompiledRuleSet(rules)
+    writer = _Writer(storage, log, suppress, bus, flush_interval)
+    if workers > 1:
+        n = await _run_sharded(
+            host=host,
+            events=events,
+            ruleset=ruleset,
+            writer=writer,
+            middlewares=middlewares or [],
+            detectors=detectors,
+            workers=workers,
+            batch_size=batch_size,
+        )
+        return RunResult(events=n, detections=writer.detections, suppressed=writer.suppressed)
 
     ev_count = 0
-    det_count = 0
-    pipeline = AsyncPipeline(middlewares or [])
-
-    async def final_handler(ev: Event):
-        nonlocal det_count
-        storage.write_event(ev)
-        evd = ev.model_dump()
-        for r in rules:
-            if rule_matches(r, evd):
-                det = Detection(
-                    ts=ev.ts,
-                    host=host,
-                    rule_id=r.id,
-                    rule_name=r.name,
-                    severity=r.severity,
-                    event=ev,
-                )
-                storage.write_detection(det)
-                det_count += 1
-                log.info(
-                    "detection",
-                    rule_id=r.id,
-                    rule_name=r.name,
-                    severity=r.severity,
-                    source=ev.source,
-                    event_type=ev.type,
-                )
+    batch_rules = not middlewares
+    loop = asyncio.get_running_loop()
+    io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sentinel-storage")
+    inq: asyncio.Queue[tuple[int, EventLike | EventBatch] | None] = asyncio.Queue(queue_size)
+    outq: asyncio.Queue[tuple[int, list[tuple[EventLike, list[Detection]]]] | None] = asyncio.Queue(
+        queue_size
+    )
+    live = concurrency
+    # Items taken from the source but not yet written; bounds the reorder
+    # buffer as well as the queues.
+    window = asyncio.Semaphore(queue_size)
 
-    for ev in events:
-        ev_count += 1
-        await pipeline.execute(ev, final_handler)
+    async def final_handler(ev: EventLike):
+        _results.get().append((ev, evaluate_event(ev, host=host, ruleset=ruleset, detectors=())))
+
+    pipeline = AsyncPipeline(middlewares or [], final_handler)
+
+    async def produce() -> None:
+        nonlocal ev_count
+        seq = 0
+        source = _Source(events, min(64, queue_size))
+        try:
+            while chunk := await asyncio.to_thread(source.take, min(64, queue_size)):
+                for ev in chunk:
+                    await window.acquire()
+                    await inq.put((seq, ev))
+                    seq += 1
+                    ev_count += len(ev) if isinstance(ev, EventBatch) else 1
+        finally:
+            source.close()
+        for _ in range(concurrency):
+            await inq.put(None)
+
+    async def evaluate() -> None:
+        nonlocal live
+        results: list[tuple[EventLike, list[Detection]]] = []
+        _results.set(results)
+        while (item := await inq.get()) is not None:
+            seq, ev = item
+            if not isinstance(ev, EventBatch):
+                await pipeline.execute(ev)
+            elif batch_rules:
+                results.extend(evaluate_batch(ev, host=host, ruleset=ruleset))
+            else:
+                for row in ev:
+                    await pipeline.execute(row)
+            await outq.put((seq, results[:]))
+            results.clear()
+        live -= 1
+        if not live:
+            await outq.put(None)
+
+    def write(batch: list[tuple[EventLike, list[Detection]]]) -> None:
+        for ev, dets in batch:
+            for d in detectors:
+                dets.extend(d.process(ev))
+            writer.write(ev, dets)
+
+    async def next_result() -> tuple[int, list[tuple[EventLike, list[Detection]]]] | None:
+        # flush on time whether or not more results are arriving
+        while True:
+            wait = writer.wait()
+            if wait is None:
+                return await outq.get()
+            if wait > 0:
+                try:
+                    return await asyncio.wait_for(outq.get(), wait)
+                except asyncio.TimeoutError:
+                    pass
+            await loop.run_in_executor(io, writer.flush)
+
+    async def drain() -> None:
+        pending: dict[int, list[tuple[EventLike, list[Detection]]]] = {}
+        next_seq = 0
+        item = await next_result()
+        while item is not None:
+            batch: list[tuple[EventLike, list[Detection]]] = []
+            done = 0
+            while item is not None:
+                seq, res = item
+                pending[seq] = res
+                while next_seq in pending:
+                    batch.extend(pending.pop(next_seq))
+                    next_seq += 1
+                    done += 1
+                if len(batch) >= batch_size or outq.empty():
+                    break
+                item = outq.get_nowait()
+            if batch:
+                await loop.run_in_executor(io, write, batch)
+            for _ in range(done):
+                window.release()
+            if item is not None:
+                item = await next_result()
+
+    tasks = [
+        asyncio.create_task(produce()),
+        *(asyncio.create_task(evaluate()) for _ in range(concurrency)),
+        asyncio.create_task(drain()),
+    ]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        try:
+            await loop.run_in_executor(io, storage.flush)
+        finally:
+            io.shutdown()
+
+    return RunResult(events=ev_count, detections=writer.detections, suppressed=writer.suppressed)
+
+
+async def _run_sharded(
+    *,
+    host: str,
+    events: Iterable[EventLike | EventBatch],
+    ruleset: CompiledRuleSet,
+    writer: _Writer,
+    middlewares: list[PipelineMiddleware],
+    detectors: Sequence[Detector],
+    workers: int,
+    batch_size: int,
+) -> int:
+    ev_count = 0
+    batch: list[EventLike] = []
+
+    async def collect(ev: EventLike):
+        batch.append(ev)
+
+    def write(evs: list[EventLike], dets: list[list[Detection]]) -> None:
+        for ev, ev_dets in zip(evs, dets, strict=True):
+            writer.write(ev, ev_dets)
+
+    pipeline = AsyncPipeline(middlewares, collect)
+    pool = ShardPool(workers=workers, rules=list(ruleset), detectors=detectors, host=host)
+    source = _Source(_rows(events), batch_size)
+    try:
+        while True:
+            wait = writer.wait()
+            if wait == 0:
+                writer.flush()
+                wait = None
+            chunk = await asyncio.to_thread(source.take, batch_size, wait)
+            if chunk is None:  # nothing new before the flush was due
+                continue
+            if not chunk:
+                break
+            for ev in chunk:
+                ev_count += 1
+                await pipeline.execute(ev)
+                if len(batch) >= batch_size:
+                    pool.submit(batch)
+                    batch = []
+                    # bound the number of batches in flight
+                    while len(pool) > 2 * workers:
+                        write(*await asyncio.to_thread(pool.next_batch))
+            if batch and source.idle():
+                # the source is waiting (live collector): don't sit on a partial batch
+                pool.submit(batch)
+                batch = []
+                while len(pool):
+                    write(*await asyncio.to_thread(pool.next_batch))
+        if batch:
+            pool.submit(batch)
+        while len(pool):
+            write(*await asyncio.to_thread(pool.next_batch))
+    finally:
+        source.close()
+        pool.close()
+        writer.storage.flush()
+    return ev_count
 
-    return RunResult(events=ev_count, detections=det_count)
 
 def run_pipeline(*args, **kwargs) -> RunResult:
     """Synchronous wrapper for backward compatibility."""
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import multiprocessing as mp
+import queue
+import traceback
+import zlib
+from collections.abc import Sequence
+from typing import Any
+
+from ..detectors.base import Detector
+from ..model import Detection, Event, EventBatch, EventLike, RawEvent, as_model
+from ..rules import CompiledRuleSet, Rule
+
+
+def shard_key(ev: EventLike) -> str:
+    """Stable partitioning key: the file path for FS events, else host and source.
+
+    Telemetry is keyed by host alone so that every series of a host lands on
+    the same worker, which keeps per-host detector state (e.g. EWMA) whole.
+    """
+
+    path = ev.data.get("path")
+    if isinstance(path, str):
+        return f"{ev.host}\0{path}"
+    if ev.type.startswith("telemetry."):
+        return ev.host
+    return f"{ev.host}\0{ev.source}"
+
+
+def shard_of(ev: EventLike, n: int) -> int:
+    # crc32 rather than hash(): str hashes are salted per process
+    return zlib.crc32(shard_key(ev).encode("utf-8")) % n
+
+
+def evaluate_event(
+    ev: EventLike, *, host: str, ruleset: CompiledRuleSet, detectors: Sequence[Detector]
+) -> list[Detection]:
+    """Rule matches for ``ev`` followed by detector output, in emission order."""
+
+    hits = ruleset.match(ev)
+    out = []
+    if hits:
+        model = as_model(ev)
+        out = [
+            Detection(
+                ts=ev.ts,
+                host=host,
+                rule_id=r.id,
+                rule_name=r.name,
+                severity=r.severity,  # type: ignore[arg-type]
+                event=model,
+            )
+            for r in hits
+        ]
+    for d in detectors:
+        out.extend(d.process(ev))
+    return out
+
+
+def evaluate_batch(
+    batch: EventBatch, *, host: str, ruleset: CompiledRuleSet
+) -> list[tuple[RawEvent, list[Detection]]]:
+    """Rows of ``batch`` paired with their rule detections (rules only)."""
+
+    rows = list(batch)
+    out: list[tuple[RawEvent, list[Detection]]] = [(ev, []) for ev in rows]
+    models: dict[int, Event] = {}
+    for r, idx in ruleset.match_batch(batch):
+        for i in idx:
+            model = models.get(i)
+            if model is None:
+                model = models[i] = rows[i].to_model()
+            out[i][1].append(
+                Detection(
+                    ts=rows[i].ts,
+                    host=host,
+                    rule_id=r.id,
+                    rule_name=r.name,
+                    severity=r.severity,  # type: ignore[arg-type]
+                    event=model,
+                )
+            )
+    return out
+
+
+def _worker(
+    shard: int,
+    rules: list[Rule],
+    detectors: Sequence[Detector],
+    host: str,
+    inq: Any,
+    outq: Any,
+) -> None:
+    try:
+        ruleset = CompiledRuleSet(rules)
+        while (item := inq.get()) is not None:
+            batch_no, items = item
+            hits = []
+            for seq, ev in items:
+                dets = evaluate_event(ev, host=host, ruleset=ruleset, detectors=detectors)
+                if dets:
+                    hits.append((seq, dets))
+            outq.put((batch_no, shard, hits))
+    except BaseException:
+        outq.put((-1, shard, traceback.format_exc()))
+
+
+class ShardPool:
+    """Worker processes that evaluate rules on hash-partitioned event batches.
+
+    Each submitted batch is split by :func:`shard_of` so a given key always
+    goes to the same worker (and its detector instances). :meth:`next_batch`
+    returns results strictly in submission order, which lets a single writer
+    emit detections in the same order as a serial run.
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: int,
+        rules: Sequence[Rule],
+        detectors: Sequence[Detector],
+        host: str,
+    ) -> None:
+        # never fork: the parent has live threads (source feeder, storage, API)
+        ctx: mp.context.ForkServerContext | mp.context.SpawnContext
+        if "forkserver" in mp.get_all_start_methods():
+            ctx = mp.get_context("forkserver")
+        else:
+            ctx = mp.get_context("spawn")
+        self.workers = workers
+        self._outq = ctx.Queue()
+        self._inqs = [ctx.Queue() for _ in range(workers)]
+        self._procs = [
+            ctx.Process(
+                target=_worker,
+                args=(i, list(rules), list(detectors), host, self._inqs[i], self._outq),
+                daemon=True,
+            )
+            for i in range(workers)
+        ]
+        self._submitted: dict[int, list[EventLike]] = {}
+        self._parts: dict[int, list[tuple[int, list[Detection]]]] = {}
+        self._counts: dict[int, int] = {}
+        self._next_submit = 0
+        self._next_out = 0
+        for p in self._procs:
+            p.start()
+
+    def __len__(self) -> int:
+        """Number of batches submitted but not yet returned."""
+
+        return len(self._submitted)
+
+    def submit(self, events: list[EventLike]) -> None:
+        shards: list[list[tuple[int, EventLike]]] = [[] for _ in range(self.workers)]
+        for seq, ev in enumerate(events):
+            shards[shard_of(ev, self.workers)].append((seq, ev))
+        batch_no = self._next_submit
+        self._next_submit += 1
+        self._submitted[batch_no] = events
+        self._parts[batch_no] = []
+        self._counts[batch_no] = 0
+        for q, items in zip(self._inqs, shards, strict=True):
+            q.put((batch_no, items))
+
+    def _receive(self) -> None:
+        while True:
+            try:
+                batch_no, shard, payload = self._outq.get(timeout=1.0)
+                break
+            except queue.Empty:
+                dead = [p for p in self._procs if not p.is_alive()]
+                if dead:
+                    code = dead[0].exitcode
+                    raise RuntimeError(f"shard worker exited with code {code}") from None
+        if batch_no < 0:
+            raise RuntimeError(f"shard worker {shard} failed:\n{payload}")
+        self._parts[batch_no].extend(payload)
+        self._counts[batch_no] += 1
+
+    def next_batch(self) -> tuple[list[EventLike], list[list[Detection]]]:
+        """Oldest pending batch and the detections of each of its events."""
+
+        b = self._next_out
+        if b not in self._submitted:
+            raise LookupError("no batch pending")
+        while self._counts[b] < self.workers:
+            self._receive()
+        events = self._submitted.pop(b)
+        dets: list[list[Detection]] = [[] for _ in events]
+        for seq, d in self._parts.pop(b):
+            dets[seq] = d
+        del self._counts[b]
+        self._next_out += 1
+        return events, dets
+
+    def close(self) -> None:
+        for q, p in zip(self._inqs, self._procs, strict=True):
+            if p.is_alive():
+                q.put(None)
+        for p in self._procs:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+                p.join()
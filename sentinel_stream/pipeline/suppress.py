@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import sqlite3
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from ..model import Detection, Event
+
+SuppressKey = tuple[str, ...]
+
+
+def _field(event: Event, dotted: str) -> Any:
+    head, _, rest = dotted.partition(".")
+    cur: Any = getattr(event, head, None)
+    for part in rest.split(".") if rest else ():
+        if not isinstance(cur, dict):
+            return None
+        cur = cur.get(part)
+    return cur
+
+
+@dataclass(slots=True)
+class SuppressionCache:
+    """Drops detections identical to one already reported within ``ttl`` seconds.
+
+    Two detections are identical when they share rule (id and name), host and
+    the values of ``fields`` (dotted event fields, as in rules). At most
+    ``max_entries`` keys are kept, least recently seen evicted first. With a
+    ``path`` the cache is loaded from and saved to a SQLite file, so repeated
+    runs do not re-alert on the same findings.
+    """
+
+    ttl: float = 86400.0
+    max_entries: int = 100_000
+    fields: Sequence[str] = ("data.path", "data.chain")
+    path: Path | None = None
+    clock: Callable[[], float] = time.time
+    suppressed: int = 0
+    # key -> expiry (wall clock), in LRU order
+    _entries: OrderedDict[SuppressKey, float] = field(
+        default_factory=OrderedDict, init=False, repr=False
+    )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def key(self, det: Detection) -> SuppressKey:
+        ev = det.event
+        return (det.rule_id, det.rule_name, det.host, *(str(_field(ev, f)) for f in self.fields))
+
+    def allow(self, det: Detection) -> bool:
+        """``True`` if ``det`` should be written (and remember it), else count it."""
+
+        now = self.clock()
+        k = self.key(det)
+        expires = self._entries.get(k)
+        if expires is not None and expires > now:
+            self._entries.move_to_end(k)
+            self.suppressed += 1
+            return False
+        self._entries[k] = now + self.ttl
+        self._entries.move_to_end(k)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return True
+
+    def _connect(self) -> sqlite3.Connection:
+        assert self.path is not None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS suppress (
+                key TEXT PRIMARY KEY,
+                expires REAL,
+                seq INTEGER
+            ) WITHOUT ROWID;
+            """
+        )
+        return conn
+
+    def load(self) -> None:
+        if self.path is None or not self.path.exists():
+            return
+        now = self.clock()
+        conn = self._connect()
+        try:
+            rows = conn.execute(
+                "SELECT key, expires FROM suppress WHERE expires > ? ORDER BY seq", (now,)
+            ).fetchall()
+        finally:
+            conn.close()
+        self._entries = OrderedDict((tuple(k.split("\0")), e) for k, e in rows)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        now = self.clock()
+        rows = [("\0".join(k), e, i) for i, (k, e) in enumerate(self._entries.items()) if e > now]
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM suppress")
+                conn.executemany("INSERT INTO suppress VALUES (?, ?, ?)", rows)
+        finally:
+            conn.close()
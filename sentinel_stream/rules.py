@@ -1,11 +1,15 @@
 from __future__ import annotations
 
 import re
+from collections.abc import Callable, Iterable, Iterator, Mapping
 from dataclasses import dataclass
 from typing import Any
 
 import yaml
 
+from .matchers import LiteralSetMatcher, RegexSetMatcher
+from .model import EventBatch, EventLike
+
 
 @dataclass
 class Rule:
@@ -77,6 +81,270 @@ def rule_matches(rule: Rule, event: dict[str, Any]) -> bool:
     return False
 
 
+_OPS = ("contains", "regex", "equals")
+
+
+class _FieldMatcher:
+    """Every clause of a bucket that reads one field, evaluated together.
+
+    All ``contains`` literals share one :class:`LiteralSetMatcher` and all
+    regexes one :class:`RegexSetMatcher`, so a field is scanned once per event
+    regardless of how many rules test it.
+    """
+
+    __slots__ = ("_equals", "_lit_ids", "_literals", "_regexes", "_rx_ids", "parts")
+
+    def __init__(self, parts: tuple[str, ...], clauses: dict[tuple[str, str], int]) -> None:
+        self.parts = parts
+        self._lit_ids: dict[str, int] = {}
+        self._rx_ids: dict[str, int] = {}
+        self._equals: dict[str, int] = {}
+        for (op, operand), cid in clauses.items():
+            if op == "contains":
+                self._lit_ids[operand] = cid
+            elif op == "regex":
+                self._rx_ids[operand] = cid
+            else:
+                self._equals[operand] = cid
+        self._literals = LiteralSetMatcher(self._lit_ids) if self._lit_ids else None
+        self._regexes = RegexSetMatcher(self._rx_ids) if self._rx_ids else None
+
+    def collect(self, value: str, hits: set[int]) -> None:
+        if self._literals is not None:
+            hits.update(self._lit_ids[lit] for lit in self._literals.search(value))
+        if self._regexes is not None:
+            hits.update(self._rx_ids[p] for p in self._regexes.search(value))
+        cid = self._equals.get(value)
+        if cid is not None:
+            hits.add(cid)
+
+
+@dataclass(frozen=True, slots=True)
+class _CompiledRule:
+    rule: Rule
+    clauses: frozenset[int]
+    require_all: bool
+
+
+@dataclass(frozen=True, slots=True)
+class _Bucket:
+    """Rules applicable to one event type plus one matcher per field they read."""
+
+    fields: tuple[_FieldMatcher, ...]
+    rules: tuple[_CompiledRule, ...]
+
+
+def _resolve(obj: Mapping[str, Any], parts: tuple[str, ...]) -> str | None:
+    cur: Any = obj
+    for p in parts:
+        if isinstance(cur, dict) and p in cur:
+            cur = cur[p]
+        else:
+            return None
+    return None if cur is None else str(cur)
+
+
+_EVENT_FIELDS = frozenset(("ts", "host", "source", "type", "data"))
+
+
+def _resolve_attr(ev: Any, parts: tuple[str, ...]) -> str | None:
+    # Same as _resolve on the dumped event, reading the top level as attributes.
+    if parts[0] not in _EVENT_FIELDS:
+        return None
+    cur: Any = getattr(ev, parts[0])
+    for p in parts[1:]:
+        if isinstance(cur, dict) and p in cur:
+            cur = cur[p]
+        else:
+            return None
+    return None if cur is None else str(cur)
+
+
+def _clause_op(clause: dict[str, Any]) -> str | None:
+    # Same precedence as _match_clause: contains > regex > equals.
+    for op in _OPS:
+        if op in clause:
+            return op
+    return None
+
+
+class CompiledRuleSet:
+    """Rules pre-compiled for repeated evaluation.
+
+    Rules are bucketed by ``event_type`` so an event is only tested against the
+    rules for its type (plus untyped rules). Within a bucket, identical clauses
+    are shared and all clauses on the same field are answered by one
+    multi-pattern pass, which yields the set of satisfied clause ids; rules are
+    then decided by set membership. Matching semantics are identical to
+    :func:`rule_matches`, and matches are returned in rule file order.
+    """
+
+    __slots__ = ("_buckets", "_default", "_pos", "_rules")
+
+    def __init__(self, rules: Iterable[Rule]) -> None:
+        self._rules: tuple[Rule, ...] = tuple(rules)
+        typed: dict[str, list[tuple[int, Rule]]] = {}
+        untyped: list[tuple[int, Rule]] = []
+        for i, r in enumerate(self._rules):
+            if r.event_type:
+                typed.setdefault(r.event_type, []).append((i, r))
+            else:
+                untyped.append((i, r))
+
+        self._buckets: dict[str, _Bucket] = {
+            t: self._build_bucket([r for _, r in sorted(rs + untyped, key=lambda x: x[0])])
+            for t, rs in typed.items()
+        }
+        self._default = self._build_bucket([r for _, r in untyped])
+        self._pos = {id(r): i for i, r in enumerate(self._rules)}
+
+    @staticmethod
+    def _build_bucket(rules: list[Rule]) -> _Bucket:
+        by_field: dict[tuple[str, ...], dict[tuple[str, str], int]] = {}
+        n_clauses = 0
+        compiled: list[_CompiledRule] = []
+        for r in rules:
+            where = r.where or {}
+            clauses_src = where.get("any_of")
+            require_all = False
+            if not clauses_src:
+                clauses_src = where.get("all_of")
+                require_all = True
+            if not clauses_src:
+                continue
+
+            ids: set[int] = set()
+            unsatisfiable = False
+            for c in clauses_src:
+                field = c.get("field")
+                op = _clause_op(c) if field else None
+                if op is None:
+                    # A clause that can never match: drop it from any_of, and
+                    # drop the whole rule for all_of.
+                    unsatisfiable = unsatisfiable or require_all
+                    continue
+                operand = c[op] if op == "regex" else str(c[op])
+                clauses = by_field.setdefault(tuple(field.split(".")), {})
+                if (op, operand) not in clauses:
+                    clauses[(op, operand)] = n_clauses
+                    n_clauses += 1
+                ids.add(clauses[(op, operand)])
+
+            if unsatisfiable or not ids:
+                continue
+            compiled.append(_CompiledRule(r, frozenset(ids), require_all))
+
+        fields = tuple(_FieldMatcher(parts, clauses) for parts, clauses in by_field.items())
+        return _Bucket(fields=fields, rules=tuple(compiled))
+
+    def __len__(self) -> int:
+        return len(self._rules)
+
+    def __iter__(self) -> Iterator[Rule]:
+        return iter(self._rules)
+
+    def match(self, event: Mapping[str, Any] | EventLike) -> list[Rule]:
+        """Return every rule matching ``event``.
+
+        ``event`` is a dumped :class:`Event`, or an :class:`Event` /
+        :class:`RawEvent` whose fields are then read directly, without dumping.
+        """
+
+        src: Any = event
+        resolve: Callable[[Any, tuple[str, ...]], str | None]
+        if isinstance(event, Mapping):
+            etype = event.get("type", "")
+            resolve = _resolve
+        else:
+            etype = event.type
+            resolve = _resolve_attr
+        bucket = self._buckets.get(etype, self._default)
+        if not bucket.rules:
+            return []
+
+        hits: set[int] = set()
+        for fm in bucket.fields:
+            value = resolve(src, fm.parts)
+            if value is not None:
+                fm.collect(value, hits)
+        if not hits:
+            return []
+
+        return [
+            cr.rule
+            for cr in bucket.rules
+            if (cr.clauses <= hits if cr.require_all else not cr.clauses.isdisjoint(hits))
+        ]
+
+    def match_batch(self, batch: EventBatch) -> list[tuple[Rule, list[int]]]:
+        """Evaluate every rule over a whole batch.
+
+        Returns ``(rule, rows)`` for each rule with at least one matching row,
+        in rule file order, rows ascending. Rows are grouped by type; each
+        field column is then scanned once, with the matcher run once per
+        distinct value, and rules are decided on per-clause row sets.
+        """
+
+        matched: dict[int, set[int]] = {}
+        for etype, rows in batch.rows_by_type().items():
+            bucket = self._buckets.get(etype, self._default)
+            if not bucket.rules:
+                continue
+
+            clause_rows: dict[int, set[int]] = {}
+            for fm in bucket.fields:
+                col = _column(batch, fm.parts, rows)
+                seen: dict[str, set[int]] = {}
+                for i in rows:
+                    v = col[i]
+                    if v is None:
+                        continue
+                    value = str(v)
+                    ids = seen.get(value)
+                    if ids is None:
+                        ids = seen[value] = set()
+                        fm.collect(value, ids)
+                    for cid in ids:
+                        clause_rows.setdefault(cid, set()).add(i)
+            if not clause_rows:
+                continue
+
+            for cr in bucket.rules:
+                sets = [clause_rows.get(c, _NO_ROWS) for c in cr.clauses]
+                hit = set.intersection(*sets) if cr.require_all else set().union(*sets)
+                if hit:
+                    matched.setdefault(self._pos[id(cr.rule)], set()).update(hit)
+
+        return [(self._rules[pos], sorted(matched[pos])) for pos in sorted(matched)]
+
+
+_NO_ROWS: set[int] = set()
+
+
+def _column(batch: EventBatch, parts: tuple[str, ...], rows: list[int]) -> list[Any]:
+    head = parts[0]
+    if head == "data" and len(parts) > 1:
+        col = batch.data.get(".".join(parts[1:]))
+        if col is not None:
+            return col
+        prefix = ".".join(parts[1:]) + "."
+        if not any(k.startswith(prefix) for k in batch.data):
+            return [None] * len(batch)
+    elif head != "data":
+        if head in _EVENT_FIELDS and len(parts) == 1:
+            return getattr(batch, head)
+        return [None] * len(batch)
+    # Paths that stop at a nested dict (or at ``data``): resolve row by row.
+    col = [None] * len(batch)
+    for i in rows:
+        col[i] = _resolve_attr(batch.row(i), parts)
+    return col
+
+
+def compile_rules(rules: Iterable[Rule]) -> CompiledRuleSet:
+    return CompiledRuleSet(rules)
+
+
 def validate_rules(path: str) -> list[str]:
     errs: list[str] = []
     try:
@@ -95,4 +363,11 @@ def validate_rules(path: str) -> list[str]:
             errs.append(f"invalid severity: {r.id} -> {r.severity}")
         if not r.event_type:
             errs.append(f"missing event type: {r.id}")
+        where = r.where or {}
+        for c in (where.get("any_of") or []) + (where.get("all_of") or []):
+            if "regex" in c and "contains" not in c:
+                try:
+                    re.compile(c["regex"])
+                except (re.error, TypeError) as e:
+                    errs.append(f"invalid regex: {r.id} -> {e}")
     return errs
@@ -6,7 +6,7 @@ from datetime import datetime, timedelta, timezone
 
 import numpy as np
 
-from .model import Event
+from .model import EventBatch, RawEvent
 
 
 @dataclass(frozen=True)
@@ -16,18 +16,8 @@ class SimConfig:
     seed: int = 1337
 
 
-def synthetic_stream(cfg: SimConfig, host: str) -> Iterator[Event]:
-    """Generate a synthetic telemetry stream suitable for demo/testing.
-
-    - connections, bytes, entropy
-    - drift after cfg.drift_at
-    - sparse anomalies
-
-    Produces Event(type='telemetry.metric') with numeric fields in data.
-    """
-
+def _generate(cfg: SimConfig) -> dict[str, np.ndarray]:
     rng = np.random.default_rng(cfg.seed)
-    now = datetime.now(timezone.utc)
 
     connections = rng.poisson(lam=10, size=cfg.n).astype(float)
     bytes_ = np.clip(rng.normal(120_000, 35_000, size=cfg.n), 1000, None)
@@ -55,18 +45,62 @@ def synthetic_stream(cfg: SimConfig, host: str) -> Iterator[Event]:
             entropy[anom_idx] + rng.uniform(1.5, 3.0, size=len(anom_idx)), 0, 8
         )
 
+    return {
+        "connections": connections,
+        "bytes": bytes_,
+        "entropy": entropy,
+        "is_anom": y,
+        "t": np.arange(cfg.n),
+    }
+
+
+def synthetic_stream(cfg: SimConfig, host: str) -> Iterator[RawEvent]:
+    """Generate a synthetic telemetry stream suitable for demo/testing.
+
+    - connections, bytes, entropy
+    - drift after cfg.drift_at
+    - sparse anomalies
+
+    Produces RawEvent(type='telemetry.metric') with numeric fields in data.
+    """
+
+    cols = _generate(cfg)
+    now = datetime.now(timezone.utc)
     for i in range(cfg.n):
         ts = now + timedelta(seconds=i)
-        yield Event(
+        yield RawEvent(
             ts=ts.isoformat(),
             host=host,
             source="simulate",
             type="telemetry.metric",
             data={
-                "connections": float(connections[i]),
-                "bytes": float(bytes_[i]),
-                "entropy": float(entropy[i]),
-                "is_anom": int(y[i]),
+                "connections": float(cols["connections"][i]),
+                "bytes": float(cols["bytes"][i]),
+                "entropy": float(cols["entropy"][i]),
+                "is_anom": int(cols["is_anom"][i]),
                 "t": int(i),
             },
         )
+
+
+def synthetic_batches(cfg: SimConfig, host: str, size: int = 1024) -> Iterator[EventBatch]:
+    """Same stream as :func:`synthetic_stream`, emitted as columnar batches."""
+
+    cols = _generate(cfg)
+    now = datetime.now(timezone.utc)
+    for start in range(0, cfg.n, size):
+        stop = min(cfg.n, start + size)
+        n = stop - start
+        yield EventBatch(
+            ts=[(now + timedelta(seconds=i)).isoformat() for i in range(start, stop)],
+            host=[host] * n,
+            source=["simulate"] * n,
+            type=["telemetry.metric"] * n,
+            data={
+                "connections": cols["connections"][start:stop].tolist(),
+                "bytes": cols["bytes"][start:stop].tolist(),
+                "entropy": cols["entropy"][start:stop].tolist(),
+                "is_anom": cols["is_anom"][start:stop].tolist(),
+                "t": list(range(start, stop)),
+            },
+        )
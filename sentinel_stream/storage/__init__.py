@@ -1,6 +1,6 @@
 from .audit_jsonl import AuditJsonlStorage
 from .base import Storage
 from .composite import CompositeStorage
-from .sqlite import SQLiteStorage
+from .sqlite import SQLiteReader, SQLiteStorage
 
-__all__ = ["AuditJsonlStorage", "CompositeStorage", "SQLiteStorage", "Storage"]
+__all__ = ["AuditJsonlStorage", "CompositeStorage", "SQLiteReader", "SQLiteStorage", "Storage"]
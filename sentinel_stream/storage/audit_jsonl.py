@@ -1,38 +1,191 @@
 from __future__ import annotations
 
+import os
+import time
 from dataclasses import dataclass, field
 from pathlib import Path
+from typing import BinaryIO
 
-from ..audit import append_detection, verify_chain
-from ..model import Detection, Event
+from ..audit import (
+    Checkpoint,
+    encode_detection,
+    load_checkpoint,
+    verify_range,
+    write_checkpoint,
+)
+from ..audit_index import AuditIndex, Posting, make_posting
+from ..model import Detection, EventLike
+
+FSYNC_POLICIES = ("always", "every_n", "interval", "os")
 
 
 @dataclass(slots=True)
 class AuditJsonlStorage:
-    """Append-only, tamper-evident detection log (hash chain)."""
+    """Append-only, tamper-evident detection log (hash chain).
+
+    The file stays open for the lifetime of the storage. Records are hashed as
+    they arrive (so the chain is always up to date in memory) and committed to
+    disk in groups according to ``fsync_policy``:
+
+    - ``always``: write and fsync every record
+    - ``every_n``: write and fsync once ``fsync_every`` records are pending
+    - ``interval``: write and fsync once ``fsync_interval_ms`` has elapsed
+      since the last commit (checked on write)
+    - ``os``: hand every record to the OS page cache, never fsync
+
+    :meth:`flush` commits pending records regardless of policy; the pipeline
+    calls it on a timer (``flush_interval``), so a lone record in a quiet
+    session is not held back until the next one arrives.
+
+    Every ``checkpoint_every`` committed records (and on close) a checkpoint
+    sidecar is written, HMAC-signed with ``checkpoint_key`` when set. On setup
+    only the records appended after the last trusted checkpoint are verified,
+    so startup cost does not grow with the size of the log.
+
+    With ``index=True`` a sidecar :class:`~sentinel_stream.audit_index.AuditIndex`
+    is kept up to date with the offsets of committed records.
+    """
 
     path: Path
+    fsync_policy: str = "os"
+    fsync_every: int = 100
+    fsync_interval_ms: float = 1000.0
+    checkpoint_every: int = 1000
+    checkpoint_key: str | None = None
+    index: bool = False
     _prev_hash: str | None = field(default=None, init=False, repr=False)
+    _fh: BinaryIO | None = field(default=None, init=False, repr=False)
+    _pending: list[bytes] = field(default_factory=list, init=False, repr=False)
+    # (rule_id, severity, host, ts) of each pending line, for the index
+    _pending_keys: list[tuple[str, str, str, str]] = field(
+        default_factory=list, init=False, repr=False
+    )
+    _index: AuditIndex | None = field(default=None, init=False, repr=False)
+    _last_commit: float = field(default_factory=time.monotonic, init=False, repr=False)
+    _offset: int = field(default=0, init=False, repr=False)
+    _records: int = field(default=0, init=False, repr=False)
+    _ckpt_records: int = field(default=-1, init=False, repr=False)
+    _trusted: bool = field(default=False, init=False, repr=False)
+    _needs_newline: bool = field(default=False, init=False, repr=False)
 
     def setup(self) -> None:
+        if self.fsync_policy not in FSYNC_POLICIES:
+            raise ValueError(f"invalid fsync policy: {self.fsync_policy!r}")
         self.path.parent.mkdir(parents=True, exist_ok=True)
-        # On startup, verify chain and recover last hash (best-effort).
-        if self.path.exists() and verify_chain(self.path):
-            last: str | None = None
-            for rec in self.path.read_text(encoding="utf-8", errors="replace").splitlines()[-200:]:
-                if '"hash"' in rec:
-                    last = rec
-            if last:
-                import json
-
-                try:
-                    self._prev_hash = json.loads(last).get("hash")
-                except Exception:
-                    self._prev_hash = None
-
-    def write_event(self, event: Event) -> None:
+        if self.index:
+            self._index = AuditIndex(self.path)
+            self._index.catch_up()
+        if not self.path.exists():
+            self._trusted = True
+            return
+
+        # On startup, verify the tail after the last checkpoint and recover the
+        # chain head from it.
+        ckpt = load_checkpoint(self.path, key=self.checkpoint_key)
+        start = ckpt or Checkpoint(offset=0, records=0, hash=None)
+        st = verify_range(self.path, start=start.offset, prev_hash=start.hash)
+        if not st.ok:
+            return
+        self._prev_hash = st.last_hash
+        self._records = start.records + st.records
+        self._offset = st.offset
+        self._trusted = True
+        if ckpt is not None:
+            self._ckpt_records = ckpt.records
+        if self._offset:
+            with self.path.open("rb") as f:
+                f.seek(self._offset - 1)
+                # A torn final line must not swallow the next record.
+                self._needs_newline = f.read(1) != b"\n"
+        if self._records != self._ckpt_records and not self._needs_newline:
+            self._checkpoint()
+
+    def _open(self) -> BinaryIO:
+        if self._fh is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = self.path.open("ab")
+            if self._needs_newline:
+                self._fh.write(b"\n")
+                self._offset += 1
+                self._needs_newline = False
+        return self._fh
+
+    def write_event(self, event: EventLike) -> None:
         # audit log stores detections only
         return
 
     def write_detection(self, detection: Detection) -> None:
-        self._prev_hash = append_detection(self.path, detection, self._prev_hash)
+        line, self._prev_hash = encode_detection(detection, self._prev_hash)
+        self._pending.append(line.encode("utf-8"))
+        if self._index is not None:
+            d = detection
+            self._pending_keys.append((d.rule_id, d.severity, d.host, d.ts))
+
+        policy = self.fsync_policy
+        if policy == "always":
+            self._commit(sync=True)
+        elif policy == "every_n":
+            if len(self._pending) >= self.fsync_every:
+                self._commit(sync=True)
+        elif policy == "interval":
+            if (time.monotonic() - self._last_commit) * 1000.0 >= self.fsync_interval_ms:
+                self._commit(sync=True)
+        else:
+            self._commit(sync=False)
+
+    def _commit(self, *, sync: bool) -> None:
+        fh = self._open()
+        if self._pending:
+            data = b"".join(self._pending)
+            fh.write(data)
+            postings = self._postings(self._offset) if self._index is not None else []
+            self._offset += len(data)
+            self._records += len(self._pending)
+            self._pending.clear()
+            if self._index is not None:
+                self._index.add(postings, upto=self._offset, head=self._prev_hash)
+        fh.flush()
+        if sync:
+            os.fsync(fh.fileno())
+        self._last_commit = time.monotonic()
+        if self.checkpoint_every and self._records - self._ckpt_records >= self.checkpoint_every:
+            self._checkpoint()
+
+    def _postings(self, offset: int) -> list[Posting]:
+        out: list[Posting] = []
+        for line, key in zip(self._pending, self._pending_keys, strict=True):
+            out.append(make_posting(offset, *key))
+            offset += len(line)
+        self._pending_keys.clear()
+        return out
+
+    def _checkpoint(self) -> None:
+        # Never vouch for a chain that failed verification on setup.
+        if not self._trusted or not self.checkpoint_every or self._pending:
+            return
+        if not self.path.exists():
+            return
+        ckpt = Checkpoint(offset=self._offset, records=self._records, hash=self._prev_hash)
+        write_checkpoint(self.path, ckpt, key=self.checkpoint_key)
+        self._ckpt_records = self._records
+
+    def flush(self) -> None:
+        """Write out pending records (fsync unless the policy is ``os``)."""
+
+        if self._pending or self._fh is not None:
+            self._commit(sync=self.fsync_policy != "os")
+        if self._index is not None:
+            self._index.flush()
+
+    def close(self) -> None:
+        try:
+            self.flush()
+            if self._records != self._ckpt_records:
+                self._checkpoint()
+        finally:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            if self._index is not None:
+                self._index.close()
+                self._index = None
@@ -2,15 +2,21 @@ from __future__ import annotations
 
 from typing import Protocol
 
-from ..model import Detection, Event
+from ..model import Detection, EventLike
 
 
 class Storage(Protocol):
     def setup(self) -> None:
         """Initialize storage resources (tables, directories, etc.)."""
 
-    def write_event(self, event: Event) -> None:
+    def write_event(self, event: EventLike) -> None:
         """Persist a raw event."""
 
     def write_detection(self, detection: Detection) -> None:
         """Persist a detection."""
+
+    def flush(self) -> None:
+        """Make buffered writes durable (called by the pipeline at shutdown)."""
+
+    def close(self) -> None:
+        """Flush and release resources (connections, file handles)."""
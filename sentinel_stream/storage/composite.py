@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 
-from ..model import Detection, Event
+from ..model import Detection, EventLike
 from .base import Storage
 
 
@@ -16,10 +16,18 @@ class CompositeStorage:
         for s in self.storages:
             s.setup()
 
-    def write_event(self, event: Event) -> None:
+    def write_event(self, event: EventLike) -> None:
         for s in self.storages:
             s.write_event(event)
 
     def write_detection(self, detection: Detection) -> None:
         for s in self.storages:
             s.write_detection(detection)
+
+    def flush(self) -> None:
+        for s in self.storages:
+            s.flush()
+
+    def close(self) -> None:
+        for s in self.storages:
+            s.close()
@@ -1,34 +1,246 @@
 from __future__ import annotations
 
 import json
+import queue
 import sqlite3
-from dataclasses import dataclass
+import time
+from collections import Counter
+from collections.abc import Iterable, Iterator, Sequence
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from typing import Any
 
-from ..model import Detection, Event
+from ..model import Detection, EventLike
+
+SYNCHRONOUS_LEVELS = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+SCHEMA_VERSION = 2
+
+_INSERT_EVENT = "INSERT INTO {}(ts, host, source, type, data_json) VALUES (?, ?, ?, ?, ?)"
+_INSERT_DETECTION = (
+    "INSERT INTO detections(ts, host, rule_id, rule_name, severity, event_json) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+_DETECTION_COLUMNS = ("rule_id", "host", "severity")
+_VIEW_PARTITIONS = 400
+
+# rollup table and its dimensions, per kind of row counted
+ROLLUPS = {
+    "detections": ("rollup_detections", ("rule_id", "severity", "host")),
+    "events": ("rollup_events", ("host", "source", "type")),
+}
+# bucket = the ts prefix of this length ("2024-01-01T00:00" / "2024-01-01T00")
+PERIODS = {"minute": 16, "hour": 13}
+
+
+def _day(ts: str) -> str:
+    """``YYYYMMDD`` partition suffix of an ISO timestamp (today's if it isn't one)."""
+
+    d = ts[:10]
+    if len(d) == 10 and d[4] == "-" and d[7] == "-" and (day := d[:4] + d[5:7] + d[8:]).isdigit():
+        return day
+    return datetime.now(timezone.utc).strftime("%Y%m%d")
+
+
+def _partition(day: str) -> str:
+    return f"events_{day}"
+
+
+def _create_partition(conn: sqlite3.Connection, day: str) -> None:
+    t = _partition(day)
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {t} (
+            id INTEGER PRIMARY KEY,
+            ts TEXT NOT NULL,
+            host TEXT NOT NULL,
+            source TEXT NOT NULL,
+            type TEXT NOT NULL,
+            data_json TEXT NOT NULL
+        );
+        """
+    )
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {t}_ts ON {t}(ts)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {t}_host_ts ON {t}(host, ts)")
+    conn.execute(f"CREATE INDEX IF NOT EXISTS {t}_type_ts ON {t}(type, ts)")
+
+
+def _migrate_v1(conn: sqlite3.Connection) -> None:
+    # v0 kept every event in one unindexed ``events`` table: split it by day
+    legacy = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'events'"
+    ).fetchone()
+    if legacy:
+        # group rows by the partition _day() picks for them (malformed ts: today's)
+        rows = conn.execute("SELECT ts, host, source, type, data_json FROM events ORDER BY id")
+        while chunk := rows.fetchmany(10_000):
+            by_day: dict[str, list[tuple[Any, ...]]] = {}
+            for r in chunk:
+                by_day.setdefault(_day(r[0]), []).append(r)
+            for day, part in by_day.items():
+                _create_partition(conn, day)
+                conn.executemany(_INSERT_EVENT.format(_partition(day)), part)
+        conn.execute("DROP TABLE events")
+    for col in _DETECTION_COLUMNS:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS detections_{col}_ts ON detections({col}, ts)")
+    conn.execute("CREATE INDEX IF NOT EXISTS detections_ts ON detections(ts)")
+
+
+def _rollup_upsert(kind: str) -> str:
+    table, dims = ROLLUPS[kind]
+    cols = ", ".join(dims)
+    marks = ", ".join("?" * len(dims))
+    return (
+        f"INSERT INTO {table}(period, bucket, {cols}, n) VALUES (?, ?, {marks}, ?) "
+        f"ON CONFLICT(period, bucket, {cols}) DO UPDATE SET n = n + excluded.n"
+    )
+
+
+def _rollup(conn: sqlite3.Connection, kind: str, keys: Iterable[Sequence[str]]) -> None:
+    """Count each ``(ts, *dims)`` key into its minute and hour buckets."""
+
+    width = PERIODS["minute"]
+    minutes = Counter((k[0][:width], *k[1:]) for k in keys)
+    if not minutes:
+        return
+    width = PERIODS["hour"]
+    hours: Counter[tuple[str, ...]] = Counter()
+    for (bucket, *dims), n in minutes.items():
+        hours[(bucket[:width], *dims)] += n
+    conn.executemany(
+        _rollup_upsert(kind),
+        [
+            *(("minute", *k, n) for k, n in minutes.items()),
+            *(("hour", *k, n) for k, n in hours.items()),
+        ],
+    )
+
+
+def _migrate_v2(conn: sqlite3.Connection) -> None:
+    # rollup tables, backfilled from the rows already stored
+    sources = {
+        "detections": ["detections"],
+        "events": [
+            name
+            for (name,) in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB 'events_[0-9]*'"
+            )
+        ],
+    }
+    for kind, (table, dims) in ROLLUPS.items():
+        cols = ", ".join(dims)
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                period TEXT NOT NULL,
+                bucket TEXT NOT NULL,
+                {" ".join(f"{d} TEXT NOT NULL," for d in dims)}
+                n INTEGER NOT NULL,
+                PRIMARY KEY (period, bucket, {cols})
+            ) WITHOUT ROWID;
+            """
+        )
+        upsert = f"ON CONFLICT(period, bucket, {cols}) DO UPDATE SET n = n + excluded.n"
+        for src in sources[kind]:
+            conn.execute(
+                f"INSERT INTO {table}(period, bucket, {cols}, n) "
+                f"SELECT 'minute', substr(ts, 1, {PERIODS['minute']}), {cols}, count(*) "
+                f"FROM {src} WHERE true GROUP BY 2, {cols} {upsert}"
+            )
+        conn.execute(
+            f"INSERT INTO {table}(period, bucket, {cols}, n) "
+            f"SELECT 'hour', substr(bucket, 1, {PERIODS['hour']}), {cols}, sum(n) "
+            f"FROM {table} WHERE period = 'minute' GROUP BY 2, {cols} {upsert}"
+        )
+
+
+def _create_view(conn: sqlite3.Connection, days: list[str]) -> None:
+    # ``events`` stays queryable as one relation; a compound SELECT is capped
+    # at 500 terms, so only the newest partitions are included
+    conn.execute("DROP VIEW IF EXISTS events")
+    days = sorted(days)[-_VIEW_PARTITIONS:]
+    if days:
+        body = " UNION ALL ".join(
+            f"SELECT ts, host, source, type, data_json FROM {_partition(d)}" for d in days
+        )
+    else:
+        body = "SELECT '' AS ts, '' AS host, '' AS source, '' AS type, '' AS data_json LIMIT 0"
+    conn.execute(f"CREATE VIEW events AS {body}")
+
+
+def _detection_filters(
+    rule_id: str | None,
+    host: str | None,
+    severity: str | None,
+    since: str | None,
+    until: str | None,
+) -> tuple[list[str], list[Any]]:
+    where: list[str] = []
+    params: list[Any] = []
+    for col, val in (("rule_id", rule_id), ("host", host), ("severity", severity)):
+        if val is not None:
+            where.append(f"{col} = ?")
+            params.append(val)
+    if since is not None:
+        where.append("ts >= ?")
+        params.append(since)
+    if until is not None:
+        where.append("ts < ?")
+        params.append(until)
+    return where, params
+
+
+# _MIGRATIONS[n] upgrades a database from user_version n to n + 1
+_MIGRATIONS = (_migrate_v1, _migrate_v2)
 
 
 @dataclass(slots=True)
 class SQLiteStorage:
+    """SQLite event/detection history.
+
+    Writes go through one long-lived WAL connection. Rows are buffered and
+    committed together with ``executemany`` once ``batch_size`` rows are pending
+    or ``flush_interval`` seconds have passed since the last commit (checked on
+    write). The default ``batch_size=1`` commits every row. Call :meth:`flush`
+    or :meth:`close` at shutdown so buffered rows are not lost.
+
+    Events go into one table per UTC day (``events_YYYYMMDD``, by event
+    ``ts``); detections into a single ``detections`` table indexed on ``ts``
+    and on ``(rule_id | host | severity, ts)``. With ``retention_days`` set,
+    :meth:`prune` (run at setup and whenever a new day starts) drops whole
+    event partitions past the cutoff and deletes older detections through
+    the ``ts`` index. :meth:`setup` migrates older databases in place
+    (``PRAGMA user_version``). An ``events`` view spans the newest 400
+    partitions for ad-hoc SQL; :meth:`get_events` reads partitions directly.
+
+    Each flush also adds its rows to per-minute and per-hour counters
+    (``rollup_events`` by host/source/type, ``rollup_detections`` by
+    rule/severity/host) in the same transaction, so aggregates never need a
+    scan of the rows themselves. Upgrading to schema v2 backfills them once.
+    They outlive the rows: only ``rollup_retention_days`` (default: keep
+    forever) prunes them.
+    """
+
     path: Path
+    batch_size: int = 1
+    flush_interval: float = 1.0
+    synchronous: str = "NORMAL"
+    retention_days: int | None = None
+    rollup_retention_days: int | None = None
+    _conn: sqlite3.Connection | None = field(default=None, init=False, repr=False)
+    _events: list[tuple[Any, ...]] = field(default_factory=list, init=False, repr=False)
+    _detections: list[tuple[Any, ...]] = field(default_factory=list, init=False, repr=False)
+    _last_flush: float = field(default_factory=time.monotonic, init=False, repr=False)
+    _days: set[str] = field(default_factory=set, init=False, repr=False)
+    _cutoff: str = field(default="", init=False, repr=False)
 
     def setup(self) -> None:
         self.path.parent.mkdir(parents=True, exist_ok=True)
-        with sqlite3.connect(self.path) as conn:
-            conn.execute("PRAGMA journal_mode=WAL;")
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS events (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    ts TEXT NOT NULL,
-                    host TEXT NOT NULL,
-                    source TEXT NOT NULL,
-                    type TEXT NOT NULL,
-                    data_json TEXT NOT NULL
-                );
-                """
-            )
+        conn = self._connect()
+        with conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
             conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS detections (
@@ -42,57 +254,351 @@ class SQLiteStorage:
                 );
                 """
             )
+            for migrate in _MIGRATIONS[version:]:
+                migrate(conn)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._days = set(self.partitions())
+            _create_view(conn, list(self._days))
+        self.prune()
 
-    def write_event(self, event: Event) -> None:
-        with sqlite3.connect(self.path) as conn:
-            conn.execute(
-                "INSERT INTO events(ts, host, source, type, data_json) VALUES (?, ?, ?, ?, ?)",
-                (
-                    event.ts,
-                    event.host,
-                    event.source,
-                    event.type,
-                    json.dumps(event.data, ensure_ascii=False),
-                ),
+    def partitions(self) -> list[str]:
+        """Days (``YYYYMMDD``) that have an event partition, oldest first."""
+
+        rows = self._connect().execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name GLOB 'events_[0-9]*'"
+        )
+        return sorted(name.removeprefix("events_") for (name,) in rows)
+
+    def prune(self, now: datetime | None = None) -> int:
+        """Apply ``retention_days`` and ``rollup_retention_days``.
+
+        Returns the number of event partitions dropped.
+        """
+
+        now = now or datetime.now(timezone.utc)
+        conn = self._connect()
+        if self.rollup_retention_days is not None:
+            since = (now - timedelta(days=self.rollup_retention_days)).date().isoformat()
+            with conn:
+                for table, _ in ROLLUPS.values():
+                    for period in PERIODS:
+                        conn.execute(
+                            f"DELETE FROM {table} WHERE period = ? AND bucket < ?",
+                            (period, since),
+                        )
+        if self.retention_days is None:
+            return 0
+        cutoff = now - timedelta(days=self.retention_days)
+        self._cutoff = day = cutoff.strftime("%Y%m%d")
+        old = [d for d in self.partitions() if d < day]
+        with conn:
+            self._days.difference_update(old)
+            if old:
+                _create_view(conn, list(self._days))
+            for d in old:
+                conn.execute(f"DROP TABLE IF EXISTS {_partition(d)}")
+            conn.execute("DELETE FROM detections WHERE ts < ?", (cutoff.date().isoformat(),))
+        return len(old)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            level = self.synchronous.upper()
+            if level not in SYNCHRONOUS_LEVELS:
+                raise ValueError(f"invalid synchronous level: {self.synchronous!r}")
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute(f"PRAGMA synchronous={level};")
+            self._conn = conn
+        return self._conn
+
+    def _maybe_flush(self) -> None:
+        pending = len(self._events) + len(self._detections)
+        if pending >= self.batch_size or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def write_event(self, event: EventLike) -> None:
+        self._events.append(
+            (
+                event.ts,
+                event.host,
+                event.source,
+                event.type,
+                json.dumps(event.data, ensure_ascii=False),
             )
+        )
+        self._maybe_flush()
 
     def write_detection(self, detection: Detection) -> None:
-        with sqlite3.connect(self.path) as conn:
-            conn.execute(
-                (
-                    "INSERT INTO detections(ts, host, rule_id, rule_name, severity, event_json) "
-                    "VALUES (?, ?, ?, ?, ?, ?)"
-                ),
-                (
-                    detection.ts,
-                    detection.host,
-                    detection.rule_id,
-                    detection.rule_name,
-                    detection.severity,
-                    json.dumps(detection.event.model_dump(), ensure_ascii=False),
-                ),
+        self._detections.append(
+            (
+                detection.ts,
+                detection.host,
+                detection.rule_id,
+                detection.rule_name,
+                detection.severity,
+                json.dumps(detection.event.model_dump(), ensure_ascii=False),
             )
+        )
+        self._maybe_flush()
+
+    def flush(self) -> None:
+        """Commit all buffered rows in a single transaction."""
+
+        if self._events or self._detections:
+            conn = self._connect()
+            by_day: dict[str, list[tuple[Any, ...]]] = {}
+            for row in self._events:
+                day = _day(row[0])
+                if day >= self._cutoff:  # older events are already past retention
+                    by_day.setdefault(day, []).append(row)
+            new_days = by_day.keys() - self._days
+            # On failure the transaction is rolled back and rows stay buffered.
+            with conn:
+                for day in new_days:
+                    _create_partition(conn, day)
+                if new_days:
+                    _create_view(conn, [*self._days, *new_days])
+                for day, rows in by_day.items():
+                    conn.executemany(_INSERT_EVENT.format(_partition(day)), rows)
+                    _rollup(conn, "events", (r[:4] for r in rows))
+                if self._detections:
+                    conn.executemany(_INSERT_DETECTION, self._detections)
+                    _rollup(
+                        conn, "detections", ((r[0], r[2], r[4], r[1]) for r in self._detections)
+                    )
+            self._events.clear()
+            self._detections.clear()
+            if new_days:
+                self._days.update(new_days)
+                if self.retention_days is not None or self.rollup_retention_days is not None:
+                    self.prune()
+        self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def get_detections(
+        self,
+        *,
+        limit: int = 100,
+        rule_id: str | None = None,
+        host: str | None = None,
+        severity: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """Newest detections first, optionally filtered (``since`` ≤ ts < ``until``).
 
-    def get_detections(self, *, limit: int = 100) -> list[dict[str, Any]]:
+        Every filter combination is served by one of the ``(column, ts)``
+        indexes, so the cost depends on ``limit`` rather than table size.
+        """
+
+        self.flush()
+        where, params = _detection_filters(rule_id, host, severity, since, until)
+        sql = (
+            "SELECT ts, host, rule_id, rule_name, severity, event_json FROM detections"
+            + (f" WHERE {' AND '.join(where)}" if where else "")
+            + " ORDER BY ts DESC, id DESC LIMIT ?"
+        )
         with sqlite3.connect(self.path) as conn:
-            cur = conn.execute(
-                (
-                    "SELECT ts, host, rule_id, rule_name, severity, event_json "
-                    "FROM detections ORDER BY id DESC LIMIT ?"
-                ),
-                (limit,),
-            )
-            rows = cur.fetchall()
+            rows = conn.execute(sql, (*params, limit)).fetchall()
         out: list[dict[str, Any]] = []
-        for ts, host, rule_id, rule_name, severity, event_json in rows:
+        for ts, host_, rule_id_, rule_name, severity_, event_json in rows:
             out.append(
                 {
                     "ts": ts,
-                    "host": host,
-                    "rule_id": rule_id,
+                    "host": host_,
+                    "rule_id": rule_id_,
                     "rule_name": rule_name,
-                    "severity": severity,
+                    "severity": severity_,
                     "event": json.loads(event_json),
                 }
             )
         return out
+
+    def get_events(
+        self,
+        *,
+        limit: int = 100,
+        host: str | None = None,
+        type: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """Newest events first; only the day partitions overlapping the window are read."""
+
+        self.flush()
+        where, params = [], []
+        for col, val in (("host", host), ("type", type)):
+            if val is not None:
+                where.append(f"{col} = ?")
+                params.append(val)
+        if since is not None:
+            where.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("ts < ?")
+            params.append(until)
+        lo = _day(since) if since is not None else ""
+        hi = _day(until) if until is not None else "99999999"
+        out: list[dict[str, Any]] = []
+        with sqlite3.connect(self.path) as conn:
+            for day in reversed(self.partitions()):
+                if len(out) >= limit:
+                    break
+                if not lo <= day <= hi:
+                    continue
+                sql = (
+                    f"SELECT ts, host, source, type, data_json FROM {_partition(day)}"
+                    + (f" WHERE {' AND '.join(where)}" if where else "")
+                    + " ORDER BY ts DESC, id DESC LIMIT ?"
+                )
+                for ts, host_, source, type_, data_json in conn.execute(
+                    sql, (*params, limit - len(out))
+                ):
+                    out.append(
+                        {
+                            "ts": ts,
+                            "host": host_,
+                            "source": source,
+                            "type": type_,
+                            "data": json.loads(data_json),
+                        }
+                    )
+        return out
+
+
+DetectionRow = tuple[int, str, str, str, str, str, str]  # id, ts, host, rule, name, sev, json
+Cursor = tuple[str, int]  # (ts, id) of the last row of a page
+
+
+class SQLiteReader:
+    """Pool of read-only connections for serving queries next to the writer.
+
+    In WAL mode readers never block the writer (or each other), so each
+    request borrows one of ``size`` long-lived connections instead of opening
+    its own. Rows come back raw, with ``event_json`` still serialized.
+    """
+
+    def __init__(self, path: Path, *, size: int = 4) -> None:
+        self.path = path
+        self._pool: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._all: list[sqlite3.Connection] = []
+        for _ in range(max(1, size)):
+            conn = sqlite3.connect(
+                f"{self.path.resolve().as_uri()}?mode=ro", uri=True, check_same_thread=False
+            )
+            self._all.append(conn)
+            self._pool.put(conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def close(self) -> None:
+        for conn in self._all:
+            conn.close()
+        self._all.clear()
+
+    def version(self) -> tuple[int, int]:
+        """``(max id, min id)`` of ``detections``: changes on every insert or prune."""
+
+        with self.connection() as conn:
+            row = conn.execute(
+                "SELECT (SELECT max(id) FROM detections), (SELECT min(id) FROM detections)"
+            ).fetchone()
+        return row[0] or 0, row[1] or 0
+
+    def detections(
+        self,
+        *,
+        limit: int = 100,
+        rule_id: str | None = None,
+        host: str | None = None,
+        severity: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        after: Cursor | None = None,
+    ) -> tuple[list[DetectionRow], Cursor | None]:
+        """One page, newest first, and the cursor of the next page (``None`` at the end).
+
+        Keyset pagination on ``(ts, id)``: a page is an index range seek from
+        the previous page's last row, so deep pages cost the same as the first.
+        """
+
+        where, params = _detection_filters(rule_id, host, severity, since, until)
+        if after is not None:
+            where.append("(ts, id) < (?, ?)")
+            params.extend(after)
+        sql = (
+            "SELECT id, ts, host, rule_id, rule_name, severity, event_json FROM detections"
+            + (f" WHERE {' AND '.join(where)}" if where else "")
+            + " ORDER BY ts DESC, id DESC LIMIT ?"
+        )
+        with self.connection() as conn:
+            rows = conn.execute(sql, (*params, limit)).fetchall()
+        nxt = (rows[-1][1], rows[-1][0]) if len(rows) == limit else None
+        return rows, nxt
+
+    def iter_detections(self, *, page_size: int = 1000, **filters: Any) -> Iterator[DetectionRow]:
+        """Every matching row, newest first, fetched one page at a time."""
+
+        after = None
+        while True:
+            rows, after = self.detections(limit=page_size, after=after, **filters)
+            yield from rows
+            if after is None:
+                return
+
+    def stats(
+        self,
+        kind: str,
+        *,
+        period: str = "hour",
+        by: Sequence[str] = (),
+        since: str | None = None,
+        until: str | None = None,
+        **filters: str | None,
+    ) -> list[tuple[Any, ...]]:
+        """Counts per bucket (and per ``by`` dimension) from the rollup tables.
+
+        ``kind`` is ``"detections"`` or ``"events"``; ``filters`` and ``by``
+        name that kind's dimensions. Buckets run from the one containing
+        ``since`` up to, not including, the one containing ``until``. Rows are
+        ``(bucket, *by, count)``, oldest bucket first.
+        """
+
+        table, dims = ROLLUPS[kind]
+        width = PERIODS[period]
+        unknown = {*by, *filters} - set(dims)
+        if unknown:
+            raise ValueError(f"unknown {kind} dimension(s): {', '.join(sorted(unknown))}")
+        where = ["period = ?"]
+        params: list[Any] = [period]
+        for col, val in filters.items():
+            if val is not None:
+                where.append(f"{col} = ?")
+                params.append(val)
+        if since is not None:
+            where.append("bucket >= ?")
+            params.append(since[:width])
+        if until is not None:
+            where.append("bucket < ?")
+            params.append(until[:width])
+        cols = ", ".join(("bucket", *by))
+        sql = (
+            f"SELECT {cols}, sum(n) FROM {table} WHERE {' AND '.join(where)} "
+            f"GROUP BY {cols} ORDER BY {cols}"
+        )
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
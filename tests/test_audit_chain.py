@@ -1,7 +1,25 @@
+import threading
+import time
 from pathlib import Path
 
-from sentinel_stream.audit import append_detection, verify_chain
+import pytest
+
+from sentinel_stream.audit import (
+    append_detection,
+    encode_detection,
+    follow_records,
+    iter_lines_reverse,
+    iter_records,
+    load_checkpoint,
+    tail_records,
+    verify_chain,
+    verify_parallel,
+    verify_range,
+    verify_since_checkpoint,
+)
+from sentinel_stream.audit_index import AuditIndex, parse_time
 from sentinel_stream.model import Detection, Event
+from sentinel_stream.storage import AuditJsonlStorage
 
 
 def test_audit_chain_roundtrip(tmp_path: Path):
@@ -29,3 +47,219 @@ def test_audit_chain_roundtrip(tmp_path: Path):
     lines[0] = lines[0].replace("low", "critical")
     out.write_text("\n".join(lines) + "\n", encoding="utf-8")
     assert verify_chain(out) is False
+
+
+def _detection(i: int) -> Detection:
+    ev = Event(ts="2026-01-01T00:00:00Z", host="h", source="s", type="t", data={"i": i})
+    return Detection(
+        ts=ev.ts, host=ev.host, rule_id="r1", rule_name="rule", severity="low", event=ev
+    )
+
+
+@pytest.mark.parametrize("policy", ["always", "every_n", "interval", "os"])
+def test_audit_storage_group_commit_keeps_chain(tmp_path: Path, policy: str):
+    out = tmp_path / "audit.jsonl"
+    storage = AuditJsonlStorage(out, fsync_policy=policy, fsync_every=4, fsync_interval_ms=1e9)
+    storage.setup()
+    for i in range(10):
+        storage.write_detection(_detection(i))
+
+    on_disk = len(list(iter_records(out)))
+    expected = {"always": 10, "every_n": 8, "interval": 0, "os": 10}[policy]
+    assert on_disk == expected
+
+    storage.close()
+    assert len(list(iter_records(out))) == 10
+    assert verify_chain(out) is True
+
+    # a reopened storage continues the same chain
+    storage = AuditJsonlStorage(out, fsync_policy=policy)
+    storage.setup()
+    storage.write_detection(_detection(10))
+    storage.close()
+    assert verify_chain(out) is True
+
+
+def test_iter_lines_reverse_matches_forward_split(tmp_path: Path):
+    out = tmp_path / "lines.txt"
+    data = b"first\n\nsecond line\n" + b"x" * 50 + b"\nlast-no-newline"
+    out.write_bytes(data)
+
+    expected = []
+    offset = 0
+    for line in data.split(b"\n"):
+        if line.strip():
+            expected.append((offset, line))
+        offset += len(line) + 1
+
+    assert list(iter_lines_reverse(out, block_size=7)) == expected[::-1]
+    assert list(iter_lines_reverse(out, end=len(b"first\n"), block_size=3)) == [(0, b"first")]
+
+
+def test_checkpoint_limits_verification_to_tail(tmp_path: Path):
+    out = tmp_path / "audit.jsonl"
+    storage = AuditJsonlStorage(out, checkpoint_every=3, checkpoint_key="k")
+    storage.setup()
+    for i in range(5):
+        storage.write_detection(_detection(i))
+    storage.close()
+
+    ckpt = load_checkpoint(out, key="k")
+    assert ckpt is not None
+    assert ckpt.records == 5
+    assert ckpt.offset == out.stat().st_size
+    assert load_checkpoint(out, key="other") is None
+
+    # Records appended later are verified on top of the checkpoint.
+    append_detection(out, _detection(5), ckpt.hash)
+    st = verify_since_checkpoint(out, key="k")
+    assert st.ok and st.records == 6
+
+    # Tampering after the checkpoint is caught and located.
+    lines = out.read_bytes().splitlines(keepends=True)
+    lines[-1] = lines[-1].replace(b"low", b"critical")
+    out.write_bytes(b"".join(lines))
+    st = verify_since_checkpoint(out, key="k")
+    assert not st.ok
+    assert st.bad_offset == ckpt.offset
+
+    # A reopened storage does not trust (or re-checkpoint) a broken tail.
+    storage = AuditJsonlStorage(out, checkpoint_key="k")
+    storage.setup()
+    storage.close()
+    assert load_checkpoint(out, key="k") == ckpt
+
+
+def test_parallel_verify_matches_sequential(tmp_path: Path):
+    out = tmp_path / "audit.jsonl"
+    prev = None
+    for i in range(40):
+        prev = append_detection(out, _detection(i), prev)
+    lines = out.read_bytes().splitlines(keepends=True)
+
+    def both() -> tuple:
+        return (
+            verify_range(out),
+            verify_parallel(out, jobs=3, min_bytes_per_job=1),
+        )
+
+    seq, par = both()
+    assert seq.ok and seq == par
+
+    for bad in (0, 7, 23, 39):
+        tampered = list(lines)
+        tampered[bad] = tampered[bad].replace(b"low", b"high")
+        out.write_bytes(b"".join(tampered))
+        seq, par = both()
+        assert not seq.ok and seq == par
+        assert seq.bad_offset == sum(len(x) for x in lines[:bad])
+
+        dropped = lines[:bad] + lines[bad + 1 :]
+        out.write_bytes(b"".join(dropped))
+        seq, par = both()
+        assert seq == par
+        assert seq.ok == (bad == 39)
+
+
+def test_tail_records_reads_last_n(tmp_path: Path):
+    out = tmp_path / "audit.jsonl"
+    prev = None
+    for i in range(30):
+        prev = append_detection(out, _detection(i), prev)
+
+    rows = tail_records(out, 5)
+    assert [r["detection"]["event"]["data"]["i"] for r in rows] == [25, 26, 27, 28, 29]
+    assert rows == list(iter_records(out))[-5:]
+    assert tail_records(tmp_path / "missing.jsonl", 5) == []
+
+
+def test_follow_records_streams_appends_and_rotation(tmp_path: Path):
+    out = tmp_path / "audit.jsonl"
+    prev = append_detection(out, _detection(0), None)
+
+    def writer() -> None:
+        time.sleep(0.1)
+        line, h = encode_detection(_detection(1), prev)
+        with out.open("ab") as f:
+            # a record split across two writes is only yielded once complete
+            f.write(line.encode()[:10])
+            f.flush()
+            time.sleep(0.05)
+            f.write(line.encode()[10:])
+        h = append_detection(out, _detection(2), h)
+        time.sleep(0.05)
+        out.rename(tmp_path / "audit.jsonl.1")
+        append_detection(out, _detection(3), h)
+
+    t = threading.Thread(target=writer)
+    t.start()
+    seen = [
+        r["detection"]["event"]["data"]["i"]
+        for r in follow_records(out, poll_interval=0.01, idle_timeout=0.5)
+    ]
+    t.join()
+    assert seen == [1, 2, 3]
+
+
+def test_follow_records_reads_a_log_created_after_start(tmp_path: Path):
+    out = tmp_path / "audit.jsonl"
+
+    def writer() -> None:
+        time.sleep(0.1)
+        h = None
+        for i in range(3):
+            h = append_detection(out, _detection(i), h)
+
+    t = threading.Thread(target=writer)
+    t.start()
+    seen = [
+        r["detection"]["event"]["data"]["i"]
+        for r in follow_records(out, poll_interval=0.2, idle_timeout=0.8)
+    ]
+    t.join()
+    assert seen == [0, 1, 2]
+
+
+def test_audit_index_query_seeks_to_matching_records(tmp_path: Path):
+    out = tmp_path / "audit.jsonl"
+    storage = AuditJsonlStorage(out, index=True)
+    storage.setup()
+    for i, (rule, sev, ts) in enumerate(
+        [
+            ("A", "high", "2026-01-01T00:10:00+00:00"),
+            ("B", "low", "2026-01-01T01:10:00+00:00"),
+            ("A", "low", "2026-01-01T02:10:00+00:00"),
+            ("A", "high", "2026-01-02T00:00:00Z"),
+        ]
+    ):
+        ev = Event(ts=ts, host="h", source="s", type="t", data={"i": i})
+        storage.write_detection(
+            Detection(ts=ts, host="h", rule_id=rule, rule_name=rule, severity=sev, event=ev)
+        )
+    storage.close()
+
+    # Records appended behind the index's back are picked up on query.
+    append_detection(out, _detection(4), tail_records(out, 1)[0]["hash"])
+
+    idx = AuditIndex(out)
+
+    def ids(**kw) -> list[int]:
+        return [r["detection"]["event"]["data"]["i"] for r in idx.query(**kw)]
+
+    assert ids(rule_id="A") == [0, 2, 3]
+    assert ids(rule_id="A", severity="high") == [0, 3]
+    window = {"since": parse_time("2026-01-01T01:00:00Z"), "until": parse_time("2026-01-01T23:00Z")}
+    assert ids(**window) == [1, 2]
+    assert ids(rule_id="r1") == [4]
+    assert ids(limit=2) == [0, 1]
+
+    # A replaced log invalidates the index instead of returning stale offsets.
+    out.write_bytes(b"")
+    append_detection(out, _detection(9), None)
+    assert ids() == [9]
+    idx.close()
+
+    missing = AuditIndex(tmp_path / "missing.jsonl")
+    assert list(missing.query()) == []
+    missing.close()
+    assert not (tmp_path / "missing.jsonl.idx").exists()
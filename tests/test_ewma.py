@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+
+from sentinel_stream.audit import tail_records
+from sentinel_stream.detectors import EwmaDriftDetector, OnlineEwma, StreamingEwma
+from sentinel_stream.detectors.ewma import EwmaConfig, ewma_detect
+from sentinel_stream.detectors.ingest import iter_values
+from sentinel_stream.logging import get_logger
+from sentinel_stream.pipeline import run_pipeline
+from sentinel_stream.simulate import SimConfig, synthetic_stream
+from sentinel_stream.storage import AuditJsonlStorage
+
+
+@pytest.mark.parametrize("lam", [0.05, 0.3, 1.0])
+def test_numpy_engine_matches_scalar_loop(lam):
+    rng = np.random.default_rng(7)
+    x = rng.normal(10.0, 2.0, size=6000)
+    x[4000:] += 1.5
+    cfg = EwmaConfig(lam=lam, warmup=500)
+
+    ref = ewma_detect(x.tolist(), cfg, engine="python")
+    vec = ewma_detect(x, cfg, engine="numpy")
+
+    assert vec["mu0"] == ref["mu0"]
+    assert vec["sigma0"] == ref["sigma0"]
+    np.testing.assert_allclose(vec["ewma"], ref["ewma"], rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(vec["alerts"], ref["alerts"])
+    assert len(vec["alerts"]) > 0
+
+
+def test_list_shim_and_empty_input():
+    cfg = EwmaConfig(warmup=3)
+    out = ewma_detect([1.0, 1.0, 1.0, 9.0], cfg, as_list=True)
+    assert out["alerts"] == [3]
+    assert isinstance(out["ewma"], list)
+
+    empty = ewma_detect([], cfg, as_list=True)
+    assert empty == {"mu0": 0.0, "sigma0": 0.0, "alerts": [], "ewma": []}
+
+
+def test_two_dimensional_input_scores_each_row():
+    rng = np.random.default_rng(3)
+    X = rng.normal(0.0, 1.0, size=(3, 5000))
+    X[1, 3000:] += 2.0
+    cfg = EwmaConfig(warmup=500)
+
+    out = ewma_detect(X, cfg)
+    assert out["ewma"].shape == X.shape
+    assert out["mu0"].shape == (3,)
+    for i in range(3):
+        row = ewma_detect(X[i], cfg, engine="python")
+        assert out["mu0"][i] == row["mu0"]
+        np.testing.assert_array_equal(out["alerts"][i], row["alerts"])
+    assert (out["alerts"][1] >= 3000).sum() > 1000
+
+
+@pytest.mark.parametrize("n", [0, 300, 6000])
+def test_streaming_ewma_matches_batch(n):
+    rng = np.random.default_rng(3)
+    x = rng.normal(5.0, 1.0, size=n)
+    x[n // 2 :] += 1.0
+    cfg = EwmaConfig(warmup=500)
+    ref = ewma_detect(x, cfg)
+
+    det = StreamingEwma(cfg)
+    hits = [det.feed(c) for c in np.array_split(x, 7)]
+    hits.append(det.finish())
+
+    np.testing.assert_array_equal(np.concatenate(hits), ref["alerts"])
+    assert det.alerts == len(ref["alerts"])
+    assert det.mu0 == ref["mu0"]
+    assert det.sigma0 == ref["sigma0"]
+
+
+def test_iter_values_reads_text_npy_and_raw(tmp_path):
+    x = np.arange(10, dtype=np.float64) / 4
+    text = tmp_path / "v.txt"
+    lines = [str(v) for v in x]
+    text.write_text("\n".join([*lines[:5], "", "nope", *lines[5:]]))
+    np.save(tmp_path / "v.npy", x)
+    x.astype("<f8").tofile(tmp_path / "v.f64")
+
+    # a torn trailing value is dropped, as when streaming raw input from stdin
+    (tmp_path / "torn.f64").write_bytes(x.astype("<f8").tobytes() + b"\x00" * 5)
+
+    for name in ("v.txt", "v.npy", "v.f64", "torn.f64"):
+        chunks = list(iter_values(str(tmp_path / name), chunk_values=3))
+        assert max(len(c) for c in chunks) == 3
+        np.testing.assert_array_equal(np.concatenate(chunks), x)
+
+
+def test_online_ewma_flags_the_start_of_each_batch_alert_run():
+    rng = np.random.default_rng(1)
+    x = rng.normal(5.0, 1.0, size=3000)
+    x[2000:] += 1.0
+    cfg = EwmaConfig(warmup=500)
+
+    alerts = set(ewma_detect(x, cfg, engine="python")["alerts"].tolist())
+    starts = [i for i in sorted(alerts) if i >= cfg.warmup and i - 1 not in alerts]
+
+    online = OnlineEwma(cfg)
+    assert [i for i, v in enumerate(x) if online.update("k", float(v))] == starts
+
+
+def test_online_ewma_bounds_keys():
+    online = OnlineEwma(EwmaConfig(warmup=2), max_keys=3)
+    for i in range(10):
+        online.update(("h", f"m{i}"), 1.0)
+    assert len(online) == 3
+
+
+def test_drift_detector_stage_in_pipeline(tmp_path):
+    cfg = SimConfig(n=2000, drift_at=1200, seed=1337)
+    storage = AuditJsonlStorage(tmp_path / "audit.jsonl")
+    storage.setup()
+    det = EwmaDriftDetector(metrics=("connections",))
+
+    res = run_pipeline(
+        host="h",
+        events=synthetic_stream(cfg, host="h"),
+        rules=[],
+        storage=storage,
+        log=get_logger("test"),
+        detectors=[det],
+    )
+    storage.close()
+
+    rows = tail_records(tmp_path / "audit.jsonl", 100)
+    assert res.detections == len(rows) > 0
+    assert {r["detection"]["rule_name"] for r in rows} == {"EWMA drift: connections"}
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from sentinel_stream.collector import (
+    ParallelScanner,
+    inotify_available,
+    scan_incremental,
+    walk_files,
+    watch_roots,
+)
+from sentinel_stream.collector.fs_watch import Coalescer
+
+
+def _tree(root: Path) -> None:
+    (root / "a").mkdir()
+    (root / "a" / "one.txt").write_text("1")
+    (root / "two.ps1").write_text("2")
+    (root / ".git" / "objects").mkdir(parents=True)
+    (root / ".git" / "objects" / "x").write_text("x")
+    (root / "node_modules").mkdir()
+    (root / "node_modules" / "y.js").write_text("y")
+
+
+def test_walk_files_prunes_noisy_dirs(tmp_path: Path) -> None:
+    _tree(tmp_path)
+    names = sorted(os.path.relpath(e.path, tmp_path) for e in walk_files(tmp_path))
+    assert names == [os.path.join("a", "one.txt"), "two.ps1"]
+
+
+def test_incremental_scan_emits_only_changes(tmp_path: Path) -> None:
+    root = tmp_path / "home"
+    root.mkdir()
+    _tree(root)
+    manifest = tmp_path / "manifest.db"
+
+    def scan(**kw):
+        return [
+            (ev.type, os.path.relpath(ev.data["path"], root))
+            for ev in scan_incremental(root, host="h", manifest=manifest, **kw)
+        ]
+
+    assert sorted(scan()) == [
+        ("fs.created", os.path.join("a", "one.txt")),
+        ("fs.created", "two.ps1"),
+    ]
+    assert scan() == []
+
+    (root / "a" / "one.txt").write_text("changed")
+    (root / "two.ps1").unlink()
+    (root / "three.bat").write_text("3")
+    assert sorted(scan()) == [
+        ("fs.created", "three.bat"),
+        ("fs.deleted", "two.ps1"),
+        ("fs.modified", os.path.join("a", "one.txt")),
+    ]
+    assert scan() == []
+
+    # capped scans still sweep the whole tree; what is left over comes later
+    (root / "a" / "one.txt").unlink()
+    (root / "a" / "four.txt").write_text("4")
+    (root / "five.txt").write_text("5")
+    capped = [scan(max_changes=1) for _ in range(3)]
+    assert [len(c) for c in capped] == [1, 1, 1]
+    assert sorted(c[0] for c in capped) == [
+        ("fs.created", os.path.join("a", "four.txt")),
+        ("fs.created", "five.txt"),
+        ("fs.deleted", os.path.join("a", "one.txt")),
+    ]
+    assert scan(max_changes=0) == scan() == []
+
+    # a cancelled or abandoned scan keeps what it emitted, skips deletions
+    for i in range(3):
+        (root / "a" / f"new{i}.txt").write_text("n")
+    (root / "five.txt").unlink()
+    assert scan(cancelled=lambda: True) == []
+    it = scan_incremental(root, host="h", manifest=manifest)
+    first = next(it).data["path"]
+    it.close()
+    rest = scan()
+    assert len(rest) == 3 and first not in {os.path.join(root, p) for _, p in rest}
+    assert ("fs.deleted", "five.txt") in rest
+
+
+def test_incremental_scan_keeps_files_it_cannot_stat(tmp_path: Path, monkeypatch) -> None:
+    from sentinel_stream.collector import fs_scan
+
+    root = tmp_path / "home"
+    root.mkdir()
+    (root / "f.txt").write_text("f")
+    manifest = tmp_path / "manifest.db"
+    assert len(list(scan_incremental(root, host="h", manifest=manifest))) == 1
+
+    class Unreadable:
+        def __init__(self, entry: os.DirEntry) -> None:
+            self.path = entry.path
+
+        def stat(self, follow_symlinks: bool = True) -> os.stat_result:
+            raise PermissionError(self.path)
+
+    real = fs_scan.walk_files
+    monkeypatch.setattr(
+        fs_scan, "walk_files", lambda *a, **kw: (Unreadable(e) for e in real(*a, **kw))
+    )
+    assert list(scan_incremental(root, host="h", manifest=manifest)) == []
+    monkeypatch.undo()
+    assert list(scan_incremental(root, host="h", manifest=manifest)) == []
+
+
+def test_parallel_scanner_multiple_roots_excludes_and_limit(tmp_path: Path) -> None:
+    roots = []
+    for r in ("srv", "opt"):
+        root = tmp_path / r
+        for d in range(5):
+            (root / f"d{d}" / "cache").mkdir(parents=True)
+            (root / f"d{d}" / "cache" / "c.bin").write_text("c")
+            for f in range(20):
+                (root / f"d{d}" / f"f{f}.{'log' if f % 4 == 0 else 'txt'}").write_text("x")
+        roots.append(root)
+
+    scanner = ParallelScanner(roots, exclude=["*.log", "*/cache"], workers=4)
+    found = sorted(os.path.relpath(e.path, tmp_path) for _r, e in scanner)
+    assert len(found) == 2 * 5 * 15
+    assert not any(p.endswith(".log") or "cache" in p for p in found)
+    assert {r: st.files for r, st in scanner.stats.items()} == {str(r): 75 for r in roots}
+    assert all(st.dirs == 5 for st in scanner.stats.values())
+
+    limited = ParallelScanner(roots, workers=4, max_files=17)
+    assert len(list(limited)) == 17
+    assert sum(st.files for st in limited.stats.values()) == 17
+
+
+def test_coalescer_folds_bursts_and_pairs_renames() -> None:
+    c = Coalescer(settle=0.2)
+    c.feed("created", "/r/a", 0.0)
+    for t in (0.01, 0.02, 0.03):
+        c.feed("modified", "/r/a", t)
+    c.feed("created", "/r/tmp", 0.0)
+    c.feed("deleted", "/r/tmp", 0.05)
+    c.feed("modified", "/r/b", 0.0)
+    c.feed("moved_from", "/r/b", 0.1, cookie=7)
+    c.feed("moved_to", "/r/c", 0.1, cookie=7)
+    c.feed("moved_from", "/r/gone", 0.1, cookie=8)
+    assert c.due(0.15) == []
+    assert sorted(c.due(0.4)) == [
+        ("created", "/r/a", None),
+        ("created", "/r/c", "/r/b"),
+        ("deleted", "/r/b", None),
+        ("deleted", "/r/gone", None),
+    ]
+    assert len(c) == 0
+
+
+@pytest.mark.skipif(not inotify_available(), reason="inotify not available")
+def test_watch_roots_reports_live_changes(tmp_path: Path) -> None:
+    (tmp_path / ".git").mkdir()
+    stop = threading.Event()
+    seen = []
+
+    def consume() -> None:
+        for ev in watch_roots([tmp_path], host="h", settle=0.05, stop=stop, duration=10):
+            seen.append((ev.type, os.path.relpath(ev.data["path"], tmp_path)))
+
+    t = threading.Thread(target=consume)
+    t.start()
+    time.sleep(0.2)
+    with open(tmp_path / "a.txt", "w") as f:
+        for _ in range(50):
+            f.write("x")
+            f.flush()
+    (tmp_path / ".git" / "HEAD").write_text("ignored")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "b.ps1").write_text("b")
+    time.sleep(0.3)
+    (tmp_path / "a.txt").unlink()
+    deadline = time.monotonic() + 5
+    while len(seen) < 3 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    stop.set()
+    t.join()
+    assert sorted(seen) == [
+        ("fs.created", "a.txt"),
+        ("fs.created", os.path.join("sub", "b.ps1")),
+        ("fs.deleted", "a.txt"),
+    ]
@@ -0,0 +1,39 @@
+import re
+
+import pytest
+
+from sentinel_stream import matchers
+from sentinel_stream.matchers import LiteralSetMatcher, RegexSetMatcher
+
+LITERALS = ["a", "ab", "abc", "b", "bc", "", "xa", "powershell.exe"]
+VALUES = ["", "abc", "xab", "bcbc", "cab", "winword.exe -> powershell.exe", "zzz"]
+
+
+@pytest.mark.parametrize("automaton", [True, False])
+def test_literal_set_matcher_equals_substring_scan(monkeypatch, automaton):
+    if automaton:
+        pytest.importorskip("ahocorasick")
+    else:
+        monkeypatch.setattr(matchers, "ahocorasick", None)
+
+    m = LiteralSetMatcher(LITERALS)
+    for v in VALUES:
+        assert m.search(v) == {lit for lit in LITERALS if lit in v}
+
+
+def test_regex_set_matcher_equals_individual_search():
+    patterns = [
+        r"(?i)\.(exe|dll|ps1|vbs|js)$",
+        r"(?i)\.(lnk|scr|bat|cmd)$",
+        r"a+b",
+        r"b",
+        r"^a",
+        r"(x)\1",
+        r"(?P<n>c)",
+        r"(?x) c  # verbose",
+        r"(?s)a.b",
+    ]
+    m = RegexSetMatcher(patterns)
+    assert len(m) == len(patterns)
+    for v in ["", "ab", "C:/x.EXE", "xxc", "a\nb", "run.bat", "ba"]:
+        assert m.search(v) == {p for p in patterns if re.search(p, v)}
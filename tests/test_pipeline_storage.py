@@ -1,14 +1,20 @@
 from __future__ import annotations
 
+import asyncio
+import json
+import random
+import threading
+import time
 from pathlib import Path
 
 import pytest
 
 from sentinel_stream.audit import iter_records, verify_chain
 from sentinel_stream.logging import configure_logging, get_logger
-from sentinel_stream.model import Event
-from sentinel_stream.pipeline import run_pipeline
-from sentinel_stream.rules import load_rules
+from sentinel_stream.model import Detection, Event, EventBatch
+from sentinel_stream.pipeline import DetectionBus, SuppressionCache, run_pipeline
+from sentinel_stream.pipeline.sharded import shard_of
+from sentinel_stream.rules import Rule, load_rules
 from sentinel_stream.storage import AuditJsonlStorage, CompositeStorage, SQLiteStorage
 
 
@@ -71,3 +77,522 @@ def test_api_optional_import() -> None:
 
     app = create_app(Settings())
     assert app.title == "sentinel-stream"
+
+
+def test_api_detections_filters_pages_export_and_etag(tmp_path: Path) -> None:
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+
+    from sentinel_stream.api.app import create_app
+    from sentinel_stream.config import Settings
+    from sentinel_stream.model import Detection
+
+    db = tmp_path / "db.sqlite"
+    storage = SQLiteStorage(db)
+    storage.setup()
+    for i in range(25):
+        ev = Event(ts=f"2024-01-01T00:00:{i:02d}+00:00", host=f"h{i % 2}", source="s", type="t")
+        storage.write_detection(
+            Detection(
+                ts=ev.ts,
+                host=ev.host,
+                rule_id="R1" if i % 5 else "R2",
+                rule_name="r",
+                severity="high",
+                event=ev,
+            )
+        )
+    storage.close()
+
+    with TestClient(create_app(Settings(sqlite_path=db))) as client:
+        seen = []
+        cursor = None
+        while True:
+            r = client.get(
+                "/detections",
+                params={"limit": 4, "host": "h0", **({"cursor": cursor} if cursor else {})},
+            )
+            assert r.status_code == 200
+            seen += [d["ts"][-11:-6] for d in r.json()]
+            cursor = r.headers.get("x-next-cursor")
+            if cursor is None:
+                break
+        assert seen == [f"00:{i:02d}" for i in range(24, -1, -2)]
+
+        first = client.get("/detections", params={"rule_id": "R2"})
+        assert [d["event"]["host"] for d in first.json()] == ["h0", "h1", "h0", "h1", "h0"]
+        again = client.get(
+            "/detections",
+            params={"rule_id": "R2"},
+            headers={"If-None-Match": first.headers["etag"]},
+        )
+        assert again.status_code == 304
+        assert client.get("/detections", params={"cursor": "%%%"}).status_code == 400
+
+        export = client.get("/detections/export", params={"page_size": 7, "severity": "high"})
+        assert export.headers["content-type"].startswith("application/x-ndjson")
+        lines = export.text.splitlines()
+        assert len(lines) == 25
+        assert len({json.loads(line)["id"] for line in lines}) == 25
+
+
+def test_api_live_stream_sse_and_websocket(tmp_path: Path) -> None:
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+
+    from sentinel_stream.api.app import create_app
+    from sentinel_stream.config import Settings
+
+    def det(rule_id: str, severity: str) -> Detection:
+        ev = Event(host="h", source="s", type="t")
+        return Detection(
+            ts=ev.ts, host="h", rule_id=rule_id, rule_name="r", severity=severity, event=ev
+        )
+
+    def feed(bus: DetectionBus, dets: list[Detection]) -> threading.Thread:
+        # publish once the endpoint has subscribed, then end the stream
+        def run() -> None:
+            while not len(bus):
+                time.sleep(0.01)
+            for d in dets:
+                bus.publish(d)
+            bus.close()
+
+        t = threading.Thread(target=run)
+        t.start()
+        return t
+
+    bus = DetectionBus()
+    app = create_app(Settings(sqlite_path=tmp_path / "db.sqlite"), bus=bus)
+    with TestClient(app) as client:
+        t = feed(bus, [det("A", "low"), det("B", "high"), det("A", "critical")])
+        r = client.get("/detections/stream", params={"rule_id": "A"})
+        t.join()
+        assert r.headers["content-type"].startswith("text/event-stream")
+        frames = [f.split("\n") for f in r.text.strip().split("\n\n")]
+        assert [f[0] for f in frames] == ["event: detection"] * 2
+        assert [json.loads(f[1][6:])["severity"] for f in frames] == ["low", "critical"]
+
+        t = feed(bus, [det("A", "low"), *(det(f"H{i}", "high") for i in range(5))])
+        with client.websocket_connect("/detections/ws?severity=high&buffer=2") as ws:
+            t.join()
+            msgs = [ws.receive_json() for _ in range(3)]
+        assert msgs[0] == {"type": "lag", "dropped": 3}
+        assert [m["detection"]["rule_id"] for m in msgs[1:]] == ["H3", "H4"]
+        assert len(bus) == 0 and bus.published == 9
+
+
+def test_sqlite_batched_writer_flushes_on_size_and_close(tmp_path: Path) -> None:
+    import sqlite3
+
+    db_path = tmp_path / "db.sqlite"
+    storage = SQLiteStorage(db_path, batch_size=100, flush_interval=3600, synchronous="OFF")
+    storage.setup()
+
+    def count() -> int:
+        with sqlite3.connect(db_path) as conn:
+            return int(conn.execute("SELECT COUNT(*) FROM events").fetchone()[0])
+
+    for i in range(250):
+        storage.write_event(Event(host="h", source="s", type="t", data={"i": i}))
+    assert count() == 200
+
+    storage.close()
+    assert count() == 250
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_sqlite_partitions_retention_and_migration(tmp_path: Path) -> None:
+    import sqlite3
+    from datetime import datetime, timezone
+
+    from sentinel_stream.model import Detection
+
+    db_path = tmp_path / "db.sqlite"
+    # a v0 database: one unindexed events table
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            "CREATE TABLE events (id INTEGER PRIMARY KEY AUTOINCREMENT, ts TEXT NOT NULL, "
+            "host TEXT NOT NULL, source TEXT NOT NULL, type TEXT NOT NULL, "
+            "data_json TEXT NOT NULL)"
+        )
+        conn.executemany(
+            "INSERT INTO events(ts, host, source, type, data_json) VALUES (?, 'h', 's', 't', '{}')",
+            [("2024-01-01T10:00:00+00:00",), ("2024-01-02T10:00:00+00:00",)],
+        )
+
+    storage = SQLiteStorage(db_path)
+    storage.setup()
+    assert storage.partitions() == ["20240101", "20240102"]
+    for day, host in (("03", "a"), ("03", "b"), ("04", "a")):
+        ev = Event(ts=f"2024-01-{day}T12:00:00+00:00", host=host, source="s", type="t")
+        storage.write_event(ev)
+        storage.write_detection(
+            Detection(ts=ev.ts, host=host, rule_id="R1", rule_name="r", severity="high", event=ev)
+        )
+    assert storage.partitions() == ["20240101", "20240102", "20240103", "20240104"]
+    assert [e["host"] for e in storage.get_events(since="2024-01-03", until="2024-01-04")] == [
+        "b",
+        "a",
+    ]
+    assert len(storage.get_events(host="a")) == 2
+    dets = storage.get_detections(rule_id="R1", host="a")
+    assert [d["ts"][:10] for d in dets] == ["2024-01-04", "2024-01-03"]
+    assert len(storage.get_detections(severity="high", since="2024-01-04")) == 1
+
+    storage.retention_days = 1
+    assert storage.prune(now=datetime(2024, 1, 5, tzinfo=timezone.utc)) == 3
+    assert storage.partitions() == ["20240104"]
+    assert len(storage.get_detections()) == 1
+
+    def first_bucket() -> str:
+        with sqlite3.connect(db_path) as conn:
+            return conn.execute("SELECT min(bucket) FROM rollup_events").fetchone()[0]
+
+    # the legacy rows were backfilled into the rollups, which outlive the rows
+    assert first_bucket().startswith("2024-01-01")
+    storage.rollup_retention_days = 2
+    storage.prune(now=datetime(2024, 1, 5, tzinfo=timezone.utc))
+    assert first_bucket().startswith("2024-01-03")
+    storage.close()
+    with sqlite3.connect(db_path) as conn:
+        assert conn.execute("PRAGMA user_version").fetchone()[0] == 2
+        assert conn.execute("SELECT COUNT(*) FROM events").fetchone()[0] == 1
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM detections WHERE rule_id = 'R1' ORDER BY ts DESC"
+        ).fetchall()
+        assert "detections_rule_id_ts" in str(plan)
+
+
+def test_sqlite_rollups_incremental_backfill_and_api(tmp_path: Path) -> None:
+    import sqlite3
+    from collections import Counter
+
+    from sentinel_stream.storage import SQLiteReader
+
+    db_path = tmp_path / "db.sqlite"
+    storage = SQLiteStorage(db_path, batch_size=4)
+    storage.setup()
+    dets = []
+    for i in range(30):
+        ev = Event(
+            ts=f"2024-01-01T{i // 10:02d}:{i % 3:02d}:{i:02d}+00:00",
+            host=f"h{i % 2}",
+            source="s",
+            type="t" if i % 5 else "u",
+        )
+        storage.write_event(ev)
+        if i % 3 == 0:
+            det = Detection(
+                ts=ev.ts,
+                host=ev.host,
+                rule_id=f"R{i % 2}",
+                rule_name="r",
+                severity="high" if i % 4 else "low",
+                event=ev,
+            )
+            storage.write_detection(det)
+            dets.append(det)
+    storage.close()
+
+    def snapshot() -> list[list[tuple]]:
+        reader = SQLiteReader(db_path, size=1)
+        try:
+            return [
+                reader.stats("events", period="minute", by=["type"]),
+                reader.stats("detections", by=["rule_id", "severity"]),
+                reader.stats("detections", period="minute", host="h0", since="2024-01-01T01"),
+            ]
+        finally:
+            reader.close()
+
+    events_by_type, dets_by_rule, h0 = incremental = snapshot()
+    assert sum(n for *_, n in events_by_type) == 30
+    assert ("2024-01-01T00:00", "u", 1) in events_by_type
+    by_rule = Counter((d.ts[:13], d.rule_id, d.severity) for d in dets)
+    assert dets_by_rule == [(*k, n) for k, n in sorted(by_rule.items())]
+    assert h0 == [("2024-01-01T01:00", 2), ("2024-01-01T02:00", 1)]
+
+    # rebuilt from the rows by the v2 backfill: same counts
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("DROP TABLE rollup_events")
+        conn.execute("DROP TABLE rollup_detections")
+        conn.execute("PRAGMA user_version = 1")
+    storage = SQLiteStorage(db_path)
+    storage.setup()
+    storage.close()
+    assert snapshot() == incremental
+
+    pytest.importorskip("fastapi")
+    from fastapi.testclient import TestClient
+
+    from sentinel_stream.api.app import create_app
+    from sentinel_stream.config import Settings
+
+    with TestClient(create_app(Settings(sqlite_path=db_path))) as client:
+        r = client.get("/stats/detections", params={"by": "rule_id", "severity": "low"})
+        low = Counter((d.ts[:13], d.rule_id) for d in dets if d.severity == "low")
+        assert r.json() == [
+            {"bucket": b, "rule_id": rule, "count": n} for (b, rule), n in sorted(low.items())
+        ]
+        r = client.get("/stats/events", params={"until": "2024-01-01T01:30:00+00:00"})
+        assert r.json() == [{"bucket": "2024-01-01T00", "count": 10}]
+        assert client.get("/stats/events", params={"by": "rule_id"}).status_code == 422
+
+
+def test_sqlite_rejects_unknown_synchronous_level(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        SQLiteStorage(tmp_path / "db.sqlite", synchronous="SOMETIMES").setup()
+
+
+def test_sharded_run_matches_serial_audit(tmp_path: Path) -> None:
+    rules_file = tmp_path / "rules.yml"
+    rules_file.write_text(
+        """
+rules:
+  - id: R1
+    name: secret-path
+    severity: high
+    match:
+      type: fs.scan
+      where:
+        any_of:
+          - field: data.path
+            contains: secret
+""".lstrip(),
+        encoding="utf-8",
+    )
+    rules = load_rules(str(rules_file))
+    events = [
+        Event(
+            ts=f"2024-01-01T00:00:{i % 60:02d}+00:00",
+            host=f"h{i % 3}",
+            source="fs_scan",
+            type="fs.scan",
+            data={"path": f"/home/u/{'secret' if i % 7 == 0 else 'plain'}-{i}.txt"},
+        )
+        for i in range(300)
+    ]
+    assert len({shard_of(ev, 3) for ev in events}) == 3
+
+    lines = []
+    for workers in (1, 3):
+        audit_path = tmp_path / f"audit{workers}.jsonl"
+        storage = AuditJsonlStorage(audit_path)
+        storage.setup()
+        res = run_pipeline(
+            host="h",
+            events=events,
+            rules=rules,
+            storage=storage,
+            log=get_logger("test"),
+            workers=workers,
+            batch_size=16,
+        )
+        storage.close()
+        assert (res.events, res.detections) == (300, 43)
+        lines.append(audit_path.read_bytes())
+    assert lines[0] == lines[1]
+
+
+def test_staged_pipeline_keeps_order_and_bounds_memory(tmp_path: Path) -> None:
+    produced = 0
+    written: list[int] = []
+    detected: list[int] = []
+    lag: list[int] = []
+
+    def source():
+        nonlocal produced
+        for i in range(400):
+            produced += 1
+            lag.append(produced - len(written))
+            yield Event(host="h", source="t", type="x", data={"i": i, "p": "hit" if i % 5 else ""})
+
+    class Jitter:
+        async def process(self, event, next_call):
+            await asyncio.sleep(random.random() / 1000)
+            if event.data["i"] % 50 == 7:
+                return None  # dropped by middleware
+            return await next_call(event)
+
+    class SlowStorage:
+        def setup(self) -> None: ...
+
+        def write_event(self, event: Event) -> None:
+            time.sleep(0.0002)
+            written.append(event.data["i"])
+
+        def write_detection(self, detection) -> None:
+            detected.append(detection.event.data["i"])
+
+        def flush(self) -> None: ...
+
+        def close(self) -> None: ...
+
+    rules = [Rule("R", "r", "low", "x", {"any_of": [{"field": "data.p", "contains": "hit"}]})]
+    res = run_pipeline(
+        host="h",
+        events=source(),
+        rules=rules,
+        storage=SlowStorage(),
+        log=get_logger("test"),
+        middlewares=[Jitter()],
+        concurrency=4,
+        queue_size=8,
+        batch_size=4,
+    )
+
+    expected = [i for i in range(400) if i % 50 != 7]
+    assert res.events == 400
+    assert written == expected
+    assert detected == [i for i in expected if i % 5]
+    assert res.detections == len(detected)
+    assert max(lag) <= 40
+
+
+def test_pipeline_accepts_event_batches(tmp_path: Path) -> None:
+    rules = load_rules("rules/default.yml")
+    events = [
+        Event(ts="2024-01-01T00:00:00+00:00", host="h", source="fs", type="fs.scan", data=d)
+        for d in ({"path": "/tmp/a.ps1"}, {"path": "/tmp/a.txt"}, {"path": "/tmp/b.bat"})
+    ]
+    out = []
+    for i, items in enumerate((events, [EventBatch.from_events(events[:2]), events[2]])):
+        audit_path = tmp_path / f"audit{i}.jsonl"
+        storage = AuditJsonlStorage(audit_path)
+        storage.setup()
+        res = run_pipeline(
+            host="h", events=items, rules=rules, storage=storage, log=get_logger("test")
+        )
+        storage.close()
+        assert (res.events, res.detections) == (3, 2)
+        out.append(audit_path.read_bytes())
+    assert out[0] == out[1]
+
+
+def test_suppression_cache_ttl_lru_and_persistence(tmp_path: Path) -> None:
+    rules = load_rules("rules/default.yml")
+    now = [1000.0]
+    cache_path = tmp_path / "suppress.db"
+
+    def run(paths: list[str], cache: SuppressionCache) -> tuple[int, int]:
+        events = [Event(host="h", source="fs", type="fs.scan", data={"path": p}) for p in paths]
+        storage = AuditJsonlStorage(tmp_path / "audit.jsonl")
+        storage.setup()
+        cache.load()
+        try:
+            res = run_pipeline(
+                host="h",
+                events=events,
+                rules=rules,
+                storage=storage,
+                log=get_logger("test"),
+                suppress=cache,
+            )
+        finally:
+            storage.close()
+            cache.save()
+        return res.detections, res.suppressed
+
+    def cache(**kw) -> SuppressionCache:
+        return SuppressionCache(ttl=60, path=cache_path, clock=lambda: now[0], **kw)
+
+    assert run(["/a.ps1", "/a.ps1", "/b.exe", "/c.txt"], cache()) == (2, 1)
+    # a new process picks up the persisted keys
+    assert run(["/a.ps1", "/b.exe", "/d.bat"], cache()) == (1, 2)
+    now[0] += 61
+    assert run(["/a.ps1"], cache()) == (1, 0)
+
+    lru = SuppressionCache(max_entries=2, clock=lambda: now[0])
+    assert run(["/1.js", "/2.js", "/1.js", "/3.js", "/1.js", "/2.js"], lru) == (4, 2)
+    assert len(lru) == 2
+    assert verify_chain(tmp_path / "audit.jsonl")
+
+
+def test_detection_bus_filters_and_reports_lag(tmp_path: Path) -> None:
+    rules = load_rules("rules/default.yml")
+    events = [
+        *(
+            Event(host="h", source="fs", type="fs.scan", data={"path": f"/{i}.ps1"})
+            for i in range(5)
+        ),
+        Event(
+            host="h",
+            source="proc",
+            type="proc.snapshot",
+            data={"chain": "winword.exe -> powershell.exe"},
+        ),
+    ]
+
+    async def main() -> None:
+        bus = DetectionBus()
+        everything = bus.subscribe(maxsize=3)
+        high = bus.subscribe(severities=["high", "critical"])
+        fs = bus.subscribe(rule_ids=["FS_SUSPICIOUS_EXTENSIONS"])
+        storage = AuditJsonlStorage(tmp_path / "audit.jsonl")
+        storage.setup()
+        res = await asyncio.to_thread(
+            run_pipeline,
+            host="h",
+            events=events,
+            rules=rules,
+            storage=storage,
+            log=get_logger("test"),
+            bus=bus,
+        )
+        storage.close()
+        assert res.detections == bus.published == 6
+
+        got = [d.rule_id async for d in _drain(everything)]
+        assert got == ["FS_SUSPICIOUS_EXTENSIONS"] * 2 + ["PROC_SUSPICIOUS_PARENTS"]
+        assert (everything.dropped, everything.lag(), everything.lag()) == (3, 3, 0)
+        assert [d.rule_id async for d in _drain(high)] == ["PROC_SUSPICIOUS_PARENTS"]
+        assert len([d async for d in _drain(fs)]) == 5 and fs.dropped == 0
+
+        fs.close()
+        assert len(bus) == 2
+        assert await fs.get() is None
+
+    asyncio.run(main())
+
+
+async def _drain(sub):
+    while (d := await sub.get(timeout=0)) is not None:
+        yield d
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_pipeline_flushes_idle_storage_on_time(tmp_path: Path, workers: int) -> None:
+    audit_path = tmp_path / "audit.jsonl"
+    storage = AuditJsonlStorage(audit_path, fsync_policy="every_n", fsync_every=100)
+    storage.setup()
+    release = threading.Event()
+
+    def live():
+        yield Event(host="h", source="fs", type="fs.scan", data={"path": "/a.ps1"})
+        release.wait(10)  # a quiet collector
+
+    t = threading.Thread(
+        target=run_pipeline,
+        kwargs=dict(
+            host="h",
+            events=live(),
+            rules=load_rules("rules/default.yml"),
+            storage=storage,
+            log=get_logger("test"),
+            workers=workers,
+            flush_interval=0.1,
+        ),
+    )
+    t.start()
+    try:
+        deadline = time.monotonic() + 5
+        while not (audit_path.exists() and audit_path.read_bytes()):
+            assert time.monotonic() < deadline, "detection not flushed while idle"
+            time.sleep(0.02)
+    finally:
+        release.set()
+        t.join()
+        storage.close()
+    assert len(list(iter_records(audit_path))) == 1
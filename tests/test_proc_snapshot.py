@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from sentinel_stream.collector import ProcessCollector
+from sentinel_stream.rules import CompiledRuleSet, load_rules
+
+
+def _spawn(root: Path, pid: int, ppid: int, comm: str, argv: list[str]) -> None:
+    d = root / str(pid)
+    d.mkdir()
+    tail = " ".join(["0"] * 17 + [str(1000 + pid)] + ["0"] * 10)
+    (d / "stat").write_text(f"{pid} ({comm}) S {ppid} {tail}")
+    (d / "cmdline").write_bytes(b"\0".join(a.encode() for a in argv) + b"\0")
+
+
+def test_process_collector_chains_and_deltas(tmp_path: Path) -> None:
+    _spawn(tmp_path, 1, 0, "init", ["/sbin/init"])
+    _spawn(tmp_path, 40, 1, "explorer.exe", ["explorer.exe"])
+    _spawn(tmp_path, 41, 40, "winword.exe", ["winword.exe", "/doc.docm"])
+    _spawn(tmp_path, 45, 41, "odd) name", ["x"])
+    (tmp_path / "self").mkdir()
+
+    c = ProcessCollector(str(tmp_path))
+    first = list(c.collect("h"))
+    assert [e.type for e in first] == ["proc.snapshot"] * 4
+    assert first[2].data == {
+        "pid": 41,
+        "ppid": 40,
+        "name": "winword.exe",
+        "cmdline": "winword.exe /doc.docm",
+        "chain": "init -> explorer.exe -> winword.exe",
+    }
+    assert first[3].data["chain"].endswith("winword.exe -> odd) name")
+
+    assert list(c.collect("h")) == []
+
+    # a child started after its parent's pid; the odd process exited
+    _spawn(tmp_path, 7, 41, "powershell.exe", ["powershell.exe", "-enc", "AAAA"])
+    for f in (tmp_path / "45").iterdir():
+        f.unlink()
+    (tmp_path / "45").rmdir()
+    delta = list(c.collect("h"))
+    assert [(e.type, e.data["pid"]) for e in delta] == [("proc.start", 7), ("proc.exit", 45)]
+    assert delta[0].data["chain"] == "init -> explorer.exe -> winword.exe -> powershell.exe"
+
+    rules = CompiledRuleSet(load_rules("rules/default.yml"))
+    assert [r.id for r in rules.match(delta[0])] == ["PROC_NEW_SUSPICIOUS_PARENTS"]
+    assert len(c.tree) == 4
+
+
+def test_process_collector_reports_what_a_cut_short_tick_missed(tmp_path: Path) -> None:
+    _spawn(tmp_path, 1, 0, "init", ["/sbin/init"])
+    c = ProcessCollector(str(tmp_path))
+    assert len(list(c.collect("h"))) == 1
+
+    for pid in range(10, 15):
+        _spawn(tmp_path, pid, 1, f"p{pid}", [f"p{pid}"])
+    it = c.collect("h")
+    assert next(it).data["pid"] == 10
+    it.close()
+    rest = list(c.collect("h"))
+    assert [(e.type, e.data["pid"]) for e in rest] == [("proc.start", p) for p in range(11, 15)]
+    assert rest[0].data["chain"] == "init -> p11"
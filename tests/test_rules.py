@@ -1,4 +1,11 @@
-from sentinel_stream.rules import load_rules, validate_rules
+from sentinel_stream.model import Event, EventBatch, RawEvent
+from sentinel_stream.rules import (
+    CompiledRuleSet,
+    Rule,
+    load_rules,
+    rule_matches,
+    validate_rules,
+)
 
 
 def test_default_rules_validate():
@@ -10,3 +17,113 @@ def test_load_rules():
     rules = load_rules("rules/default.yml")
     assert len(rules) >= 1
     assert rules[0].id
+
+
+def _rule(id: str, event_type: str, where: dict) -> Rule:
+    return Rule(id=id, name=id, severity="low", event_type=event_type, where=where)
+
+
+def test_compiled_ruleset_matches_rule_matches():
+    rules = [
+        *load_rules("rules/default.yml"),
+        _rule(
+            "EQ",
+            "fs.scan",
+            {
+                "all_of": [
+                    {"field": "host", "equals": "h1"},
+                    {"field": "data.path", "contains": "tmp"},
+                ]
+            },
+        ),
+        _rule("ANY", "", {"any_of": [{"field": "data.n", "equals": 3}]}),
+        _rule("BROKEN", "fs.scan", {"all_of": [{"field": "data.path"}]}),
+        _rule("EMPTY", "fs.scan", {}),
+    ]
+    events = [
+        {"type": "fs.scan", "host": "h1", "data": {"path": "/tmp/x.PS1"}},
+        {"type": "fs.scan", "host": "h2", "data": {"path": "/tmp/readme.md", "n": 3}},
+        {"type": "proc.snapshot", "host": "h1", "data": {"chain": "excel.exe -> powershell.exe"}},
+        {"type": "other", "data": {"n": "3"}},
+        {"type": "fs.scan", "data": {"path": None}},
+        {"data": "not-a-dict"},
+    ]
+
+    compiled = CompiledRuleSet(rules)
+    assert len(compiled) == len(rules)
+    for ev in events:
+        expected = [r.id for r in rules if rule_matches(r, ev)]
+        assert [r.id for r in compiled.match(ev)] == expected
+
+
+def test_compiled_ruleset_reads_event_objects_without_dumping():
+    compiled = CompiledRuleSet(load_rules("rules/default.yml"))
+    raw = [
+        RawEvent(host="h", source="fs_scan", type="fs.scan", data={"path": "/tmp/run.ps1"}),
+        RawEvent(host="h", source="s", type="proc.snapshot", data={"chain": "winword -> cmd.exe"}),
+        RawEvent(host="h", source="s", type="fs.scan", data={"path": None}, ts="2024-01-01"),
+    ]
+    for ev in raw:
+        model = ev.to_model()
+        assert isinstance(model, Event)
+        assert model.ts == ev.ts
+        expected = [r.id for r in compiled.match(model.model_dump())]
+        assert [r.id for r in compiled.match(ev)] == expected
+        assert [r.id for r in compiled.match(model)] == expected
+
+
+def test_validate_rules_reports_bad_regex(tmp_path):
+    f = tmp_path / "rules.yml"
+    f.write_text(
+        "rules:\n"
+        "  - id: R1\n"
+        "    match:\n"
+        "      type: fs.scan\n"
+        "      where:\n"
+        "        any_of:\n"
+        "          - field: data.path\n"
+        "            regex: '(unclosed'\n",
+        encoding="utf-8",
+    )
+    errs = validate_rules(str(f))
+    assert len(errs) == 1
+    assert errs[0].startswith("invalid regex: R1")
+
+
+def test_match_batch_agrees_with_per_event_match():
+    rules = [
+        *load_rules("rules/default.yml"),
+        _rule("HOST", "", {"any_of": [{"field": "host", "equals": "h2"}]}),
+        _rule(
+            "NESTED",
+            "fs.scan",
+            {
+                "all_of": [
+                    {"field": "data.meta.owner", "equals": "root"},
+                    {"field": "data.path", "regex": "^/etc"},
+                ]
+            },
+        ),
+        _rule("WHOLE", "x", {"any_of": [{"field": "data", "contains": "'k': 1"}]}),
+    ]
+    events = [
+        RawEvent("h1", "s", "fs.scan", {"path": "/tmp/x.PS1"}),
+        RawEvent("h2", "s", "fs.scan", {"path": "/etc/shadow", "meta": {"owner": "root"}}),
+        RawEvent("h1", "s", "fs.scan", {"path": "/etc/passwd", "meta": {"owner": "bob"}}),
+        RawEvent("h2", "s", "proc.snapshot", {"chain": "excel.exe -> powershell.exe"}),
+        RawEvent("h1", "s", "x", {"k": 1}),
+        RawEvent("h1", "s", "fs.scan", {"path": "/tmp/x.PS1"}),
+    ]
+    compiled = CompiledRuleSet(rules)
+    batch = EventBatch.from_events(events)
+    assert [ev.data for ev in batch] == [ev.data for ev in events]
+
+    expected: dict[str, list[int]] = {}
+    for i, ev in enumerate(events):
+        for r in compiled.match(ev):
+            expected.setdefault(r.id, []).append(i)
+    got = {r.id: rows for r, rows in compiled.match_batch(batch)}
+    assert got == expected
+    assert [r.id for r, _ in compiled.match_batch(batch)] == [
+        r.id for r in rules if r.id in expected
+    ]
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import threading
+import time
+
+from sentinel_stream.collector import ScheduledCollector, Scheduler
+from sentinel_stream.model import RawEvent
+
+
+def _ev(kind: str, i: int) -> RawEvent:
+    return RawEvent(host="h", source=kind, type=f"{kind}.tick", data={"i": i})
+
+
+def test_scheduler_cadence_overlap_and_budget() -> None:
+    def fast(cancelled):
+        yield _ev("fast", 0)
+
+    def slow(cancelled):
+        # a run would take 2s; the 0.3s budget cuts it short, and while it is
+        # still running its next ticks are skipped
+        for i in range(40):
+            time.sleep(0.05)
+            yield _ev("slow", i)
+
+    stop = threading.Event()
+
+    def forever(cancelled):
+        while not stop.wait(0.05):
+            yield _ev("live", 0)
+
+    sched = Scheduler(
+        [
+            ScheduledCollector("fast", fast, 0.2, jitter=0.2),
+            ScheduledCollector("slow", slow, 0.1, budget=0.3),
+            ScheduledCollector("live", forever, None),
+        ],
+        seed=7,
+    )
+    events = list(sched.events(stop=stop, duration=1.2))
+
+    st = sched.stats
+    assert 4 <= st["fast"].runs <= 8
+    assert st["slow"].runs >= 2 and st["slow"].skipped >= 2
+    assert st["slow"].over_budget >= 1
+    assert st["slow"].events <= 8 * st["slow"].runs
+    assert st["live"].runs == 1 and st["live"].events > 5
+    assert sum(s.events for s in st.values()) == len(events)
+    assert not any(t.name.startswith("collect-") for t in threading.enumerate())
+
+
+def test_scheduler_cancels_quiet_runs() -> None:
+    # no events to check the budget between: the collector polls cancelled()
+    def sweep(cancelled):
+        t0 = time.monotonic()
+        while not cancelled() and time.monotonic() - t0 < 5:
+            time.sleep(0.01)
+        yield from ()
+
+    sched = Scheduler([ScheduledCollector("quiet", sweep, 10, budget=0.1)])
+    t0 = time.monotonic()
+    assert list(sched.events(duration=0.5)) == []
+    assert sched.stats["quiet"].over_budget == 1
+
+    stop = threading.Event()
+    threading.Timer(0.2, stop.set).start()
+    sched = Scheduler([ScheduledCollector("quiet", sweep, 10)])
+    assert list(sched.events(stop=stop)) == []
+    assert sched.stats["quiet"].over_budget == 0
+    assert time.monotonic() - t0 < 2
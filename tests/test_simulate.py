@@ -1,4 +1,4 @@
-from sentinel_stream.simulate import SimConfig, synthetic_stream
+from sentinel_stream.simulate import SimConfig, synthetic_batches, synthetic_stream
 
 
 def test_synthetic_stream_length():
@@ -7,3 +7,9 @@ def test_synthetic_stream_length():
     assert len(events) == 123
     assert events[0].type == "telemetry.metric"
     assert "connections" in events[0].data
+
+
+def test_synthetic_batches_match_stream():
+    cfg = SimConfig(n=300, drift_at=100, seed=2)
+    rows = [ev for batch in synthetic_batches(cfg, host="h", size=64) for ev in batch]
+    assert [ev.data for ev in rows] == [ev.data for ev in synthetic_stream(cfg, host="h")]